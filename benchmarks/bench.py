@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from json import dump, dumps
+from os import chdir, getcwd, makedirs, path
+from platform import platform, python_version
+from plistlib import dumps as dumps_plist
+from random import Random
+from shutil import copytree, rmtree
+from statistics import mean, median
+from sys import path as sys_path, stdout
+from tempfile import mkdtemp
+from threading import Thread
+from time import perf_counter, time
+from zipfile import ZIP_DEFLATED, ZipFile
+
+sys_path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from opencore.binary import BinaryData
+from opencore.build import OpenCoreBuild
+from opencore.cache import ArtifactCache
+from opencore.download import Downloader
+from opencore.host import HostProbe, StubProbe
+from opencore.release import ReleaseIndex
+from opencore.report import BuildReport
+
+
+class ReleaseHandler(BaseHTTPRequestHandler):
+    """
+    ReleaseHandler serves the synthetic release files, standing in for GitHub.
+    """
+    files = {}
+    protocol_version = 'HTTP/1.1'
+
+
+    def do_GET(self):
+        """
+        Serves a release file, revalidated with its 'ETag' header.
+
+        :return: Nothing
+        """
+        data = self.files.get(self.path)
+        if data is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        etag = '"{0:x}"'.format(hash(data) & 0xFFFFFFFF)
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+    def log_message(self, *args):
+        """
+        Silences the request log.
+
+        :return: Nothing
+        """
+
+
+class BuildBenchmark:
+    """
+    BuildBenchmark times the build stages against synthetic releases, served by a local HTTP server.
+    """
+    VERSION = '0.9.7'
+
+
+    def __init__(self, directory, kexts=20, resources=1000, properties=200, repeat=3, seed=0):
+        """
+        Constructs a new 'BuildBenchmark' object.
+
+        :param directory: Path of the work directory
+        :param kexts: Number of kexts installed
+        :param resources: Number of OcBinaryData resource files
+        :param properties: Number of DeviceProperties devices, each having 8 properties
+        :param repeat: Number of timed runs of each benchmark
+        :param seed: Seed of the synthetic data generator
+        :return: Nothing
+        """
+        self.counter = 0
+        self.directory = directory
+        self.kexts = kexts
+        self.properties = properties
+        self.random = Random(seed)
+        self.repeat = repeat
+        self.resources = resources
+        self.results = {}
+        self.server = None
+        self.url = None
+
+
+    def bench_copy_tree(self):
+        """
+        Copies the OcBinaryData resources into an empty, then an up to date directory.
+
+        :return: Nothing
+        """
+        source = 'files/OcBinaryData/Resources'
+
+        def copy(state):
+            state.copy_tree(source, '{0}/EFI/OC/Resources'.format(state.directory))
+            return state
+
+        self.measure('copy_tree.cold', lambda: self.builder('out/copy-{0}'.format(self.sequence())), copy)
+        copy(self.builder('out/copy'))
+        self.measure('copy_tree.warm', lambda: self.builder('out/copy'), copy)
+
+
+    def bench_extract_files(self):
+        """
+        Extracts the local OpenCore and kext release files.
+
+        :return: Nothing
+        """
+        def extract(state):
+            state.extract_files('releases/OpenCore-{0}-RELEASE.zip'.format(self.VERSION), state.directory, True)
+            for i in range(self.kexts):
+                state.extract_kext('releases/Kext{0}-1.0.0-RELEASE.zip'.format(i))
+            return state
+
+        self.measure('extract_files', lambda: self.builder('out/extract-{0}'.format(self.sequence())), extract)
+
+
+    def bench_run_misc_tasks(self):
+        """
+        Fixes the permissions of a built tree and validates its configuration file.
+
+        :return: Nothing
+        """
+        source = self.builder('out/misc')
+        source.binary = self.binary('store/misc')
+        source.releases = self.release_index(source.downloader)
+        source.write_tree()
+        source.write_plist(self.settings(source))
+
+        def setup():
+            state = self.builder('out/misc-{0}'.format(self.sequence()))
+            copytree(source.directory, state.directory)
+            return state
+
+        def run(state):
+            state.run_misc_tasks()
+            return state
+
+        self.measure('run_misc_tasks', setup, run)
+
+
+    def bench_update_settings(self):
+        """
+        Merges large settings over default settings, without writing them.
+
+        :return: Nothing
+        """
+        def update(state):
+            state.update_settings(state.default_settings(), self.settings(state))
+            return state
+
+        self.measure('update_settings', lambda: self.builder('out/settings'), update)
+
+
+    def bench_write_plist(self):
+        """
+        Merges large settings and writes the configuration file.
+
+        :return: Nothing
+        """
+        def write(state):
+            state.write_plist(self.settings(state))
+            return state
+
+        self.measure('write_plist', lambda: self.builder('out/plist-{0}'.format(self.sequence())), write)
+
+
+    def bench_write_tree(self):
+        """
+        Builds the EFI tree from downloaded releases, then from artifact cache and incrementally.
+
+        :return: Nothing
+        """
+        def cold():
+            state = self.builder('out/tree-{0}'.format(self.sequence()))
+            state.binary = self.binary('store/tree-{0}'.format(self.sequence()))
+            state.downloader = Downloader('downloads/{0}'.format(self.sequence()))
+            state.releases = self.release_index(state.downloader)
+            return state
+
+        def cached():
+            state = self.builder('out/tree-{0}'.format(self.sequence()))
+            state.binary = self.binary('store/cached')
+            state.cache = ArtifactCache('cache')
+            state.releases = self.release_index(state.downloader)
+            return state
+
+        def incremental():
+            state = cached()
+            state.directory = 'out/incremental'
+            state.incremental = True
+            return state
+
+        def write(state):
+            state.write_tree()
+            return state
+
+        self.measure('write_tree.cold', cold, write)
+        write(cached())
+        self.measure('write_tree.cached', cached, write)
+        write(incremental())
+        self.measure('write_tree.incremental', incremental, write)
+
+
+    def binary(self, store):
+        """
+        Constructs an OcBinaryData provider, downloading from the local server.
+
+        :param store: Path of the content-addressed store
+        :return: BinaryData object
+        """
+        result = BinaryData('files/OcBinaryData', store, revision='benchmark')
+        result.ARCHIVE = self.url + '/OcBinaryData/archive/{0}.zip'
+
+        return result
+
+
+    def builder(self, directory):
+        """
+        Constructs a silent builder, independent of the build host.
+
+        :param directory: Path of the build directory
+        :return: OpenCoreBuild object
+        """
+        result = OpenCoreBuild(directory)
+        result.host = StubProbe({'cpus': 8})
+        result.kexts = [{'project': 'Kext{0}'.format(i), 'repo': 'benchmark', 'version': '1.0.0'} for i in range(self.kexts)]
+        result.report = BuildReport([])
+        result.version = self.VERSION
+
+        return result
+
+
+    def generate(self):
+        """
+        Generates the synthetic releases, OcBinaryData tree and release index, then starts the server.
+
+        :return: Nothing
+        """
+        files = {}
+        opencore = self.zip({
+            'X64/EFI/BOOT/BOOTx64.efi': self.random.randbytes(32 * 1024),
+            'X64/EFI/OC/OpenCore.efi': self.random.randbytes(512 * 1024),
+            **{'X64/EFI/OC/Drivers/Driver{0}.efi'.format(i): self.random.randbytes(64 * 1024) for i in range(16)},
+            **{'X64/EFI/OC/Tools/Tool{0}.efi'.format(i): self.random.randbytes(64 * 1024) for i in range(8)}
+        })
+        files['/OpenCorePkg/OpenCore-{0}-RELEASE.zip'.format(self.VERSION)] = opencore
+        releases = {'OpenCorePkg': ['OpenCore-{0}-RELEASE.zip'.format(self.VERSION)]}
+        for i in range(self.kexts):
+            name = 'Kext{0}'.format(i)
+            info = {
+                'CFBundleExecutable': name,
+                'CFBundleIdentifier': 'benchmark.{0}'.format(name),
+                'CFBundleVersion': '1.0.0',
+                'OSBundleLibraries': {'benchmark.Kext0': '1.0.0'} if i else {}
+            }
+            files['/{0}/{0}-1.0.0-RELEASE.zip'.format(name)] = self.zip({
+                '{0}.kext/Contents/Info.plist'.format(name): dumps_plist(info),
+                '{0}.kext/Contents/MacOS/{0}'.format(name): self.random.randbytes(128 * 1024),
+                '{0}.dSYM/Contents/Resources/DWARF/{0}'.format(name): self.random.randbytes(64 * 1024)
+            })
+            releases[name] = ['{0}-1.0.0-RELEASE.zip'.format(name)]
+        tree = {'Drivers/HfsPlus.efi': self.random.randbytes(40 * 1024)}
+        for i in range(self.resources):
+            folder = ['Audio', 'Font', 'Image/Acidanthera/GoldenGate', 'Label'][i % 4]
+            tree['Resources/{0}/File{1}.bin'.format(folder, i)] = self.random.randbytes(self.random.randint(1024, 64 * 1024))
+        files['/OcBinaryData/archive/benchmark.zip'] = self.zip({'OcBinaryData-benchmark/' + k: v for k, v in tree.items()})
+        for name, data in tree.items():
+            self.write_file(path.join('files/OcBinaryData', name), data)
+        for name, data in files.items():
+            if name.endswith('-RELEASE.zip'):
+                self.write_file(path.join('releases', path.basename(name)), data)
+        ReleaseHandler.files = files
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ReleaseHandler)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:{0}'.format(self.server.server_port)
+        for project, names in releases.items():
+            assets = [{'browser_download_url': '{0}/{1}/{2}'.format(self.url, project, i), 'name': i} for i in names]
+            version = self.VERSION if project == 'OpenCorePkg' else '1.0.0'
+            index = [{'assets': assets, 'tag_name': version}]
+            ReleaseHandler.files['/releases/{0}'.format(project)] = dumps(index).encode('UTF-8')
+
+
+    def measure(self, name, setup, function):
+        """
+        Times a benchmark, running its setup before each untimed.
+
+        :param name: Benchmark name
+        :param setup: Function returning the builder of a run
+        :param function: Function timed, receiving the builder
+        :return: Nothing
+        """
+        runs = []
+        state = None
+        for _ in range(self.repeat):
+            state = setup()
+            start = perf_counter()
+            function(state)
+            runs.append(perf_counter() - start)
+        summary = state.report.summary()
+        self.results[name] = {
+            'counters': summary['counters'],
+            'mean': mean(runs),
+            'median': median(runs),
+            'min': min(runs),
+            'phases': summary['phases'],
+            'runs': runs
+        }
+
+
+    def release_index(self, downloader):
+        """
+        Constructs a release index of all projects, queried from the local server.
+
+        :param downloader: Downloader object
+        :return: ReleaseIndex object
+        """
+        result = ReleaseIndex('releases.json', ttl=None, api=self.url + '/releases/{1}', downloader=downloader)
+        result.releases('acidanthera', 'OpenCorePkg')
+        for i in range(self.kexts):
+            result.releases('benchmark', 'Kext{0}'.format(i))
+
+        return result
+
+
+    def run(self, names=None):
+        """
+        Runs the benchmarks inside work directory.
+
+        :param names: List of benchmark names, all benchmarks if None
+        :return: Dictionary of results
+        """
+        current = getcwd()
+        makedirs(self.directory, exist_ok=True)
+        chdir(self.directory)
+        try:
+            self.generate()
+            for i in sorted(dir(self)):
+                if i.startswith('bench_') and (names is None or i[6:] in names):
+                    getattr(self, i)()
+        finally:
+            if self.server is not None:
+                self.server.shutdown()
+            chdir(current)
+
+        return {
+            'meta': {
+                'commit': HostProbe.git_revision(path.dirname(path.dirname(path.abspath(__file__)))),
+                'platform': platform(),
+                'python': python_version(),
+                'scale': {'kexts': self.kexts, 'properties': self.properties, 'resources': self.resources},
+                'repeat': self.repeat,
+                'time': time()
+            },
+            'results': self.results
+        }
+
+
+    def sequence(self):
+        """
+        Generates a unique number, to name the directories of each run.
+
+        :return: Number
+        """
+        self.counter += 1
+
+        return self.counter
+
+
+    def settings(self, build):
+        """
+        Generates large settings, with DeviceProperties data decoded from hexadecimal strings.
+
+        :param build: OpenCoreBuild object
+        :return: Dictionary of settings
+        """
+        random = Random(self.properties)
+        devices = {}
+        for i in range(self.properties):
+            device = 'PciRoot(0x0)/Pci(0x{0:x},0x0)/Pci(0x{1:x},0x0)'.format(i // 32, i % 32)
+            devices[device] = {
+                'property-{0}'.format(j): build.unhexlify(random.randbytes(random.randint(4, 64)).hex(' '))
+                for j in range(8)
+            }
+        drivers = [
+            {'Arguments': '', 'Comment': '', 'Enabled': True, 'LoadEarly': False, 'Path': 'Driver{0}.efi'.format(i)}
+            for i in range(16)
+        ]
+
+        return {
+            'DeviceProperties': {'Add': devices},
+            'Misc': {'Boot': {'PickerVariant': 'Default'}},
+            'UEFI': {'Drivers': drivers}
+        }
+
+
+    @staticmethod
+    def write_file(file, data):
+        """
+        Writes a synthetic file.
+
+        :param file: File path
+        :param data: File content
+        :return: Nothing
+        """
+        makedirs(path.dirname(file), exist_ok=True)
+        with open(file, 'wb') as f:
+            f.write(data)
+
+
+    @staticmethod
+    def zip(members):
+        """
+        Generates a synthetic release archive.
+
+        :param members: Dictionary of member names and contents
+        :return: Archive bytes
+        """
+        buffer = BytesIO()
+        with ZipFile(buffer, 'w', ZIP_DEFLATED) as zip:
+            for name, data in members.items():
+                zip.writestr(name, data)
+
+        return buffer.getvalue()
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Times the build stages against synthetic releases.')
+    parser.add_argument('--kexts', type=int, default=20, help='number of kexts installed')
+    parser.add_argument('--resources', type=int, default=1000, help='number of OcBinaryData resource files')
+    parser.add_argument('--properties', type=int, default=200, help='number of DeviceProperties devices')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs of each benchmark')
+    parser.add_argument('--only', nargs='*', help='benchmark names, like write_tree or copy_tree')
+    parser.add_argument('--directory', help='work directory, a temporary directory removed afterwards if omitted')
+    parser.add_argument('--output', help='results file, standard output if omitted')
+    arguments = parser.parse_args()
+
+    directory = arguments.directory or mkdtemp(prefix='opencore-benchmark-')
+    benchmark = BuildBenchmark(directory, arguments.kexts, arguments.resources, arguments.properties, arguments.repeat)
+    try:
+        results = benchmark.run(arguments.only)
+    finally:
+        if arguments.directory is None:
+            rmtree(directory)
+    if arguments.output:
+        with open(arguments.output, 'w') as f:
+            dump(results, f, indent=2, sort_keys=True)
+    else:
+        dump(results, stdout, indent=2, sort_keys=True)
+        print()
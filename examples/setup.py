@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 
 from opencore.build import OpenCoreBuild
+from opencore.cache import ArtifactCache
 
 
 if __name__ == '__main__':
     build = OpenCoreBuild('Volumes/EFI')
+    build.cache = ArtifactCache('files/cache')
     build.kexts = [
         {
             'project': 'ASPP-Override',
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+from hashlib import sha256
+from io import BytesIO
+from json import dump, load, loads
+from os import lstat, makedirs, path, replace, walk
+from tempfile import TemporaryFile, mkstemp
+from time import time
+from zipfile import BadZipfile, ZipFile
+
+from opencore.download import DownloadError, Downloader
+from opencore.host import HostProbe
+from opencore.sync import TreeSync
+
+
+class BinaryError(Exception):
+    """
+    BinaryError reports the OcBinaryData files could not be provided.
+    """
+
+
+class BinaryData:
+    """
+    BinaryData provides the OcBinaryData drivers and resources from a local content-addressed store.
+    """
+    ARCHIVE = 'https://github.com/acidanthera/OcBinaryData/archive/{0}.zip'
+    COMMITS = 'https://api.github.com/repos/acidanthera/OcBinaryData/commits/{0}'
+    FOLDERS = ['Drivers', 'Resources']
+
+
+    def __init__(self, directory='files/OcBinaryData', store='files/binary', revision=None, branch='master',
+                 ttl=86400, offline=False, downloader=None, host=None):
+        """
+        Constructs a new 'BinaryData' object.
+
+        :param directory: Path of the existing OcBinaryData checkout, used offline
+        :param store: Path of the content-addressed store
+        :param revision: Pinned commit hash, branch head revision if None
+        :param branch: Branch followed when revision is not pinned
+        :param ttl: Number of seconds a branch head revision is reused before refresh, never refreshed if None
+        :param offline: Use the existing checkout, without network access
+        :param downloader: Downloader object, a new one if None
+        :param host: HostProbe object used to read the checkout revision, a new one if None
+        :return: Nothing
+        """
+        self.branch = branch
+        self.directory = directory
+        self.downloader = downloader or Downloader()
+        self.entries = None
+        self.host = host or HostProbe()
+        self.offline = offline
+        self.revision = revision
+        self.store = store
+        self.ttl = ttl
+        self.used = None
+
+
+    def __getstate__(self):
+        """
+        Gets the pickled state, without the downloader connections.
+
+        :return: Dictionary of attributes
+        """
+        result = dict(self.__dict__)
+        result['downloader'] = None
+
+        return result
+
+
+    def __setstate__(self, state):
+        """
+        Restores the pickled state, with a new downloader.
+
+        :param state: Dictionary of attributes
+        :return: Nothing
+        """
+        self.__dict__.update(state)
+        self.downloader = Downloader()
+
+
+    def checkout(self):
+        """
+        Lists the files of the existing checkout.
+
+        :return: Dictionary of source file paths, keyed by path relative to OC directory
+        """
+        result = {}
+        for folder in self.FOLDERS:
+            source = path.join(self.directory, folder)
+            for root, _, files in walk(source):
+                for i in files:
+                    file = path.join(root, i)
+                    result[path.relpath(file, self.directory).replace(path.sep, '/')] = file
+        if not result:
+            raise BinaryError('{0}: checkout not found'.format(self.directory))
+
+        return result
+
+
+    def download(self, revision):
+        """
+        Downloads the revision archive and imports its files into store.
+
+        :param revision: Commit hash
+        :return: Dictionary of file digests, keyed by path relative to OC directory
+        """
+        with TemporaryFile() as buffer:
+            self.downloader.stream(self.ARCHIVE.format(revision), buffer)
+            try:
+                with ZipFile(buffer, 'r') as zip:
+                    result = self.import_archive(zip)
+            except BadZipfile as e:
+                raise BinaryError('{0}: {1}'.format(revision, e))
+        self.write_json('revisions/{0}.json'.format(revision), result)
+
+        return result
+
+
+    def import_archive(self, zip):
+        """
+        Imports the drivers and resources of a revision archive into store, writing only new objects.
+
+        :param zip: ZipFile object, files are located under a top level directory
+        :return: Dictionary of file digests, keyed by path relative to OC directory
+        """
+        result = {}
+        for i in zip.infolist():
+            parts = i.filename.split('/', 1)
+            if i.is_dir() or len(parts) < 2 or parts[1].split('/', 1)[0] not in self.FOLDERS:
+                continue
+            data = zip.read(i)
+            digest = sha256(data).hexdigest()
+            file = self.object(digest)
+            if not path.isfile(file):
+                makedirs(path.dirname(file), exist_ok=True)
+                descriptor, temp = mkstemp(dir=path.dirname(file))
+                with open(descriptor, 'wb') as f:
+                    f.write(data)
+                replace(temp, file)
+            result[parts[1]] = digest
+
+        return result
+
+
+    def latest(self):
+        """
+        Gets the branch head revision, refreshing the recorded revision once expired.
+        An expired revision is still used, when the branch head cannot be fetched.
+
+        :return: Commit hash or None if not available
+        """
+        state = self.read_json('state.json') or {}
+        entry = state.get(self.branch)
+        if entry is not None and (self.ttl is None or time() - entry['fetched'] < self.ttl):
+            return entry['revision']
+        buffer = BytesIO()
+        try:
+            self.downloader.stream(self.COMMITS.format(self.branch), buffer)
+            revision = loads(buffer.getvalue().decode('UTF-8'))['sha']
+        except (DownloadError, ValueError, KeyError):
+            return entry['revision'] if entry is not None else None
+        state[self.branch] = {'fetched': time(), 'revision': revision}
+        self.write_json('state.json', state)
+
+        return revision
+
+
+    def materialize(self, destination, required=None):
+        """
+        Copies the provided files into OC directory, only when changed.
+
+        :param destination: Path of the OC directory
+        :param required: Function verifying if a file is required, like 'TreePruner.required', all files if None
+        :return: Dictionary of counters
+        """
+        if self.entries is None:
+            self.prepare()
+        counters = {'bytes': 0, 'copied': 0, 'skipped': 0, 'unchanged': 0}
+        sync = TreeSync()
+        for name, source in sorted(self.entries.items()):
+            if required is not None and not required(name):
+                counters['skipped'] += 1
+                continue
+            file = path.join(destination, name)
+            status = lstat(source)
+            try:
+                current = lstat(file)
+            except FileNotFoundError:
+                current = None
+            if not sync.changed(source, file, status, current):
+                counters['unchanged'] += 1
+                continue
+            makedirs(path.dirname(file), exist_ok=True)
+            sync.copy_file(source, file, status)
+            counters['bytes'] += status.st_size
+            counters['copied'] += 1
+
+        return counters
+
+
+    def object(self, digest):
+        """
+        Generates the store path of an object.
+
+        :param digest: Hexadecimal sha256 digest string
+        :return: Object file path
+        """
+        return path.join(self.store, 'objects', digest[:2], digest)
+
+
+    def prepare(self):
+        """
+        Resolves the provided revision, downloading it only when missing from store.
+        The existing checkout is used offline, when it matches the revision or when the revision cannot be downloaded.
+
+        :return: Provision status
+        """
+        revision = None if self.offline else self.revision or self.latest()
+        digests = self.read_json('revisions/{0}.json'.format(revision)) if revision is not None else None
+        status = 'cached'
+        if digests is not None and not all(path.isfile(self.object(i)) for i in digests.values()):
+            digests = None
+        if digests is None and revision is not None and self.host.git_revision(self.directory) != revision:
+            try:
+                digests = self.download(revision)
+                status = 'downloaded'
+            except (BinaryError, DownloadError):
+                pass
+        if digests is None:
+            self.entries = self.checkout()
+            self.used = self.host.git_revision(self.directory)
+            return 'local' if revision is not None and self.used == revision else 'offline'
+        self.entries = {k: self.object(v) for k, v in digests.items()}
+        self.used = revision
+
+        return status
+
+
+    def read_json(self, name):
+        """
+        Reads a store file.
+
+        :param name: File path relative to store
+        :return: Decoded file content or None if not found
+        """
+        try:
+            with open(path.join(self.store, name), 'r') as f:
+                return load(f)
+        except (OSError, ValueError):
+            return None
+
+
+    def write_json(self, name, value):
+        """
+        Writes a store file atomically.
+
+        :param name: File path relative to store
+        :param value: Content to encode
+        :return: Nothing
+        """
+        file = path.join(self.store, name)
+        makedirs(path.dirname(file), exist_ok=True)
+        descriptor, temp = mkstemp(dir=path.dirname(file))
+        with open(descriptor, 'w') as f:
+            dump(value, f, indent=2, sort_keys=True)
+        replace(temp, file)
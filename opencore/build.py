@@ -1,17 +1,46 @@
 #!/usr/bin/env python3
 
-from binascii import Error, unhexlify
-from collections import Mapping
-from distutils.version import LooseVersion
-from glob import glob
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
 from io import BytesIO
-from os import chmod, listdir, makedirs, path, remove, stat, walk
-from plistlib import dump, FMT_XML
-from shutil import copy2, rmtree
-from subprocess import CalledProcessError, check_output
-from urllib.request import URLError, urlretrieve
+from os import chmod, makedirs, path, walk
+from plistlib import load
+from shutil import copyfileobj, rmtree
 from zipfile import BadZipfile, ZipFile
 
+from opencore.binary import BinaryData
+from opencore.cache import ArtifactCache
+from opencore.download import Downloader
+from opencore.fixup import TreeFixup
+from opencore.hexdata import HexDecoder
+from opencore.host import HostProbe
+from opencore.kext import KextIndex
+from opencore.manifest import BuildManifest
+from opencore.merge import SettingsMerger
+from opencore.patch import PatchVerifier
+from opencore.plist import PlistWriter
+from opencore.prune import TreePruner
+from opencore.report import BuildReport
+from opencore.schema import DefaultSchema
+from opencore.sync import TreeSync
+from opencore.util import hash_file, hash_settings
+from opencore.validate import ConfigValidator
+
+
+class InstallError(Exception):
+    """
+    InstallError reports the components failed to install.
+    """
+    def __init__(self, errors):
+        """
+        Constructs a new 'InstallError' object.
+
+        :param errors: Dictionary of component names and exceptions
+        :return: Nothing
+        """
+        self.errors = errors
+        super().__init__(', '.join('{0}: {1}'.format(k, v) for k, v in errors.items()))
+
 
 class OpenCoreBuild:
     """
@@ -24,366 +53,76 @@ class OpenCoreBuild:
         :param directory: Path of the build directory
         :return: Nothing
         """
+        self.binary = BinaryData()
+        self.bundles = KextIndex()
+        self.cache = None
+        self.decoder = HexDecoder()
         self.directory = directory
+        self.downloader = Downloader()
+        self.host = HostProbe()
+        self.incremental = False
         self.kexts = []
+        self.lock = None
+        self.manifest = None
+        self.merger = SettingsMerger()
         self.patches = []
-        self.settings = {
-            'ACPI': {
-                'Add': [],
-                'Delete': [],
-                'Patch': [],
-                'Quirks': {
-                    'FadtEnableReset': False,
-                    'NormalizeHeaders': False,
-                    'RebaseRegions': False,
-                    'ResetHwSig': False,
-                    'ResetLogoStatus': False,
-                    'SyncTableIds': False
-                }
-            },
-            'Booter': {
-                'MmioWhitelist': [],
-                'Patch': [],
-                'Quirks': {
-                    'AllowRelocationBlock': False,
-                    'AvoidRuntimeDefrag': False,
-                    'DevirtualiseMmio': False,
-                    'DisableSingleUser': False,
-                    'DisableVariableWrite': False,
-                    'DiscardHibernateMap': False,
-                    'EnableSafeModeSlide': False,
-                    'EnableWriteUnprotector': False,
-                    'FixupAppleEfiImages': False,
-                    'ForceBooterSignature': False,
-                    'ForceExitBootServices': False,
-                    'ProtectMemoryRegions': False,
-                    'ProtectSecureBoot': True,
-                    'ProtectUefiServices': False,
-                    'ProvideCustomSlide': False,
-                    'ProvideMaxSlide': 0,
-                    'RebuildAppleMemoryMap': False,
-                    'ResizeAppleGpuBars': -1,
-                    'SetupVirtualMap': False,
-                    'SignalAppleOS': False,
-                    'SyncRuntimePermissions': False
-                }
-            },
-            'DeviceProperties': {
-                'Add': {},
-                'Delete': {}
-            },
-            'Kernel': {
-                'Add': [],
-                'Block': [],
-                'Emulate': {
-                    'Cpuid1Data': b'',
-                    'Cpuid1Mask': b'',
-                    'DummyPowerManagement': False,
-                    'MaxKernel': '',
-                    'MinKernel': ''
-                },
-                'Force': [],
-                'Patch': [],
-                'Quirks': {
-                    'AppleCpuPmCfgLock': False,
-                    'AppleXcpmCfgLock': False,
-                    'AppleXcpmExtraMsrs': False,
-                    'AppleXcpmForceBoost': False,
-                    'CustomPciSerialDevice': False,
-                    'CustomSMBIOSGuid': False,
-                    'DisableIoMapper': False,
-                    'DisableIoMapperMapping': False,
-                    'DisableLinkeditJettison': False,
-                    'DisableRtcChecksum': False,
-                    'ExtendBTFeatureFlags': False,
-                    'ExternalDiskIcons': False,
-                    'ForceAquantiaEthernet': False,
-                    'ForceSecureBootScheme': False,
-                    'IncreasePciBarSize': False,
-                    'LapicKernelPanic': False,
-                    'LegacyCommpage': False,
-                    'PanicNoKextDump': False,
-                    'PowerTimeoutKernelPanic': False,
-                    'ProvideCurrentCpuInfo': False,
-                    'SetApfsTrimTimeout': -1,
-                    'ThirdPartyDrives': False,
-                    'XhciPortLimit': False
-                },
-                'Scheme': {
-                    'CustomKernel': False,
-                    'FuzzyMatch': False,
-                    'KernelArch': 'Auto',
-                    'KernelCache': 'Auto'
-                }
-            },
-            'Misc': {
-                'BlessOverride': [],
-                'Boot': {
-                    'ConsoleAttributes': 0,
-                    'HibernateMode': 'None',
-                    'HibernateSkipsPicker': False,
-                    'HideAuxiliary': False,
-                    'InstanceIdentifier': '',
-                    'LauncherOption': 'Disabled',
-                    'LauncherPath': 'Default',
-                    'PickerAttributes': 0,
-                    'PickerAudioAssist': False,
-                    'PickerMode': 'Builtin',
-                    'PickerVariant': 'Auto',
-                    'PollAppleHotKeys': False,
-                    'ShowPicker': True,
-                    'TakeoffDelay': 0,
-                    'Timeout': 5
-                },
-                'Debug': {
-                    'AppleDebug': False,
-                    'ApplePanic': False,
-                    'DisableWatchDog': False,
-                    'DisplayDelay': 0,
-                    'DisplayLevel': 0,
-                    'LogModules': '*',
-                    'SysReport': False,
-                    'Target': 0
-                },
-                'Entries': [],
-                'Security': {
-                    'AllowSetDefault': False,
-                    'ApECID': 0,
-                    'AuthRestart': False,
-                    'BlacklistAppleUpdate': False,
-                    'DmgLoading': 'Signed',
-                    'EnablePassword': False,
-                    'ExposeSensitiveData': 6,
-                    'HaltLevel': 2147483648,
-                    'PasswordHash': b'',
-                    'PasswordSalt': b'',
-                    'ScanPolicy': 17760515,
-                    'SecureBootModel': 'Default',
-                    'Vault': 'Secure'
-                },
-                'Serial': {
-                    'Init': False,
-                    'Override': False
-                },
-                'Tools': []
-            },
-            'NVRAM': {
-                'Add': {},
-                'Delete': {},
-                'LegacyOverwrite': False,
-                'LegacySchema': {},
-                'WriteFlash': False
-            },
-            'PlatformInfo': {
-                'Automatic': False,
-                'CustomMemory': False,
-                'DataHub': {
-                    'ARTFrequency': 0,
-                    'BoardProduct': '',
-                    'BoardRevision': b'',
-                    'DevicePathsSupported': 0,
-                    'FSBFrequency': 0,
-                    'InitialTSC': 0,
-                    'PlatformName': '',
-                    'SmcBranch': b'',
-                    'SmcPlatform': b'',
-                    'SmcRevision': b'',
-                    'StartupPowerEvents': 0,
-                    'SystemProductName': '',
-                    'SystemSerialNumber': '',
-                    'SystemUUID': ''
-                },
-                'Generic': {
-                    'AdviseFeatures': False,
-                    'MaxBIOSVersion': False,
-                    'MLB': '',
-                    'ProcessorType': 0,
-                    'ROM': b'',
-                    'SpoofVendor': False,
-                    'SystemMemoryStatus': 'Auto',
-                    'SystemProductName': '',
-                    'SystemSerialNumber': '',
-                    'SystemUUID': ''
-                },
-                'Memory': {
-                    'DataWidth': 0,
-                    'Devices': [],
-                    'ErrorCorrection': 3,
-                    'FormFactor': 2,
-                    'MaxCapacity': 0,
-                    'TotalWidth': 0,
-                    'Type': 2,
-                    'TypeDetail': 4
-                },
-                'PlatformNVRAM': {
-                    'BID': '',
-                    'FirmwareFeatures': b'',
-                    'FirmwareFeaturesMask': b'',
-                    'MLB': '',
-                    'ROM': b'',
-                    'SystemSerialNumber': '',
-                    'SystemUUID': ''
-                },
-                'SMBIOS': {
-                    'BIOSReleaseDate': '',
-                    'BIOSVendor': '',
-                    'BIOSVersion': '',
-                    'BoardAssetTag': '',
-                    'BoardLocationInChassis': '',
-                    'BoardManufacturer': '',
-                    'BoardProduct': '',
-                    'BoardSerialNumber': '',
-                    'BoardType': 0,
-                    'BoardVersion': '',
-                    'ChassisAssetTag': '',
-                    'ChassisManufacturer': '',
-                    'ChassisSerialNumber': '',
-                    'ChassisType': 0,
-                    'ChassisVersion': '',
-                    'FirmwareFeatures': b'',
-                    'FirmwareFeaturesMask': b'',
-                    'PlatformFeature': -1,
-                    'ProcessorType': 0,
-                    'SmcVersion': b'',
-                    'SystemFamily': '',
-                    'SystemManufacturer': '',
-                    'SystemProductName': '',
-                    'SystemSKUNumber': '',
-                    'SystemSerialNumber': '',
-                    'SystemUUID': '',
-                    'SystemVersion': ''
-                },
-                'UpdateDataHub': False,
-                'UpdateNVRAM': False,
-                'UpdateSMBIOS': False,
-                'UpdateSMBIOSMode': 'Create',
-                'UseRawUuidEncoding': False
-            },
-            'UEFI': {
-                'APFS': {
-                    'EnableJumpstart': False,
-                    'GlobalConnect': False,
-                    'HideVerbose': False,
-                    'JumpstartHotPlug': False,
-                    'MinDate': 0,
-                    'MinVersion': 0
-                },
-                'AppleInput': {
-                    'AppleEvent': 'Auto',
-                    'CustomDelays': False,
-                    'KeyInitialDelay': 50,
-                    'KeySubsequentDelay': 5,
-                    'GraphicsInputMirroring': False,
-                    'PointerPollMask': -1,
-                    'PointerPollMax': 0,
-                    'PointerPollMin': 0,
-                    'PointerSpeedDiv': 1,
-                    'PointerSpeedMul': 1,
-                    'PointerDwellClickTimeout': 0,
-                    'PointerDwellDoubleClickTimeout': 0,
-                    'PointerDwellRadius': 0
-                },
-                'Audio': {
-                    'AudioCodec': 0,
-                    'AudioDevice': '',
-                    'AudioOutMask': -1,
-                    'AudioSupport': False,
-                    'DisconnectHda': False,
-                    'MaximumGain': -15,
-                    'MinimumAssistGain': -30,
-                    'MinimumAudibleGain': -128,
-                    'PlayChime': 'Auto',
-                    'ResetTrafficClass': False,
-                    'SetupDelay': 0
-                },
-                'ConnectDrivers': False,
-                'Drivers': [],
-                'Input': {
-                    'KeyFiltering': False,
-                    'KeyForgetThreshold': 0,
-                    'KeySupport': False,
-                    'KeySupportMode': 'Auto',
-                    'KeySwap': False,
-                    'PointerSupport': False,
-                    'PointerSupportMode': '',
-                    'TimerResolution': 0
-                },
-                'Output': {
-                    'ClearScreenOnModeSwitch': False,
-                    'ConsoleFont': '',
-                    'ConsoleMode': '',
-                    'DirectGopRendering': False,
-                    'ForceResolution': False,
-                    'GopBurstMode': False,
-                    'GopPassThrough': 'Disabled',
-                    'IgnoreTextInGraphics': False,
-                    'InitialMode': 'Auto',
-                    'ProvideConsoleGop': False,
-                    'ReconnectGraphicsOnConnect': False,
-                    'ReconnectOnResChange': False,
-                    'ReplaceTabWithSpace': False,
-                    'Resolution': '',
-                    'SanitiseClearScreen': False,
-                    'TextRenderer': 'BuiltinGraphics',
-                    'UIScale': 0,
-                    'TextRenderer': 'BuiltinGraphics',
-                    'UgaPassThrough': False
-                },
-                'ProtocolOverrides': {
-                    'AppleAudio': False,
-                    'AppleBootPolicy': False,
-                    'AppleDebugLog': False,
-                    'AppleEg2Info': False,
-                    'AppleFramebufferInfo': False,
-                    'AppleImageConversion': False,
-                    'AppleImg4Verification': False,
-                    'AppleKeyMap': False,
-                    'AppleRtcRam': False,
-                    'AppleSecureBoot': False,
-                    'AppleSmcIo': False,
-                    'AppleUserInterfaceTheme': False,
-                    'DataHub': False,
-                    'DeviceProperties': False,
-                    'FirmwareVolume': False,
-                    'HashServices': False,
-                    'OSInfo': False,
-                    'PciIo': False,
-                    'UnicodeCollation': False
-                },
-                'Quirks': {
-                    'ActivateHpetSupport': False,
-                    'EnableVectorAcceleration': False,
-                    'EnableVmx': False,
-                    'DisableSecurityPolicy': False,
-                    'ExitBootServicesDelay': 0,
-                    'ForceOcWriteFlash': False,
-                    'ForgeUefiSupport': False,
-                    'IgnoreInvalidFlexRatio': False,
-                    'ReleaseUsbOwnership': False,
-                    'ReloadOptionRoms': False,
-                    'RequestBootVarRouting': False,
-                    'ResizeGpuBars': -1,
-                    'ResizeUsePciRbIo': False,
-                    'ShimRetainProtocol': False,
-                    'TscSyncTimeout': 0,
-                    'UnblockFsConnect': False
-                },
-                'ReservedMemory': []
-            }
-        }
+        self.pipeline = None
+        self.prune = False
+        self.releases = None
+        self.report = BuildReport()
+        self.schema = DefaultSchema()
+        self.settings = None
+        self.sync = TreeSync()
+        self.up_to_date = False
         self.version = '0.9.7'
+        self.workers = 4
+
+
+    def check_plist(self):
+        """
+        Validates the generated configuration file, reporting its issues.
+
+        :return: List of issues
+        """
+        file = '{0}/EFI/OC/config.plist'.format(self.directory)
+        if not path.isfile(file):
+            return []
+        self.report.step('validating config.plist')
+        result = self.validate_plist(file)
+        self.report.status('OK' if not result else 'FAILED')
+        for i in result:
+            self.report.detail('{0}: {1}'.format(i.path, i.message))
+
+        return result
+
+
+    def commit_manifest(self):
+        """
+        Applies the incremental build changes to build directory.
+
+        :return: Nothing
+        """
+        if self.manifest is not None:
+            self.report.step('applying build changes')
+            with self.report.span('commit'):
+                changed = self.manifest.commit()
+            self.manifest = None
+            self.report.status('OK' if changed else 'OK (unchanged)')
 
 
     def configure_kexts(self, kexts=[]):
         """
-        Inserts kexts into kernel 'Add' data settings.
+        Inserts kexts into kernel 'Add' data settings, ordered by their bundle dependencies.
 
         :param kexts: List of kext properties to be applied
         :return: List of dictionaries
         """
         result = []
         if kexts:
+            directory = '{0}/EFI/OC/Kexts'.format(self.directory)
+            items = []
             for i in kexts:
+                metadata = self.bundles.metadata(i['project'], directory)
                 properties = {
                     'Arch': 'x86_64',
                     'BundlePath': '{0}.kext'.format(i['project']),
@@ -394,10 +133,15 @@ class OpenCoreBuild:
                     'MinKernel': '',
                     'PlistPath': 'Contents/Info.plist'
                 }
+                if metadata is not None:
+                    properties['BundlePath'] = metadata['bundle']
+                    properties['ExecutablePath'] = metadata['executable']
                 if 'properties' in i:
                     for key, value in i['properties'].items():
                         properties[key] = value
-                result.append(properties)
+                items.append((properties, metadata))
+            for level in KextIndex.levels(items):
+                result.extend(level)
 
         return result
 
@@ -443,72 +187,260 @@ class OpenCoreBuild:
         :param destination: Destination path
         :return: Nothing
         """
-        if not path.exists(destination):
-            makedirs(destination)
-        for item in listdir(source):
-            s = path.join(source, item)
-            d = path.join(destination, item)
-            if path.isdir(s):
-                self.copy_tree(s, d)
-            else:
-                if not path.exists(d) or stat(s).st_mtime - stat(d).st_mtime > 1:
-                    copy2(s, d)
+        if self.manifest is not None:
+            for root, _, files in walk(source):
+                for i in files:
+                    s = path.join(root, i)
+                    d = path.join(destination, path.relpath(s, source))
+                    self.manifest.add_file(path.relpath(d, self.directory), s, source)
+            return
+        with self.report.span('copy'):
+            counters = self.sync.sync(source, destination)
+        self.report.count('copy.bytes', counters['bytes'])
+        self.report.count('copy.files', counters['copy'] + counters['link'])
+
+
+    def count_download(self, file, status):
+        """
+        Counts a fetched release file into build report.
+
+        :param file: Local file path or binary file object
+        :param status: Fetch status
+        :return: Nothing
+        """
+        if status not in ['downloaded', 'streamed']:
+            return
+        if isinstance(file, str):
+            size = path.getsize(file)
+        else:
+            size = file.seek(0, 2)
+            file.seek(0)
+        self.report.count('download.bytes', size)
+        self.report.count('download.files')
+
+
+    def default_settings(self):
+        """
+        Loads the default settings of configured OpenCore version.
+
+        :return: Dictionary of settings
+        """
+        return self.schema.load(self.version)
 
 
-    def extract_files(self, file, directory, local=False):
+    def extract_files(self, file, directory, local=False, include=None, exclude=None, rewrite=None, origin=None):
         """
         Extracts the contents of a zip file directly from Internet.
 
         :param file: File name
         :param directory: Directory name where file will be extracted
         :param local: Local file will be extracted
+        :param include: List of member patterns to extract, all members if None
+        :param exclude: List of member patterns to skip
+        :param rewrite: List of member prefix and replacement path tuples
+        :param origin: Tuple of release name and version, recorded into build manifest
         :return: Nothing
         """
         if not local:
-            try:
-                print('  - downloading component...', end=' ')
-                file, _ = urlretrieve(file)
-            except URLError:
-                raise
-            else:
-                print('OK')
+            self.report.step('downloading component')
+            with self.report.span('download'):
+                file, _, status = self.downloader.fetch(file)
+                self.count_download(file, status)
+            self.print_status(status)
+
+        self.report.step('building files structure')
+        manifest = self.manifest if origin is not None else None
+        if manifest is not None and manifest.unchanged(origin[0], hash_file(file), origin[1]):
+            self.report.count('extract.unchanged')
+            self.report.status('OK (unchanged)')
+            return
+        directories = set()
+        labels = {'project': origin[0]} if origin is not None else {}
+        with self.report.span('extract', **labels), ZipFile(file, 'r') as zip:
+            for member in zip.infolist():
+                name = member.filename
+                if member.is_dir() or name.startswith('/') or '..' in name.split('/'):
+                    continue
+                if include is not None and not any(fnmatchcase(name, i) for i in include):
+                    continue
+                if exclude is not None and any(fnmatchcase(name, i) for i in exclude):
+                    continue
+                for prefix, replacement in rewrite or []:
+                    if name.startswith(prefix):
+                        name = replacement + name[len(prefix):]
+                        break
+                target = path.join(directory, name)
+                self.report.count('extract.bytes', member.file_size)
+                self.report.count('extract.files')
+                if manifest is not None:
+                    relative = path.relpath(target, self.directory)
+                    if not relative.startswith('..'):
+                        with zip.open(member) as source:
+                            manifest.add(relative, source.read(), origin[0], origin[1])
+                        continue
+                parent = path.dirname(target)
+                if parent not in directories:
+                    makedirs(parent, exist_ok=True)
+                    directories.add(parent)
+                with zip.open(member) as source, open(target, 'wb') as destination:
+                    copyfileobj(source, destination, 1024 * 1024)
+                mode = member.external_attr >> 16 & 0o777
+                if mode:
+                    chmod(target, mode)
+        self.report.status('OK')
+
+
+    def extract_kext(self, file, origin=None):
+        """
+        Extracts the kext files structure.
 
-        print('  - building files structure...', end=' '),
-        with ZipFile(file, 'r') as zip:
-            zip.extractall(directory)
-        print('OK')
+        :param file: Kext release file
+        :param origin: Tuple of release name and version
+        :return: Nothing
+        """
+        directory = '{0}/EFI/OC/Kexts'.format(self.directory)
+        include = ['*.kext/*']
+        exclude = KextIndex.EXCLUDE
+        if origin is not None:
+            self.bundles.add(origin[0], file)
+        self.extract_files(file, directory, True, include, exclude, origin=origin)
 
 
-    def install_kext(self, repo, project, version, debug=False):
+    def fetch_kext(self, repo, project, version, debug=False, buffer=None):
         """
-        Builds the kext files structure.
+        Fetches the kext release file.
 
         :param repo: Repo name
         :param project: Project name
         :param version: Project version
-        :param debug: Install DEBUG release
-        :return: Nothing
+        :param debug: Fetch DEBUG release
+        :param buffer: Binary file object receiving a downloaded release, instead of a local file
+        :return: Tuple of local file path or buffer and fetch status
         """
-        directory = '{0}/EFI/OC/Kexts'.format(self.directory)
         release_type = 'DEBUG' if debug else 'RELEASE'
         release = '{0}-{1}-{2}.zip'.format(project, version, release_type)
-        url = 'https://github.com/{0}/{1}/releases'.format(repo, project)
+
+        return self.fetch_release(repo, project, version, release, release_type, buffer)
+
+
+    def fetch_release(self, repo, project, version, release, release_type, buffer=None):
+        """
+        Fetches a release file from local files, artifact cache or Internet.
+
+        :param repo: Repo name
+        :param project: Project name
+        :param version: Project version
+        :param release: Release file name
+        :param release_type: Release type
+        :param buffer: Binary file object receiving a downloaded release, instead of a local file
+        :return: Tuple of local file path or buffer and fetch status
+        """
         file = 'files/{0}'.format(release)
-        local = True
-        if not path.isfile(file):
-            file = '{0}/download/{1}/{2}'.format(url, version, release)
-            local = False
+        url = 'https://github.com/{0}/{1}/releases/download/{2}/{3}'.format(repo, project, version, release)
+        if self.releases is not None:
+            url = self.releases.url(repo, project, version, release)
+        key = ArtifactCache.key(repo, project, version, release_type)
+        if path.isfile(file):
+            url, status = file, 'local'
+        else:
+            file, status = self.cache.get(key) if self.cache is not None else None, 'cached'
+            if file is None:
+                with self.report.span('download', project=project):
+                    if buffer is not None:
+                        file, digest, status = buffer, self.downloader.stream(url, buffer), 'streamed'
+                    else:
+                        file, digest, status = self.downloader.fetch(url)
+                    self.count_download(file, status)
+                if self.cache is not None:
+                    stored = self.cache.put(key, file, move=True, digest=digest)
+                    file = stored if buffer is None else buffer
+        self.report.count('fetch.{0}'.format(status))
+        if self.lock is not None:
+            self.lock.component(project, version, url, file)
+
+        return file, status
+
+
+    def fix_permissions(self):
+        """
+        Normalizes the build directory permissions and strips extended attributes.
+
+        :return: Dictionary of counters
+        """
+        self.report.step('fixing file permissions')
+        with self.report.span('fixup'):
+            result = TreeFixup(workers=self.workers, host=self.host).run(self.directory)
+        for key, value in result.items():
+            self.report.count('fixup.{0}'.format(key), value)
+        changed = ', '.join('{0} {1}'.format(v, k) for k, v in sorted(result.items()) if v)
+        self.report.status('OK ({0})'.format(changed) if changed else 'OK')
+
+        return result
+
+
+    def host_kexts(self):
+        """
+        Gets the kexts required by the host processors.
+
+        :return: List of kext properties
+        """
+        if self.host.cpu_count() <= 15:
+            return []
+
+        return [
+            {
+                'project': 'AppleMCEReporterDisabler',
+                'properties': {
+                    'ExecutablePath': ''
+                },
+                'repo': 'acidanthera',
+                'version': '1.0.0'
+            }
+        ]
+
+
+    def install_kext(self, repo, project, version, debug=False):
+        """
+        Builds the kext files structure.
 
+        :param repo: Repo name
+        :param project: Project name
+        :param version: Project version
+        :param debug: Install DEBUG release
+        :return: Nothing
+        """
         self.print_bold('* {0} {1}'.format(project, version))
-        self.extract_files(file, directory, local)
-        for i in ['app', 'dsl', 'dSYM']:
-            try:
-                files = glob('{0}/*.{1}'.format(directory, i))
-            except OSError:
-                raise
-            else:
-                for j in files:
-                    remove(j) if i == 'dsl' else rmtree(j)
+        self.report.step('fetching component')
+        file, status = self.fetch_kext(repo, project, version, debug)
+        self.print_status(status)
+        self.extract_kext(file, (project, version))
+
+
+    def install_kexts(self, kexts, debug=False):
+        """
+        Builds the kexts files structure, while fetching them concurrently.
+
+        :param kexts: List of kext properties to be installed
+        :param debug: Install DEBUG releases
+        :return: Nothing
+        """
+        if self.pipeline is not None:
+            return self.pipeline.run(kexts, debug)
+        errors = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.fetch_kext, i['repo'], i['project'], i['version'], debug) for i in kexts]
+            for kext, future in zip(kexts, futures):
+                self.print_bold('* {0} {1}'.format(kext['project'], kext['version']))
+                self.report.step('fetching component')
+                try:
+                    file, status = future.result()
+                    self.print_status(status)
+                    self.extract_kext(file, (kext['project'], kext['version']))
+                except Exception as e:
+                    self.report.status('FAILED')
+                    errors[kext['project']] = e
+        if errors:
+            raise InstallError(errors)
 
 
     def install_opencore(self, version, debug=False):
@@ -521,49 +453,88 @@ class OpenCoreBuild:
         """
         release_type = 'DEBUG' if debug else 'RELEASE'
         release = 'OpenCore-{0}-{1}.zip'.format(version, release_type)
-        url = 'https://github.com/acidanthera/OpenCorePkg/releases'
-        file = 'files/{0}'.format(release)
-        local = True
-        if not path.isfile(file):
-            file = '{0}/download/{1}/{2}'.format(url, version, release)
-            local = False
 
         self.print_bold('* OpenCore {0}'.format(version))
-        if path.isdir(self.directory):
-            print('  - cleaning directory...', end=' ')
+        self.report.step('fetching component')
+        file, status = self.fetch_release('acidanthera', 'OpenCorePkg', version, release, release_type)
+        self.print_status(status)
+        self.schema.load(version, file)
+        if self.manifest is None and path.isdir(self.directory):
+            self.report.step('cleaning directory')
             rmtree(self.directory)
-            print('OK')
-        self.extract_files(file, self.directory, local)
-        print('  - cleaning directory...', end=' ')
-        source = '{0}/X64/EFI'.format(self.directory)
-        destination = '{0}/EFI'.format(self.directory)
-        self.copy_tree(source, destination)
-        copy2('{0}/Utilities//ocvalidate/ocvalidate'.format(self.directory), './')
-        chmod('./ocvalidate', 0o755)
-        for i in ['Docs', 'IA32', 'Utilities', 'X64']:
-            rmtree('{0}/{1}'.format(self.directory, i))
-        print('OK')
-
-        print('  - copying OcBinaryData files...', end=' ')
-        try:
-            check_output(['git', 'submodule', 'update', '--init', '--remote', '--merge'], encoding='UTF-8')
-        except CalledProcessError as e:
-            print(e.output)
-        source = 'files/OcBinaryData'
-        destination = '{0}/EFI/OC'.format(self.directory)
-        self.copy_tree('{0}/Drivers'.format(source), '{0}/Drivers'.format(destination))
-        self.copy_tree('{0}/Resources'.format(source), '{0}/Resources'.format(destination))
-        print('OK')
+            self.report.status('OK')
+        include = ['X64/EFI/*']
+        rewrite = [('X64/EFI/', 'EFI/')]
+        self.extract_files(file, self.directory, True, include, rewrite=rewrite, origin=('OpenCore', version))
+
+        self.report.step('fetching OcBinaryData files')
+        self.print_status(self.binary.prepare())
+        if self.manifest is not None or not self.prune:
+            self.write_binary_data()
 
 
     def print_bold(self, string):
         """
-        Prints bold text.
+        Prints bold text, through the report sinks.
 
         :param string: String to print in bold
         :return: Nothing
         """
-        print('\033[1m{0}\033[0m'.format(string))
+        self.report.heading(string)
+
+
+    def print_status(self, status):
+        """
+        Prints the fetch status, through the report sinks.
+
+        :param status: Fetch status
+        :return: Nothing
+        """
+        self.report.status('OK' if status == 'downloaded' else 'OK ({0})'.format(status))
+
+
+    def prune_tree(self, dry_run=False):
+        """
+        Removes the ACPI tables, drivers, tools and resources not referenced by settings.
+        Incremental builds move the pruned files aside, restoring them once referenced again.
+
+        :param dry_run: Report the files without removing them
+        :return: Dictionary of removed files list and bytes count
+        """
+        self.report.step('pruning unreferenced files')
+        pruner = TreePruner(self.settings)
+        manifest = BuildManifest(self.directory) if self.incremental and not dry_run else None
+        with self.report.span('prune'):
+            keep = None
+            if manifest is not None:
+                restored = manifest.restore(lambda i: i.startswith('EFI/OC/') and pruner.required(i[len('EFI/OC/'):]))
+                self.report.count('prune.restored', len(restored))
+                keep = '{0}/EFI/OC'.format(manifest.pruned)
+            result = pruner.run('{0}/EFI/OC'.format(self.directory), dry_run, keep)
+            if manifest is not None:
+                manifest.prune(['EFI/OC/{0}'.format(i) for i in result['files']])
+        self.report.count('prune.bytes', result['bytes'])
+        self.report.count('prune.files', len(result['files']))
+        self.report.status('OK ({0} files, {1} bytes)'.format(len(result['files']), result['bytes']))
+
+        return result
+
+
+    def resolve_versions(self):
+        """
+        Resolves the OpenCore and kext version specifiers into published versions.
+
+        :return: Nothing
+        """
+        if self.releases is None:
+            return
+        self.version = self.releases.resolve('acidanthera', 'OpenCorePkg', self.version)
+        kexts = []
+        for i in self.kexts:
+            kext = dict(i)
+            kext['version'] = self.releases.resolve(i['repo'], i['project'], i['version'])
+            kexts.append(kext)
+        self.kexts = kexts
 
 
     def run_misc_tasks(self):
@@ -573,26 +544,24 @@ class OpenCoreBuild:
         :return: Nothing
         """
         self.print_bold('* Miscellaneous Tasks')
-        print('  - fixing file permissions...', end=' ')
-        for root, directories, files in walk(self.directory):
-            for i in directories:
-                chmod(path.join(root, i), 0o755)
-            for j in files:
-                if j == '.DS_Store':
-                    remove(path.join(root, j))
-                chmod(path.join(root, j), 0o644)
-        try:
-            check_output(['xattr', '-rc', self.directory], encoding='UTF-8')
-        except CalledProcessError as e:
-            print(e.output)
-        print('OK')
-        file = '{0}/EFI/OC/config.plist'.format(self.directory)
-        if path.isfile(file) and LooseVersion(self.version) > LooseVersion('0.6.5'):
-            print('  - validating config.plist...')
-            try:
-                print(check_output(['./ocvalidate', file], encoding='UTF-8'))
-            except CalledProcessError as e:
-                print(e.output)
+        self.fix_permissions()
+        self.check_plist()
+        self.report.finish(self.stats())
+
+
+    def stats(self):
+        """
+        Reports the build components statistics.
+
+        :return: Dictionary of statistics, keyed by component name
+        """
+        result = {'downloads': self.downloader.stats(), 'hexdata': dict(self.decoder.counters)}
+        if self.cache is not None:
+            result['cache'] = self.cache.stats()
+        if self.releases is not None:
+            result['releases'] = self.releases.stats()
+
+        return result
 
 
     def unhexlify(self, string):
@@ -600,38 +569,103 @@ class OpenCoreBuild:
         Transforms the binary data represented by the hexadecimal string.
 
         :param string: String to transform
-        :return: Base64 data
+        :return: Base64 data, shared with identical data
         """
-        try:
-            result = unhexlify(''.join(string.split()))
-        except Error:
-            raise
-
-        return bytes(result)
+        return self.decoder.decode(string)
 
 
     def update_settings(self, result, settings):
         """
-        Updates existing settings with new settings.
+        Merges new settings and configured kexts and patches over existing settings, without mutating them.
 
         :param result: Default settings
         :param settings: Settings to update
         :return: Dictionary of settings
         """
-        for key, value in iter(settings.items()):
-            if key == 'Kernel':
-                kexts = self.configure_kexts(self.kexts)
-                settings[key].update({'Add': kexts})
-                patches = self.configure_patches(self.patches)
-                settings[key].update({'Patch': patches})
-            if isinstance(value, Mapping):
-                result[key] = self.update_settings(result.get(key, {}), value)
-            else:
-                result[key] = value
+        kernel = {
+            'Kernel': {
+                'Add': self.configure_kexts(self.kexts),
+                'Patch': self.configure_patches(self.patches)
+            }
+        }
+
+        return self.merger.merge(result, settings, kernel)
+
+
+    def validate_plist(self, file):
+        """
+        Validates the OpenCore configuration file against the default settings schema.
+
+        :param file: Configuration file path
+        :return: List of issues
+        """
+        with self.report.span('validate'):
+            with open(file, 'rb') as f:
+                settings = load(f)
+            validator = ConfigValidator(self.default_settings(), self.directory, self.version)
+            result = validator.validate(settings)
+        self.report.count('validate.issues', len(result))
 
         return result
 
 
+    def verify_patches(self, file, symbols=None):
+        """
+        Verifies the kernel patches against a kernel or kext binary, before booting it.
+
+        :param file: Kernel or kext binary path
+        :param symbols: Dictionary of symbol names and file offsets, used by patches having a 'Base'
+        :return: List of patch results
+        """
+        return PatchVerifier().verify(file, self.configure_patches(self.patches), symbols)
+
+
+    def with_host_kexts(self, kexts):
+        """
+        Prepends the kexts required by the host processors, unless already listed.
+
+        :param kexts: List of kext properties
+        :return: List of kext properties
+        """
+        projects = {i['project'] for i in kexts}
+
+        return [i for i in self.host_kexts() if i['project'] not in projects] + list(kexts)
+
+
+    def write_binary_data(self, required=None):
+        """
+        Copies the OcBinaryData drivers and resources.
+
+        :param required: Function verifying if a file is required, all files if None
+        :return: Nothing
+        """
+        self.report.step('copying OcBinaryData files')
+        destination = '{0}/EFI/OC'.format(self.directory)
+        if self.manifest is not None:
+            for name, source in sorted(self.binary.entries.items()):
+                if required is None or required(name):
+                    self.manifest.add_file('EFI/OC/{0}'.format(name), source, 'OcBinaryData', self.binary.used or '')
+            self.report.status('OK')
+            return
+        with self.report.span('copy'):
+            counters = self.binary.materialize(destination, required)
+        self.report.count('copy.bytes', counters['bytes'])
+        self.report.count('copy.files', counters['copied'])
+        self.report.status('OK ({0} copied, {1} unchanged)'.format(counters['copied'], counters['unchanged']))
+
+
+    def write_components(self, debug=False):
+        """
+        Installs the OpenCore and kext components.
+
+        :param debug: Install DEBUG release
+        :return: Nothing
+        """
+        with self.report.span('components'):
+            self.install_opencore(self.version, debug)
+            self.install_kexts(self.kexts, debug)
+
+
     def write_plist(self, settings):
         """
         Generates the OpenCore configuration file.
@@ -639,44 +673,65 @@ class OpenCoreBuild:
         :param settings: Settings to be updated
         :return: Nothing
         """
+        if self.settings is None:
+            self.settings = self.default_settings()
         try:
-            self.update_settings(self.settings, settings)
+            self.settings = self.update_settings(self.settings, settings)
         except KeyError:
             raise
         else:
             self.print_bold('* OpenCore Configuration')
-            print('  - generating config.plist...', end=' ')
+            self.report.step('generating config.plist')
             directory = '{0}/EFI/OC'.format(self.directory)
             file = '{0}/config.plist'.format(directory)
-            if not path.isdir(directory):
-                makedirs(directory)
-            with open(file, 'wb') as plist:
-                dump(self.settings, plist, fmt=FMT_XML, sort_keys=True)
-            try:
-                check_output(['plutil', '-convert', 'xml1', file], encoding='UTF-8')
-            except CalledProcessError as e:
-                print(e.output)
-            print('OK')
+            digest = hash_settings(self.settings) if self.lock is not None else None
+            if self.up_to_date and digest == self.lock.locked.get('settings') and path.isfile(file):
+                self.report.status('OK (unchanged)')
+                return
+            with self.report.span('plist'):
+                written = PlistWriter().write(self.settings, file)
+            if written:
+                self.report.count('plist.bytes', path.getsize(file))
+            self.report.status('OK' if written else 'OK (unchanged)')
+            if self.prune:
+                if not self.incremental:
+                    self.write_binary_data(TreePruner(self.settings).required)
+                self.prune_tree()
+            if self.lock is not None and self.lock.inputs is not None:
+                self.lock.write_lock(digest, self.directory)
 
 
     def write_tree(self, debug=False):
         """
         Generates the OpenCore files structure.
+        The kexts required by the host processors are prepended to kexts, before verifying the lockfile.
+        Incremental builds failing to install a component leave the build directory untouched.
 
         :param debug: Install DEBUG release
         :return: Nothing
         """
-        self.install_opencore(self.version, debug)
-        cpu_count = check_output(['sysctl', '-n', 'hw.ncpu'], encoding='UTF-8')
-        if int(cpu_count) > 15:
-            kext = {
-                'project': 'AppleMCEReporterDisabler',
-                'properties': {
-                    'ExecutablePath': ''
-                },
-                'repo': 'acidanthera',
-                'version': '1.0.0'
+        self.up_to_date = False
+        self.kexts = self.with_host_kexts(self.kexts)
+        if self.lock is not None:
+            inputs = {
+                'debug': debug,
+                'kexts': [[i['repo'], i['project'], i['version']] for i in self.kexts],
+                'version': self.version
             }
-            self.kexts.insert(0, kext)
-        for i in self.kexts:
-            self.install_kext(i['repo'], i['project'], i['version'], debug)
+            if self.lock.unchanged(inputs, self.directory):
+                self.print_bold('* OpenCore {0}'.format(self.version))
+                self.report.step('verifying lockfile')
+                self.report.status('OK (unchanged)')
+                self.up_to_date = True
+                return
+        self.resolve_versions()
+        if self.incremental:
+            self.manifest = BuildManifest(self.directory)
+        try:
+            self.write_components(debug)
+        except BaseException:
+            if self.manifest is not None:
+                self.manifest.discard()
+                self.manifest = None
+            raise
+        self.commit_manifest()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+from contextlib import contextmanager
+from json import dump, dumps, load
+from os import SEEK_END, close, makedirs, path, remove, replace
+from shutil import copyfile, copyfileobj
+from tempfile import mkstemp
+from threading import RLock
+from time import time
+
+from opencore.util import hash_file, lock_file
+
+
+class ArtifactCache:
+    """
+    ArtifactCache stores release archives into a content-addressed local cache.
+    """
+    def __init__(self, directory, size=2 * 1024 ** 3):
+        """
+        Constructs a new 'ArtifactCache' object.
+
+        :param directory: Path of the cache directory
+        :param size: Maximum cache size in bytes
+        :return: Nothing
+        """
+        self.directory = directory
+        self.size = size
+        self.counters = {'hits': 0, 'misses': 0, 'bytes_saved': 0}
+        self.lock = RLock()
+        self.index = self.read_index()
+
+
+    def __getstate__(self):
+        """
+        Gets the pickled state, without the lock.
+
+        :return: Dictionary of attributes
+        """
+        result = dict(self.__dict__)
+        result['lock'] = None
+
+        return result
+
+
+    def __setstate__(self, state):
+        """
+        Restores the pickled state, with a new lock and the current cache index.
+
+        :param state: Dictionary of attributes
+        :return: Nothing
+        """
+        self.__dict__.update(state)
+        self.lock = RLock()
+        self.index = self.read_index()
+
+
+    def digest(self, key):
+        """
+        Gets the recorded sha256 digest of a cached archive.
+
+        :param key: Archive key
+        :return: Hexadecimal digest string or None
+        """
+        entry = self.index.get(key)
+
+        return entry['sha256'] if entry else None
+
+
+    def evict(self, keep=None):
+        """
+        Evicts least recently used archives, until cache fits into size limit.
+
+        :param keep: Archive key never evicted, like the key just stored
+        :return: List of evicted keys
+        """
+        result = []
+        with self.lock:
+            entries = sorted(self.index.items(), key=lambda i: i[1]['accessed'])
+            for key, entry in entries:
+                if self.total_size() <= self.size:
+                    break
+                if key == keep:
+                    continue
+                self.remove(key)
+                result.append(key)
+
+        return result
+
+
+    def get(self, key):
+        """
+        Gets the cached archive path, after verifying its integrity.
+
+        :param key: Archive key
+        :return: Archive path or None
+        """
+        with self.transaction():
+            entry = self.index.get(key)
+            if entry is not None:
+                file = self.object_path(entry['sha256'])
+                if path.isfile(file) and hash_file(file) == entry['sha256']:
+                    entry['accessed'] = time()
+                    self.counters['hits'] += 1
+                    self.counters['bytes_saved'] += entry['size']
+                    return file
+                self.remove(key)
+            self.counters['misses'] += 1
+
+        return None
+
+
+    @staticmethod
+    def key(repo, project, version, release_type):
+        """
+        Generates the archive key.
+
+        :param repo: Repo name
+        :param project: Project name
+        :param version: Project version
+        :param release_type: Release type
+        :return: Key string
+        """
+        return '{0}/{1}/{2}/{3}'.format(repo, project, version, release_type)
+
+
+    def object_path(self, digest):
+        """
+        Generates the content-addressed path of an archive.
+
+        :param digest: Archive sha256 digest
+        :return: Archive path
+        """
+        return '{0}/objects/{1}/{2}'.format(self.directory, digest[:2], digest)
+
+
+    def put(self, key, file, move=False, digest=None):
+        """
+        Stores an archive into cache, an archive larger than cache size limit is not stored.
+
+        :param key: Archive key
+        :param file: Archive path or binary file object
+        :param move: Move the archive into cache, instead of copying it
+        :param digest: Archive sha256 digest, computed if None
+        :return: Cached archive path, or archive path or binary file object if not stored
+        """
+        if isinstance(file, str):
+            size = path.getsize(file)
+        else:
+            size = file.seek(0, SEEK_END)
+            file.seek(0)
+        if size > self.size:
+            return file
+        digest = digest or hash_file(file)
+        result = self.object_path(digest)
+        with self.transaction():
+            if not path.isfile(result):
+                makedirs(path.dirname(result), exist_ok=True)
+                descriptor, temp = mkstemp(dir=path.dirname(result))
+                close(descriptor)
+                if not isinstance(file, str):
+                    file.seek(0)
+                    with open(temp, 'wb') as f:
+                        copyfileobj(file, f, 1024 * 1024)
+                    file.seek(0)
+                elif move:
+                    replace(file, temp)
+                else:
+                    copyfile(file, temp)
+                replace(temp, result)
+            elif move and isinstance(file, str):
+                remove(file)
+            self.index[key] = {
+                'accessed': time(),
+                'sha256': digest,
+                'size': path.getsize(result)
+            }
+            self.evict(key)
+
+        return result
+
+
+    def read_index(self):
+        """
+        Reads the cache index.
+
+        :return: Dictionary of cache entries
+        """
+        file = '{0}/index.json'.format(self.directory)
+        try:
+            with open(file, 'r') as f:
+                result = load(f)
+        except (OSError, ValueError):
+            result = {}
+
+        return result
+
+
+    def remove(self, key):
+        """
+        Removes an archive from cache, once no other key references it.
+
+        :param key: Archive key
+        :return: Nothing
+        """
+        with self.lock:
+            entry = self.index.pop(key, None)
+            if entry is None:
+                return
+            if not any(i['sha256'] == entry['sha256'] for i in self.index.values()):
+                try:
+                    remove(self.object_path(entry['sha256']))
+                except FileNotFoundError:
+                    pass
+
+
+    def stats(self):
+        """
+        Reports the cache statistics.
+
+        :return: Dictionary of statistics
+        """
+        with self.lock:
+            result = dict(self.counters)
+            result['entries'] = len(self.index)
+            result['size'] = self.total_size()
+
+        return result
+
+
+    def total_size(self):
+        """
+        Computes the size of all cached archives.
+
+        :return: Size in bytes
+        """
+        objects = {i['sha256']: i['size'] for i in self.index.values()}
+
+        return sum(objects.values())
+
+
+    @contextmanager
+    def transaction(self):
+        """
+        Updates the cache index from its current file, under a lock shared by all processes using the cache.
+        The index file is written once updated, only when changed.
+
+        :return: Nothing
+        """
+        with self.lock, lock_file('{0}/index.lock'.format(self.directory)):
+            self.index = self.read_index()
+            previous = dumps(self.index, sort_keys=True)
+            yield
+            if dumps(self.index, sort_keys=True) != previous:
+                self.write_index()
+
+
+    def write_index(self):
+        """
+        Writes the cache index atomically.
+
+        :return: Nothing
+        """
+        makedirs(self.directory, exist_ok=True)
+        descriptor, temp = mkstemp(dir=self.directory)
+        with open(descriptor, 'w') as f:
+            dump(self.index, f, indent=2, sort_keys=True)
+        replace(temp, '{0}/index.json'.format(self.directory))
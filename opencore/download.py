@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+
+from base64 import b64encode
+from hashlib import sha256
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from json import dump, load
+from os import makedirs, path, remove, replace
+from re import fullmatch
+from tempfile import mkstemp
+from threading import Lock
+from time import sleep
+from urllib.error import URLError
+from urllib.parse import unquote, urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+
+class DownloadError(URLError):
+    """
+    DownloadError reports a release file that could not be downloaded.
+    """
+
+
+class Downloader:
+    """
+    Downloader fetches release files over persistent connections, resuming interrupted transfers.
+    """
+    AGENT = 'opencore-build'
+    REDIRECTS = 5
+
+
+    def __init__(self, directory='files/downloads', retries=3, backoff=0.5, timeout=30, buffer=64 * 1024, progress=None):
+        """
+        Constructs a new 'Downloader' object.
+
+        :param directory: Path of the downloads directory
+        :param retries: Number of retries after a failed attempt
+        :param backoff: Delay in seconds before first retry, doubled on each retry
+        :param timeout: Connection timeout in seconds
+        :param buffer: Size of read chunks in bytes
+        :param progress: Callback receiving url, received bytes and total bytes or None
+        :return: Nothing
+        """
+        self.backoff = backoff
+        self.buffer = buffer
+        self.counters = {'bytes': 0, 'connections': 0, 'restarted': 0, 'resumed': 0, 'retries': 0, 'reused': 0, 'unchanged': 0}
+        self.directory = directory
+        self.lock = Lock()
+        self.pool = {}
+        self.progress = progress
+        self.retries = retries
+        self.timeout = timeout
+
+
+    def acquire(self, scheme, host):
+        """
+        Gets an idle connection to host, opening a new one if none is available.
+        Connections to https hosts are tunneled through the configured proxy, http requests are sent to proxy.
+
+        :param scheme: Url scheme
+        :param host: Host and optional port
+        :return: Connection object
+        """
+        with self.lock:
+            idle = self.pool.get((scheme, host))
+            if idle:
+                self.counters['reused'] += 1
+                return idle.pop()
+            self.counters['connections'] += 1
+        proxy = self.proxy(scheme, host)
+        if scheme == 'https' and proxy is not None:
+            result = HTTPSConnection(proxy[0], timeout=self.timeout)
+            result.set_tunnel(host, headers=proxy[1])
+            return result
+        if scheme == 'https':
+            return HTTPSConnection(host, timeout=self.timeout)
+
+        return HTTPConnection(proxy[0] if proxy is not None else host, timeout=self.timeout)
+
+
+    def close(self):
+        """
+        Closes all idle connections.
+
+        :return: Nothing
+        """
+        with self.lock:
+            for connections in self.pool.values():
+                for i in connections:
+                    i.close()
+            self.pool = {}
+
+
+    def download(self, url, file, metadata):
+        """
+        Downloads a url into a file once, resuming a partial file.
+
+        :param url: Release file url
+        :param file: Destination file path
+        :param metadata: Dictionary of previous download metadata
+        :return: Tuple of sha256 digest and download status
+        """
+        partial = '{0}.part'.format(file)
+        digest = sha256()
+        offset = 0
+        if path.isfile(partial):
+            with open(partial, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.buffer), b''):
+                    digest.update(chunk)
+                    offset += len(chunk)
+        headers = {}
+        if offset and metadata.get('etag'):
+            headers['Range'] = 'bytes={0}-'.format(offset)
+            headers['If-Range'] = metadata['etag']
+        elif path.isfile(file) and metadata.get('sha256'):
+            if metadata.get('etag'):
+                headers['If-None-Match'] = metadata['etag']
+            if metadata.get('modified'):
+                headers['If-Modified-Since'] = metadata['modified']
+        with open(partial, 'ab') as f:
+            result, status = self.transfer(url, headers, f, digest, offset, metadata, file)
+        if status == 'unchanged':
+            remove(partial)
+            return metadata['sha256'], status
+        replace(partial, file)
+        metadata.update({'sha256': result, 'size': path.getsize(file)})
+
+        return result, status
+
+
+    def fetch(self, url):
+        """
+        Fetches a url into downloads directory, revalidating a previous download and retrying failed attempts.
+
+        :param url: Release file url
+        :return: Tuple of local file path, sha256 digest and download status
+        """
+        name = sha256(url.encode()).hexdigest()
+        file = path.join(self.directory, name)
+        metadata = self.read_metadata(file)
+        if metadata.get('url') != url:
+            metadata = {'url': url}
+        makedirs(self.directory, exist_ok=True)
+        digest, status = self.retry(url, lambda: self.download(url, file, metadata))
+        self.write_metadata(file, metadata)
+
+        return file, digest, status
+
+
+    @staticmethod
+    def proxy(scheme, host):
+        """
+        Gets the HTTP proxy of a host, configured by environment variables like 'HTTPS_PROXY' and 'NO_PROXY'.
+
+        :param scheme: Url scheme
+        :param host: Host and optional port
+        :return: Tuple of proxy host with optional port and dictionary of proxy headers, or None if host is reached directly
+        """
+        url = getproxies().get(scheme)
+        if not url or proxy_bypass(host):
+            return None
+        parts = urlsplit(url if '://' in url else 'http://{0}'.format(url))
+        headers = {}
+        if parts.username is not None:
+            credentials = '{0}:{1}'.format(unquote(parts.username), unquote(parts.password or ''))
+            headers['Proxy-Authorization'] = 'Basic {0}'.format(b64encode(credentials.encode()).decode())
+
+        return parts.netloc.rsplit('@', 1)[-1], headers
+
+
+    @staticmethod
+    def range_start(header):
+        """
+        Parses the first byte offset of a 'Content-Range' header, like 'bytes 100-199/200'.
+
+        :param header: Header value or None
+        :return: Offset or None if not valid
+        """
+        match = fullmatch(r'bytes\s+(\d+)-\d+/(\d+|\*)', (header or '').strip())
+
+        return int(match.group(1)) if match else None
+
+
+    def read_metadata(self, file):
+        """
+        Reads the metadata of a previous download.
+
+        :param file: Downloaded file path
+        :return: Dictionary of metadata
+        """
+        try:
+            with open('{0}.json'.format(file), 'r') as f:
+                return load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+    def release(self, scheme, host, connection, response):
+        """
+        Returns a connection into pool, once its response is fully read.
+
+        :param scheme: Url scheme
+        :param host: Host and optional port
+        :param connection: Connection object
+        :param response: Fully read response object
+        :return: Nothing
+        """
+        if response.will_close:
+            connection.close()
+            return
+        with self.lock:
+            self.pool.setdefault((scheme, host), []).append(connection)
+
+
+    def retry(self, url, function):
+        """
+        Calls a download function, retrying connection errors and server errors with exponential backoff.
+
+        :param url: Release file url
+        :param function: Download function
+        :return: Download function result
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                return function()
+            except (HTTPException, OSError) as e:
+                if isinstance(e, DownloadError) and not str(e.reason).startswith('HTTP 5'):
+                    raise
+                if attempt == self.retries:
+                    raise DownloadError('{0}: {1}'.format(url, e))
+                with self.lock:
+                    self.counters['retries'] += 1
+                sleep(self.backoff * 2 ** attempt)
+
+
+    def stats(self):
+        """
+        Reports the download statistics.
+
+        :return: Dictionary of statistics
+        """
+        with self.lock:
+            return dict(self.counters)
+
+
+    def stream(self, url, buffer):
+        """
+        Streams a url into a writable file object, resuming from its position after failed attempts.
+
+        :param url: Release file url
+        :param buffer: Binary file object, rewound once download completes
+        :return: Hexadecimal sha256 digest string
+        """
+        metadata = {'url': url}
+
+        def attempt():
+            digest = sha256()
+            offset = buffer.tell()
+            buffer.seek(0)
+            while buffer.tell() < offset:
+                digest.update(buffer.read(min(self.buffer, offset - buffer.tell())))
+            headers = {}
+            if offset and metadata.get('etag'):
+                headers['Range'] = 'bytes={0}-'.format(offset)
+                headers['If-Range'] = metadata['etag']
+
+            return self.transfer(url, headers, buffer, digest, offset, metadata)
+
+        result, _ = self.retry(url, attempt)
+        buffer.seek(0)
+
+        return result
+
+
+    def transfer(self, url, headers, target, digest, offset, metadata, file=None):
+        """
+        Transfers a url response into a file object, following redirects.
+        A partial response not starting at offset restarts the transfer from start.
+
+        :param url: Release file url
+        :param headers: Dictionary of request headers
+        :param target: Binary file object positioned at offset
+        :param digest: Hash object of the data already written to target
+        :param offset: Number of bytes already written to target
+        :param metadata: Dictionary of download metadata, updated with response validators
+        :param file: Destination file path, used to record metadata before transfer starts
+        :return: Tuple of sha256 digest and download status
+        """
+        for _ in range(self.REDIRECTS + 1):
+            parts = urlsplit(url)
+            if parts.scheme not in ['http', 'https']:
+                raise DownloadError('unsupported url scheme: {0}'.format(url))
+            request = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+            fields = dict(headers, **{'User-Agent': self.AGENT})
+            proxy = self.proxy(parts.scheme, parts.netloc) if parts.scheme == 'http' else None
+            if proxy is not None:
+                request = '{0}://{1}{2}'.format(parts.scheme, parts.netloc, request)
+                fields.update(proxy[1])
+            connection = self.acquire(parts.scheme, parts.netloc)
+            try:
+                connection.request('GET', request, headers=fields)
+                response = connection.getresponse()
+                if response.status in [301, 302, 303, 307, 308]:
+                    response.read()
+                    self.release(parts.scheme, parts.netloc, connection, response)
+                    url = urljoin(url, response.getheader('Location'))
+                    continue
+                if response.status == 304:
+                    response.read()
+                    self.release(parts.scheme, parts.netloc, connection, response)
+                    with self.lock:
+                        self.counters['unchanged'] += 1
+                    return None, 'unchanged'
+                if response.status == 416:
+                    target.seek(0)
+                    target.truncate()
+                    raise HTTPException('range not satisfiable, restarting download')
+                if response.status == 206 and self.range_start(response.getheader('Content-Range')) != offset:
+                    connection.close()
+                    target.seek(0)
+                    target.truncate()
+                    digest = sha256()
+                    offset = 0
+                    headers = {k: v for k, v in headers.items() if k not in ['If-Range', 'Range']}
+                    with self.lock:
+                        self.counters['restarted'] += 1
+                    continue
+                if response.status == 206:
+                    with self.lock:
+                        self.counters['resumed'] += 1
+                elif response.status == 200:
+                    target.seek(0)
+                    target.truncate()
+                    digest = sha256()
+                    offset = 0
+                else:
+                    raise DownloadError('HTTP {0} {1}: {2}'.format(response.status, response.reason, url))
+                metadata.update({
+                    'etag': response.getheader('ETag'),
+                    'modified': response.getheader('Last-Modified'),
+                    'sha256': None
+                })
+                if file is not None:
+                    self.write_metadata(file, metadata)
+                total = response.getheader('Content-Length')
+                total = offset + int(total) if total is not None else None
+                received = offset
+                for chunk in iter(lambda: response.read(self.buffer), b''):
+                    target.write(chunk)
+                    digest.update(chunk)
+                    received += len(chunk)
+                    with self.lock:
+                        self.counters['bytes'] += len(chunk)
+                    if self.progress is not None:
+                        self.progress(url, received, total)
+                if total is not None and received < total:
+                    raise HTTPException('incomplete read, {0} of {1} bytes'.format(received, total))
+                self.release(parts.scheme, parts.netloc, connection, response)
+                return digest.hexdigest(), 'downloaded'
+            except BaseException:
+                connection.close()
+                raise
+
+        raise DownloadError('too many redirects: {0}'.format(url))
+
+
+    def write_metadata(self, file, metadata):
+        """
+        Writes the metadata of a download atomically.
+
+        :param file: Downloaded file path
+        :param metadata: Dictionary of metadata
+        :return: Nothing
+        """
+        descriptor, temp = mkstemp(dir=self.directory)
+        with open(descriptor, 'w') as f:
+            dump(metadata, f, indent=2, sort_keys=True)
+        replace(temp, '{0}.json'.format(file))
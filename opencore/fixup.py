@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import ThreadPoolExecutor
+from errno import ENOTSUP, EOPNOTSUPP, EPERM
+from os import chmod, remove, scandir
+from stat import S_IMODE
+from sys import platform
+
+from opencore.host import HostProbe
+
+
+class TreeFixup:
+    """
+    TreeFixup normalizes permissions, removes Finder metadata and strips extended attributes in a single pass.
+    """
+    def __init__(self, directory_mode=0o755, file_mode=0o644, workers=1, host=None):
+        """
+        Constructs a new 'TreeFixup' object.
+
+        :param directory_mode: Permissions applied to directories
+        :param file_mode: Permissions applied to files
+        :param workers: Number of subtrees processed concurrently
+        :param host: HostProbe object used to strip extended attributes, a new one if None
+        :return: Nothing
+        """
+        self.directory_mode = directory_mode
+        self.file_mode = file_mode
+        self.host = host or HostProbe()
+        self.workers = workers
+
+
+    def fix_entry(self, entry, counters):
+        """
+        Fixes a directory entry permissions and extended attributes.
+        Only the 'user' namespace attributes are stripped on Linux, security and ACL attributes are kept.
+        Attributes the filesystem does not support or forbids removing are left in place.
+
+        :param entry: Directory entry
+        :param counters: Dictionary of counters to update
+        :return: Nothing
+        """
+        directory = entry.is_dir(follow_symlinks=False)
+        mode = self.directory_mode if directory else self.file_mode
+        if S_IMODE(entry.stat(follow_symlinks=False).st_mode) != mode:
+            chmod(entry.path, mode)
+            counters['directories' if directory else 'files'] += 1
+        try:
+            for i in self.host.list_xattrs(entry.path):
+                if platform.startswith('linux') and not i.startswith('user.'):
+                    continue
+                self.host.remove_xattr(entry.path, i)
+                counters['xattrs'] += 1
+        except OSError as e:
+            if e.errno not in [ENOTSUP, EOPNOTSUPP, EPERM]:
+                raise
+
+
+    def fix_tree(self, directory):
+        """
+        Fixes a directory subtree.
+
+        :param directory: Directory path
+        :return: Dictionary of counters
+        """
+        counters = {'directories': 0, 'files': 0, 'removed': 0, 'xattrs': 0}
+        stack = [directory]
+        while stack:
+            with scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.name == '.DS_Store' and not entry.is_dir(follow_symlinks=False):
+                        remove(entry.path)
+                        counters['removed'] += 1
+                        continue
+                    if entry.is_symlink():
+                        continue
+                    self.fix_entry(entry, counters)
+                    if entry.is_dir():
+                        stack.append(entry.path)
+
+        return counters
+
+
+    def run(self, directory):
+        """
+        Fixes the directory tree.
+
+        :param directory: Directory path
+        :return: Dictionary of counters
+        """
+        result = {'directories': 0, 'files': 0, 'removed': 0, 'xattrs': 0}
+        subtrees = []
+        with scandir(directory) as entries:
+            for entry in entries:
+                if entry.name == '.DS_Store' and not entry.is_dir(follow_symlinks=False):
+                    remove(entry.path)
+                    result['removed'] += 1
+                elif not entry.is_symlink():
+                    self.fix_entry(entry, result)
+                    if entry.is_dir():
+                        subtrees.append(entry.path)
+        if self.workers > 1 and len(subtrees) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                counters = list(executor.map(self.fix_tree, subtrees))
+        else:
+            counters = [self.fix_tree(i) for i in subtrees]
+        for i in counters:
+            for key, value in i.items():
+                result[key] += value
+
+        return result
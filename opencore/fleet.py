@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from io import StringIO
+from os import listdir, makedirs, path
+from shutil import rmtree
+from time import perf_counter
+
+from opencore.build import InstallError, OpenCoreBuild
+from opencore.fixup import TreeFixup
+from opencore.host import HostProbe
+from opencore.sync import TreeSync
+from opencore.util import lock_file
+
+
+class FleetBuild:
+    """
+    FleetBuild generates the EFI tree and config.plist file of many machines, from one shared base.
+    """
+    def __init__(self, directory, profiles, settings=None, version=None, workers=None, debug=False):
+        """
+        Constructs a new 'FleetBuild' object.
+
+        :param directory: Path of the fleet directory, where each profile is built into its own directory
+        :param profiles: List of profiles with 'name', 'host', 'kexts', 'patches' and 'settings' keys
+        :param settings: Site settings shared by all profiles, merged once over default settings
+        :param version: OpenCore version, builder default version if None
+        :param workers: Number of profiles built concurrently, CPU count if None
+        :param debug: Install DEBUG releases
+        :return: Nothing
+        """
+        self.base = None
+        self.binary = None
+        self.cache = None
+        self.debug = debug
+        self.directory = directory
+        self.errors = {}
+        self.profiles = profiles
+        self.prune = False
+        self.releases = None
+        self.settings = settings or {}
+        self.sources = {}
+        self.staging = '{0}/.staging'.format(directory)
+        self.version = version
+        self.workers = workers
+
+
+    def build_profile(self, profile):
+        """
+        Materializes a profile EFI tree from staging area and generates its configuration.
+
+        :param profile: Profile properties
+        :return: Dictionary of profile summary
+        """
+        start = perf_counter()
+        directory = '{0}/{1}'.format(self.directory, profile['name'])
+        result = {'directory': directory, 'error': None, 'issues': [], 'name': profile['name'], 'report': None}
+        output = StringIO()
+        try:
+            with redirect_stdout(output):
+                build = self.builder(directory)
+                build.kexts = self.profile_kexts(build, profile)
+                build.patches = list(profile.get('patches', []))
+                errors = {i['project']: self.errors[self.key(i)] for i in build.kexts if self.key(i) in self.errors}
+                if errors:
+                    raise InstallError(errors)
+                with build.report.span('materialize'):
+                    result['files'] = self.materialize(build)
+                build.write_plist(profile.get('settings', {}))
+                with build.report.span('fixup'):
+                    result['fixed'] = TreeFixup(host=build.host).run(directory)
+                result['issues'] = build.validate_plist('{0}/EFI/OC/config.plist'.format(directory))
+                result['report'] = build.report.finish(build.stats())
+        except Exception as e:
+            result['error'] = '{0}: {1}'.format(type(e).__name__, e)
+        result['output'] = output.getvalue()
+        result['seconds'] = perf_counter() - start
+
+        return result
+
+
+    def builder(self, directory):
+        """
+        Constructs a builder sharing the fleet properties.
+
+        :param directory: Path of the build directory
+        :return: OpenCoreBuild object
+        """
+        result = OpenCoreBuild(directory)
+        if self.binary is not None:
+            result.binary = self.binary
+        result.cache = self.cache
+        result.prune = self.prune
+        result.releases = self.releases
+        result.settings = self.base
+        if self.version is not None:
+            result.version = self.version
+
+        return result
+
+
+    @staticmethod
+    def key(kext):
+        """
+        Generates the staging key of a kext.
+
+        :param kext: Kext properties
+        :return: Tuple of repo, project and version
+        """
+        return kext['repo'], kext['project'], kext['version']
+
+
+    def layers(self, build):
+        """
+        Collects the unique kexts of all profiles into layers, each layer holding one version of a project.
+        Kexts extract into a directory named after their project, so each layer is staged into its own directory.
+
+        :param build: OpenCoreBuild object of the staging area
+        :return: List of kext properties lists
+        """
+        host = build.host
+        result = []
+        keys = set()
+        for profile in self.profiles:
+            for i in self.profile_kexts(build, profile):
+                if self.key(i) in keys:
+                    continue
+                keys.add(self.key(i))
+                layer = next((j for j in result if all(k['project'] != i['project'] for k in j)), None)
+                if layer is None:
+                    layer = []
+                    result.append(layer)
+                layer.append(i)
+        build.host = host
+
+        return result
+
+
+    def materialize(self, build):
+        """
+        Links the staging area files required by a profile into its build directory.
+
+        :param build: OpenCoreBuild object of the profile
+        :return: Number of linked or copied files
+        """
+        result = 0
+        sync = TreeSync(link='hardlink', delete=True, exclude=['EFI/OC/Kexts/*', 'EFI/OC/config.plist'])
+        counters = sync.sync(self.staging, build.directory)
+        result += counters['copy'] + counters['link']
+        destination = '{0}/EFI/OC/Kexts'.format(build.directory)
+        bundles = ['{0}.kext'.format(i['project']) for i in build.kexts]
+        makedirs(destination, exist_ok=True)
+        for i in listdir(destination):
+            if i not in bundles:
+                rmtree(path.join(destination, i))
+        for i in build.kexts:
+            bundle = '{0}.kext'.format(i['project'])
+            source = '{0}/EFI/OC/Kexts/{1}'.format(self.sources[self.key(i)], bundle)
+            counters = TreeSync(link='hardlink', delete=True).sync(source, path.join(destination, bundle))
+            result += counters['copy'] + counters['link']
+
+        return result
+
+
+    @staticmethod
+    def profile_kexts(build, profile):
+        """
+        Gets the kexts of a profile, including the kexts required by its target machine.
+        Profile 'host' properties, like {'cpus': 32}, override the build host properties.
+
+        :param build: OpenCoreBuild object, its host is set to profile target machine
+        :param profile: Profile properties
+        :return: List of kext properties
+        """
+        build.host = HostProbe(profile.get('host'))
+
+        return build.with_host_kexts(profile.get('kexts', []))
+
+
+    def run(self):
+        """
+        Builds the staging area once, then all profiles concurrently.
+        The fleet directory is locked during the build, other fleet builds sharing it wait for its completion.
+
+        :return: List of profile summaries, in profiles order
+        """
+        with lock_file('{0}/.lock'.format(self.directory)):
+            build = self.stage()
+            self.version = build.version
+            self.base = build.merger.merge(build.default_settings(), self.settings)
+            build.print_bold('* Fleet Profiles')
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                result = list(executor.map(self.build_profile, self.profiles))
+        for i in result:
+            status = 'FAILED ({0})'.format(i['error']) if i['error'] else 'OK'
+            if not i['error'] and i['issues']:
+                status = 'OK ({0} issues)'.format(len(i['issues']))
+            build.report.step('{0} built in {1:.2f}s'.format(i['name'], i['seconds']))
+            build.report.status(status)
+
+        return result
+
+
+    def stage(self):
+        """
+        Extracts the OpenCore release and all profile kexts once, into staging area.
+        Kext layers after the first one are extracted into their own staging directories.
+        Failed kexts are recorded, failing only the profiles using them.
+
+        :return: OpenCoreBuild object of the staging area
+        """
+        result = self.builder(self.staging)
+        layers = self.layers(result)
+        result.kexts = layers[0] if layers else []
+        result.resolve_versions()
+        result.install_opencore(result.version, self.debug)
+        self.binary = result.binary
+        self.errors = {}
+        self.sources = {}
+        for index, kexts in enumerate(layers):
+            build = result
+            if index > 0:
+                build = self.builder('{0}/.staging-{1}'.format(self.directory, index))
+                build.kexts = kexts
+                build.resolve_versions()
+                rmtree(build.directory, ignore_errors=True)
+            errors = {}
+            try:
+                build.install_kexts(build.kexts, self.debug)
+            except InstallError as e:
+                errors = e.errors
+            for i in kexts:
+                self.sources[self.key(i)] = build.directory
+                if i['project'] in errors:
+                    self.errors[self.key(i)] = errors[i['project']]
+
+        return result
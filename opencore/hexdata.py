@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+from binascii import Error
+from collections import OrderedDict
+from collections.abc import Mapping
+from plistlib import load
+from threading import Lock
+
+
+class HexDecoder:
+    """
+    HexDecoder decodes hexadecimal strings into data, sharing one object for identical data.
+    Decoded strings and interned data are kept into tables bounded by size, evicting least recently used entries.
+    """
+    def __init__(self, size=4096):
+        """
+        Constructs a new 'HexDecoder' object.
+
+        :param size: Maximum number of entries of decoded strings and interned data tables
+        :return: Nothing
+        """
+        self.counters = {'decoded': 0, 'interned': 0}
+        self.lock = Lock()
+        self.size = size
+        self.strings = OrderedDict()
+        self.values = OrderedDict()
+
+
+    def decode(self, string):
+        """
+        Decodes a hexadecimal string, whitespace between digits is ignored.
+
+        :param string: String to decode
+        :return: Interned data
+        """
+        with self.lock:
+            result = self.strings.get(string)
+            if result is not None:
+                self.strings.move_to_end(string)
+        if result is not None:
+            self.counters['interned'] += 1
+            return result
+        try:
+            value = bytes.fromhex(''.join(string.split()))
+        except ValueError as e:
+            raise Error('{0}: {1}'.format(string, e))
+        self.counters['decoded'] += 1
+        result = self.remember(self.values, value, value)
+
+        return self.remember(self.strings, string, result)
+
+
+    def decode_list(self, strings):
+        """
+        Decodes a list of hexadecimal strings.
+
+        :param strings: List of strings to decode
+        :return: List of interned data
+        """
+        return [self.decode(i) for i in strings]
+
+
+    def decode_tree(self, tree):
+        """
+        Decodes all string values of a nested tree, like a 'DeviceProperties.Add' dictionary.
+
+        :param tree: Dictionary or list of nested hexadecimal strings
+        :return: Tree of interned data, with the same structure
+        """
+        return self.transform(tree, str, self.decode)
+
+
+    @staticmethod
+    def encode(value):
+        """
+        Encodes data into a spaced, uppercase hexadecimal string.
+
+        :param value: Data to encode
+        :return: Hexadecimal string
+        """
+        return value.hex(' ').upper()
+
+
+    def encode_tree(self, tree):
+        """
+        Encodes all data values of a nested tree, to generate settings source.
+
+        :param tree: Dictionary or list of nested data
+        :return: Tree of hexadecimal strings, with the same structure
+        """
+        return self.transform(tree, (bytes, bytearray), self.encode)
+
+
+    def intern(self, value):
+        """
+        Interns data, returning the shared object of identical data.
+
+        :param value: Data to intern
+        :return: Interned data
+        """
+        result = self.remember(self.values, bytes(value), bytes(value))
+        if result is not value:
+            self.counters['interned'] += 1
+
+        return result
+
+
+    def read_plist(self, file, sections=('DeviceProperties', 'NVRAM')):
+        """
+        Reads the sections of an existing configuration file, interning their data.
+
+        :param file: Configuration file path
+        :param sections: Section names to read
+        :return: Dictionary of sections
+        """
+        with open(file, 'rb') as f:
+            settings = load(f)
+
+        return {k: self.transform(settings[k], (bytes, bytearray), self.intern) for k in sections if k in settings}
+
+
+    def remember(self, table, key, value):
+        """
+        Gets a table entry, storing value when missing and evicting the least recently used entry once full.
+
+        :param table: Ordered dictionary of decoded strings or interned data
+        :param key: Entry key
+        :param value: Entry value stored when missing
+        :return: Entry value
+        """
+        with self.lock:
+            result = table.get(key)
+            if result is not None:
+                table.move_to_end(key)
+                return result
+            table[key] = value
+            if len(table) > self.size:
+                table.popitem(last=False)
+
+        return value
+
+
+    @staticmethod
+    def transform(tree, types, function):
+        """
+        Transforms the leaf values of a nested tree, iteratively.
+
+        :param tree: Dictionary or list of nested values
+        :param types: Type or tuple of types transformed
+        :param function: Function transforming a value
+        :return: Transformed tree
+        """
+        if isinstance(tree, types):
+            return function(tree)
+        result = {} if isinstance(tree, Mapping) else []
+        stack = [(tree, result)]
+        while stack:
+            source, target = stack.pop()
+            items = source.items() if isinstance(source, Mapping) else enumerate(source)
+            for key, value in items:
+                if isinstance(value, types):
+                    value = function(value)
+                elif isinstance(value, (Mapping, list, tuple)):
+                    child = {} if isinstance(value, Mapping) else []
+                    stack.append((value, child))
+                    value = child
+                if isinstance(target, list):
+                    target.append(value)
+                else:
+                    target[key] = value
+
+        return result
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+
+from ctypes import CDLL, POINTER, byref, c_char_p, c_int, c_size_t, c_ssize_t, c_uint, c_void_p, create_string_buffer, get_errno
+from ctypes.util import find_library
+from errno import EINVAL, ENOSYS, ENOTSUP, EOPNOTSUPP
+from os import cpu_count, path, strerror
+from re import sub
+from sys import platform
+from threading import Lock
+
+try:
+    from os import listxattr, removexattr
+except ImportError:
+    listxattr = removexattr = None
+
+
+class HostProbe:
+    """
+    HostProbe reports the build host properties in-process, without forking system tools.
+    """
+    AT_FDCWD = -100
+    RENAME_EXCHANGE = 0x0002
+    RENAME_SWAP = 0x0002
+    XATTR_NOFOLLOW = 0x0001
+    lock = Lock()
+    values = {}
+
+
+    def __init__(self, profile=None):
+        """
+        Constructs a new 'HostProbe' object.
+
+        :param profile: Dictionary of target machine properties overriding the host properties, like {'cpus': 32}
+        :return: Nothing
+        """
+        self.profile = profile or {}
+
+
+    def cpu_count(self):
+        """
+        Gets the number of logical processors, as reported by 'sysctl -n hw.ncpu'.
+
+        :return: Number of processors
+        """
+        if 'cpus' in self.profile:
+            return self.profile['cpus']
+        with self.lock:
+            if 'cpus' not in self.values:
+                result = self.sysctl('hw.ncpu') if platform == 'darwin' else self.sysfs_cpus()
+                self.values['cpus'] = result or cpu_count() or 1
+
+        return self.values['cpus']
+
+
+    def exchange(self, first, second):
+        """
+        Exchanges two paths atomically, through renameat2 on Linux or renamex_np on macOS.
+
+        :param first: First path
+        :param second: Second path
+        :return: True if paths were exchanged, False if not supported by host or filesystem
+        """
+        libc = self.libc() if platform == 'darwin' or platform.startswith('linux') else None
+        try:
+            if platform == 'darwin':
+                result = libc.renamex_np(first.encode(), second.encode(), self.RENAME_SWAP)
+            elif libc is not None:
+                result = libc.renameat2(self.AT_FDCWD, first.encode(), self.AT_FDCWD, second.encode(), self.RENAME_EXCHANGE)
+            else:
+                return False
+        except AttributeError:
+            return False
+        if result != 0:
+            error = get_errno()
+            if error in [EINVAL, ENOSYS, ENOTSUP, EOPNOTSUPP]:
+                return False
+            raise OSError(error, strerror(error), first)
+
+        return True
+
+
+    def filesystem(self, file):
+        """
+        Gets the filesystem type of the volume holding a path, like 'msdos' or 'vfat' for FAT volumes.
+
+        :param file: File path, which may not exist yet
+        :return: Filesystem type name or None if not available
+        """
+        file = path.realpath(file)
+        if platform == 'darwin':
+            while not path.exists(file) and path.dirname(file) != file:
+                file = path.dirname(file)
+            libc = self.libc()
+            function = getattr(libc, 'statfs$INODE64', None) or libc.statfs
+            buffer = create_string_buffer(4096)
+            if function(file.encode(), buffer) != 0:
+                return None
+            return buffer.raw[72:88].split(b'\0', 1)[0].decode()
+        result = None
+        length = -1
+        try:
+            with open('/proc/self/mounts', 'r') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) < 3:
+                        continue
+                    mount = sub(r'\\([0-7]{3})', lambda i: chr(int(i.group(1), 8)), parts[1])
+                    inside = file == mount or file.startswith(mount.rstrip('/') + '/')
+                    if inside and len(mount) > length:
+                        result = parts[2]
+                        length = len(mount)
+        except OSError:
+            return None
+
+        return result
+
+
+    @staticmethod
+    def git_revision(directory):
+        """
+        Reads the checked out commit of a git work tree or submodule.
+
+        :param directory: Work tree path
+        :return: Commit hash string or None if not found
+        """
+        git = path.join(directory, '.git')
+        try:
+            if path.isfile(git):
+                with open(git, 'r') as f:
+                    git = path.normpath(path.join(directory, f.read().split(':', 1)[1].strip()))
+            with open(path.join(git, 'HEAD'), 'r') as f:
+                head = f.read().strip()
+            if not head.startswith('ref: '):
+                return head
+            reference = head[5:]
+            if path.isfile(path.join(git, reference)):
+                with open(path.join(git, reference), 'r') as f:
+                    return f.read().strip()
+            with open(path.join(git, 'packed-refs'), 'r') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2 and parts[1] == reference:
+                        return parts[0]
+        except (OSError, IndexError):
+            pass
+
+        return None
+
+
+    def libc(self):
+        """
+        Loads the C library with macOS and Linux function signatures, once per process.
+
+        :return: C library object
+        """
+        with self.lock:
+            if 'libc' not in self.values:
+                libc = CDLL(find_library('c'), use_errno=True)
+                if platform == 'darwin':
+                    libc.listxattr.argtypes = [c_char_p, c_char_p, c_size_t, c_int]
+                    libc.listxattr.restype = c_ssize_t
+                    libc.removexattr.argtypes = [c_char_p, c_char_p, c_int]
+                    libc.sysctlbyname.argtypes = [c_char_p, c_void_p, POINTER(c_size_t), c_void_p, c_size_t]
+                    if hasattr(libc, 'renamex_np'):
+                        libc.renamex_np.argtypes = [c_char_p, c_char_p, c_uint]
+                elif hasattr(libc, 'renameat2'):
+                    libc.renameat2.argtypes = [c_int, c_char_p, c_int, c_char_p, c_uint]
+                self.values['libc'] = libc
+
+        return self.values['libc']
+
+
+    def list_xattrs(self, file):
+        """
+        Lists the extended attributes of a file, without following symlinks.
+
+        :param file: File path
+        :return: List of attribute names
+        """
+        if listxattr is not None:
+            return listxattr(file, follow_symlinks=False)
+        if platform != 'darwin':
+            return []
+        libc = self.libc()
+        name = file.encode()
+        size = libc.listxattr(name, None, 0, self.XATTR_NOFOLLOW)
+        if size <= 0:
+            return []
+        buffer = create_string_buffer(size)
+        size = libc.listxattr(name, buffer, size, self.XATTR_NOFOLLOW)
+        if size < 0:
+            raise OSError(get_errno(), strerror(get_errno()), file)
+
+        return [i.decode() for i in buffer.raw[:size].split(b'\0') if i]
+
+
+    def remove_xattr(self, file, attribute):
+        """
+        Removes an extended attribute of a file, without following symlinks.
+
+        :param file: File path
+        :param attribute: Attribute name
+        :return: Nothing
+        """
+        if removexattr is not None:
+            removexattr(file, attribute, follow_symlinks=False)
+        elif platform == 'darwin':
+            if self.libc().removexattr(file.encode(), attribute.encode(), self.XATTR_NOFOLLOW) != 0:
+                raise OSError(get_errno(), strerror(get_errno()), file)
+
+
+    def sysctl(self, name):
+        """
+        Reads an integer kernel state value, through sysctlbyname on macOS.
+
+        :param name: Value name
+        :return: Integer value or None if not available
+        """
+        if platform != 'darwin':
+            return None
+        value = c_size_t(0)
+        size = c_size_t(8)
+        if self.libc().sysctlbyname(name.encode(), byref(value), byref(size), None, c_size_t(0)) != 0:
+            return None
+
+        return int.from_bytes(bytes(value)[:size.value], 'little')
+
+
+    @staticmethod
+    def sysfs_cpus():
+        """
+        Counts the present processors from Linux sysfs.
+
+        :return: Number of processors or None if not available
+        """
+        try:
+            with open('/sys/devices/system/cpu/present', 'r') as f:
+                ranges = f.read().strip()
+        except OSError:
+            return None
+        result = 0
+        for i in ranges.split(','):
+            low, _, high = i.partition('-')
+            result += int(high or low) - int(low) + 1
+
+        return result
+
+
+class StubProbe(HostProbe):
+    """
+    StubProbe reports fixed host properties, without querying the host.
+    """
+    def __init__(self, profile=None, xattrs=None):
+        """
+        Constructs a new 'StubProbe' object.
+
+        :param profile: Dictionary of host properties, like {'cpus': 32, 'revision': '...'}
+        :param xattrs: Dictionary of file paths and extended attribute name lists
+        :return: Nothing
+        """
+        super().__init__(profile)
+        self.xattrs = xattrs or {}
+
+
+    def cpu_count(self):
+        """
+        Gets the number of logical processors.
+
+        :return: Number of processors
+        """
+        return self.profile.get('cpus', 1)
+
+
+    def exchange(self, first, second):
+        """
+        Exchanges two paths, not supported unless 'exchange' property is set.
+
+        :param first: First path
+        :param second: Second path
+        :return: True if paths were exchanged
+        """
+        if not self.profile.get('exchange'):
+            return False
+
+        return super().exchange(first, second)
+
+
+    def filesystem(self, file):
+        """
+        Gets the filesystem type of the volume holding a path.
+
+        :param file: File path
+        :return: Filesystem type name or None
+        """
+        return self.profile.get('filesystem')
+
+
+    def git_revision(self, directory):
+        """
+        Reads the checked out commit of a git work tree.
+
+        :param directory: Work tree path
+        :return: Commit hash string or None
+        """
+        return self.profile.get('revision')
+
+
+    def list_xattrs(self, file):
+        """
+        Lists the extended attributes of a file.
+
+        :param file: File path
+        :return: List of attribute names
+        """
+        return list(self.xattrs.get(file, []))
+
+
+    def remove_xattr(self, file, attribute):
+        """
+        Removes an extended attribute of a file.
+
+        :param file: File path
+        :param attribute: Attribute name
+        :return: Nothing
+        """
+        self.xattrs[file].remove(attribute)
+
+
+    def sysctl(self, name):
+        """
+        Reads a kernel state value.
+
+        :param name: Value name
+        :return: Value or None
+        """
+        return self.profile.get(name)
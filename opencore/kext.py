@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+
+from fnmatch import fnmatchcase
+from glob import escape as glob_escape, glob
+from json import dump, load
+from os import makedirs, path, replace
+from plistlib import InvalidFileException, load as load_plist
+from tempfile import mkstemp
+from threading import Lock
+from zipfile import BadZipfile, ZipFile
+
+from opencore.util import hash_file
+
+
+class KextIndex:
+    """
+    KextIndex reads the kext bundles metadata straight from release archives, without extracting them.
+    """
+    EXCLUDE = ['__MACOSX/*', '*.app/*', '*.dSYM/*']
+
+
+    def __init__(self, file=None):
+        """
+        Constructs a new 'KextIndex' object.
+
+        :param file: Path of the persistent archives index file
+        :return: Nothing
+        """
+        self.file = file
+        self.lock = Lock()
+        self.projects = {}
+        self.results = self.read_results()
+
+
+    def add(self, project, archive):
+        """
+        Indexes a kext release archive, recording the bundle matching project name.
+
+        :param project: Project name
+        :param archive: Release archive path or binary file object
+        :return: Dictionary of bundle metadata or None if not found
+        """
+        bundles = self.read(archive)
+        result = self.match(project, bundles)
+        with self.lock:
+            self.projects[project] = result
+
+        return result
+
+
+    @staticmethod
+    def bundle(name, info, members):
+        """
+        Generates the metadata of a kext bundle.
+
+        :param name: Bundle path
+        :param info: Dictionary of bundle Info.plist
+        :param members: Set of bundle file paths
+        :return: Dictionary of bundle metadata
+        """
+        executable = info.get('CFBundleExecutable')
+        executable = 'Contents/MacOS/{0}'.format(executable) if executable else ''
+        if executable and '{0}/{1}'.format(name, executable) not in members:
+            executable = ''
+
+        return {
+            'bundle': name,
+            'executable': executable,
+            'identifier': info.get('CFBundleIdentifier', ''),
+            'libraries': sorted(info.get('OSBundleLibraries', {})),
+            'version': info.get('CFBundleVersion', '')
+        }
+
+
+    @staticmethod
+    def levels(items):
+        """
+        Groups the items into dependency levels, each level depending only on previous levels.
+        Items order is preserved within a level, items part of a dependency cycle form the last level.
+
+        :param items: List of item and bundle metadata tuples, metadata can be None
+        :return: List of item lists
+        """
+        identifiers = {}
+        for position, (_, metadata) in enumerate(items):
+            if metadata is not None and metadata['identifier']:
+                identifiers.setdefault(metadata['identifier'], position)
+        dependencies = []
+        for position, (_, metadata) in enumerate(items):
+            libraries = metadata['libraries'] if metadata is not None else []
+            dependencies.append({identifiers[i] for i in libraries if i in identifiers and identifiers[i] != position})
+        result = []
+        done = set()
+        pending = list(range(len(items)))
+        while pending:
+            level = [i for i in pending if dependencies[i] <= done]
+            if not level:
+                level = pending
+            result.append([items[i][0] for i in level])
+            done.update(level)
+            pending = [i for i in pending if i not in done]
+
+        return result
+
+
+    @staticmethod
+    def match(project, bundles):
+        """
+        Finds the bundle named after project, or the only top level bundle.
+
+        :param project: Project name
+        :param bundles: Dictionary of bundle metadata, keyed by bundle path
+        :return: Dictionary of bundle metadata or None if not found
+        """
+        name = '{0}.kext'.format(project)
+        for key, value in bundles.items():
+            if key == name or key.endswith('/' + name):
+                return value
+        top = [v for k, v in bundles.items() if '.kext/' not in k]
+
+        return top[0] if len(top) == 1 else None
+
+
+    def metadata(self, project, directory):
+        """
+        Gets the recorded bundle metadata of a project, reading the installed bundle if not recorded.
+
+        :param project: Project name
+        :param directory: Path of the Kexts directory
+        :return: Dictionary of bundle metadata or None if not found
+        """
+        with self.lock:
+            if project in self.projects:
+                return self.projects[project]
+        bundles = glob(path.join(glob_escape(directory), '**', '{0}.kext'.format(glob_escape(project))), recursive=True)
+        if not bundles:
+            return None
+        name = path.relpath(min(bundles, key=len), directory).replace(path.sep, '/')
+        try:
+            with open(path.join(directory, name, 'Contents', 'Info.plist'), 'rb') as f:
+                info = load_plist(f)
+        except (OSError, InvalidFileException, ValueError):
+            return None
+        members = set()
+        if info.get('CFBundleExecutable'):
+            executable = '{0}/Contents/MacOS/{1}'.format(name, info['CFBundleExecutable'])
+            if path.isfile(path.join(directory, executable)):
+                members.add(executable)
+
+        return self.bundle(name, info, members)
+
+
+    def read(self, archive):
+        """
+        Reads the kext bundles metadata of a release archive, cached by archive digest.
+
+        :param archive: Release archive path or binary file object
+        :return: Dictionary of bundle metadata, keyed by bundle path
+        """
+        digest = hash_file(archive)
+        with self.lock:
+            if digest in self.results:
+                return self.results[digest]
+        result = {}
+        try:
+            with ZipFile(archive, 'r') as zip:
+                names = [i for i in zip.namelist() if not any(fnmatchcase(i, e) for e in self.EXCLUDE)]
+                members = set(names)
+                for i in names:
+                    if not i.endswith('.kext/Contents/Info.plist'):
+                        continue
+                    name = i[:-len('/Contents/Info.plist')]
+                    with zip.open(i) as f:
+                        try:
+                            info = load_plist(f)
+                        except (InvalidFileException, ValueError):
+                            continue
+                    result[name] = self.bundle(name, info, members)
+        except BadZipfile:
+            return {}
+        finally:
+            if not isinstance(archive, str):
+                archive.seek(0)
+        with self.lock:
+            self.results[digest] = result
+            self.write_results()
+
+        return result
+
+
+    def read_results(self):
+        """
+        Reads the persistent archives index.
+
+        :return: Dictionary of bundle metadata dictionaries, keyed by archive digest
+        """
+        result = {}
+        if self.file is not None:
+            try:
+                with open(self.file, 'r') as f:
+                    result = load(f)
+            except (OSError, ValueError):
+                pass
+
+        return result
+
+
+    def write_results(self):
+        """
+        Writes the persistent archives index atomically.
+
+        :return: Nothing
+        """
+        if self.file is None:
+            return
+        directory = path.dirname(path.abspath(self.file))
+        makedirs(directory, exist_ok=True)
+        descriptor, temp = mkstemp(dir=directory)
+        with open(descriptor, 'w') as f:
+            dump(self.results, f, indent=2, sort_keys=True)
+        replace(temp, self.file)
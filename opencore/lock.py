@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+from hashlib import sha256
+from json import dump, load
+from os import makedirs, path, replace, scandir
+from tempfile import mkstemp
+from threading import Lock
+
+from opencore.util import hash_file
+
+
+class LockError(Exception):
+    """
+    LockError reports a fetched component not matching its pinned digest.
+    """
+
+
+class BuildLock:
+    """
+    BuildLock pins the fetched components and resulting tree, for reproducible builds.
+    """
+    def __init__(self, file):
+        """
+        Constructs a new 'BuildLock' object.
+
+        :param file: Path of the lockfile
+        :return: Nothing
+        """
+        self.components = {}
+        self.file = file
+        self.inputs = None
+        self.lock = Lock()
+        self.locked = self.read_lock()
+
+
+    def component(self, name, version, url, file):
+        """
+        Records a fetched component, verifying it against the pinned digest.
+
+        :param name: Component name
+        :param version: Component version
+        :param url: Component url
+        :param file: Component local file path
+        :return: Nothing
+        """
+        digest = hash_file(file)
+        pinned = self.locked['components'].get(name)
+        if pinned is not None and pinned['version'] == version and pinned['sha256'] != digest:
+            raise LockError('{0} {1} digest {2} does not match lockfile digest {3}'.format(name, version, digest, pinned['sha256']))
+        with self.lock:
+            self.components[name] = {'sha256': digest, 'url': url, 'version': version}
+
+
+    @staticmethod
+    def hash_tree(directory):
+        """
+        Computes the sha256 digest of a directory tree content.
+
+        :param directory: Directory path
+        :return: Hexadecimal digest string or None if directory does not exist
+        """
+        if not path.isdir(directory):
+            return None
+        files = []
+        stack = [directory]
+        while stack:
+            with scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name not in ['.DS_Store', '.manifest.json']:
+                        files.append(entry.path)
+        result = sha256()
+        for i in sorted(files):
+            result.update('{0}\0{1}\n'.format(path.relpath(i, directory), hash_file(i)).encode())
+
+        return result.hexdigest()
+
+
+    def read_lock(self):
+        """
+        Reads the lockfile.
+
+        :return: Dictionary of locked build
+        """
+        try:
+            with open(self.file, 'r') as f:
+                result = load(f)
+        except (OSError, ValueError):
+            result = {}
+        result.setdefault('components', {})
+
+        return result
+
+
+    def unchanged(self, inputs, directory):
+        """
+        Verifies if the build inputs and tree match the lockfile.
+
+        :param inputs: Dictionary of build inputs
+        :param directory: Path of the build directory
+        :return: True if build can be skipped
+        """
+        self.inputs = inputs
+        if self.locked.get('inputs') != inputs or self.locked.get('tree') != self.hash_tree(directory):
+            return False
+        self.components = dict(self.locked['components'])
+
+        return True
+
+
+    def write_lock(self, settings, directory):
+        """
+        Writes the lockfile atomically.
+
+        :param settings: Settings sha256 digest
+        :param directory: Path of the build directory
+        :return: Nothing
+        """
+        self.locked = {
+            'components': self.components,
+            'inputs': self.inputs,
+            'settings': settings,
+            'tree': self.hash_tree(directory)
+        }
+        parent = path.dirname(path.abspath(self.file))
+        makedirs(parent, exist_ok=True)
+        descriptor, temp = mkstemp(dir=parent)
+        with open(descriptor, 'w') as f:
+            dump(self.locked, f, indent=2, sort_keys=True)
+        replace(temp, self.file)
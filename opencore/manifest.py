@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+
+from hashlib import sha256
+from json import dump, load
+from os import chmod, link, listdir, lstat, makedirs, path, remove, rename, replace, rmdir, walk
+from shutil import rmtree
+from tempfile import mkstemp
+
+from opencore.host import HostProbe
+from opencore.sync import TreeSync
+from opencore.util import hash_file
+
+
+class BuildManifest:
+    """
+    BuildManifest records the origin of every output file, to rebuild the EFI tree incrementally.
+    """
+    def __init__(self, directory, host=None):
+        """
+        Constructs a new 'BuildManifest' object, recovering the build directory of an interrupted commit.
+
+        :param directory: Path of the build directory
+        :param host: HostProbe object used to exchange directories, a new one if None
+        :return: Nothing
+        """
+        self.archives = {}
+        self.directory = directory
+        self.files = {}
+        self.host = host or HostProbe()
+        self.pruned = '{0}.pruned'.format(directory)
+        self.staging = None
+        self.recover()
+        self.previous = self.read_manifest()
+
+
+    def add(self, name, data, archive, version):
+        """
+        Adds an extracted file, writing it only when its content changed.
+
+        :param name: File path relative to build directory
+        :param data: File content
+        :param archive: Source archive name
+        :param version: Source archive version
+        :return: Nothing
+        """
+        digest = sha256(data).hexdigest()
+        entry = self.previous['files'].get(name)
+        if entry is None or entry['sha256'] != digest or not self.intact(name, entry):
+            file = self.stage(name)
+            descriptor, temp = mkstemp(dir=path.dirname(file))
+            with open(descriptor, 'wb') as f:
+                f.write(data)
+            chmod(temp, 0o644)
+            replace(temp, file)
+            entry = self.stat(name, {'sha256': digest})
+        self.files[name] = dict(entry, archive=archive, version=version)
+
+
+    def add_file(self, name, source, archive, version=''):
+        """
+        Adds a copied file, copying it only when its source changed.
+
+        :param name: File path relative to build directory
+        :param source: Source file path
+        :param archive: Source name
+        :param version: Source version
+        :return: Nothing
+        """
+        status = lstat(source)
+        entry = self.previous['files'].get(name)
+        if (entry is None or entry.get('source_size') != status.st_size or entry.get('source_mtime_ns') != status.st_mtime_ns or
+                not self.intact(name, entry)):
+            file = self.stage(name)
+            TreeSync().copy_file(source, file, status)
+            entry = self.stat(name, {
+                'sha256': hash_file(file),
+                'source_mtime_ns': status.st_mtime_ns,
+                'source_size': status.st_size
+            })
+        self.files[name] = dict(entry, archive=archive, version=version)
+
+
+    def commit(self):
+        """
+        Deletes obsolete files and swaps the staging directory with build directory.
+        Directories are exchanged atomically when supported, an interrupted fallback swap is recovered by next build.
+
+        :return: True if build directory changed
+        """
+        for name in set(self.previous['files']) - set(self.files):
+            file = self.stage(name)
+            try:
+                remove(file)
+            except FileNotFoundError:
+                pass
+            parent = path.dirname(file)
+            while parent != self.staging and path.isdir(parent) and not listdir(parent):
+                rmdir(parent)
+                parent = path.dirname(parent)
+        manifest = {'archives': self.archives, 'files': self.files}
+        if self.staging is None:
+            if manifest != self.previous:
+                self.write_manifest(self.directory, manifest)
+            return False
+        self.write_manifest(self.staging, manifest)
+        if path.isdir(self.directory) and self.host.exchange(self.staging, self.directory):
+            rmtree(self.staging)
+            self.staging = None
+            return True
+        previous = '{0}.previous'.format(self.directory)
+        if path.isdir(previous):
+            rmtree(previous)
+        if path.isdir(self.directory):
+            rename(self.directory, previous)
+        rename(self.staging, self.directory)
+        if path.isdir(previous):
+            rmtree(previous)
+        self.staging = None
+
+        return True
+
+
+    def discard(self):
+        """
+        Discards the staging directory, leaving build directory untouched.
+
+        :return: Nothing
+        """
+        if self.staging is not None:
+            rmtree(self.staging)
+            self.staging = None
+
+
+    def intact(self, name, entry):
+        """
+        Verifies if an output file matches its manifest entry, a pruned file is verified into pruned directory.
+
+        :param name: File path relative to build directory
+        :param entry: Manifest entry
+        :return: True if file is intact
+        """
+        try:
+            status = lstat(path.join(self.pruned if entry.get('pruned') else self.directory, name))
+        except FileNotFoundError:
+            return False
+
+        return status.st_size == entry['size'] and status.st_mtime_ns == entry['mtime_ns']
+
+
+    def prune(self, names):
+        """
+        Records the files moved into pruned directory by tree pruning, deleting the pruned files not recorded.
+
+        :param names: List of pruned file paths relative to build directory
+        :return: Nothing
+        """
+        files = self.previous['files']
+        for name in names:
+            if name in files:
+                files[name]['pruned'] = True
+        for root, directories, entries in walk(self.pruned, topdown=False):
+            for i in entries:
+                file = path.join(root, i)
+                if not files.get(path.relpath(file, self.pruned).replace(path.sep, '/'), {}).get('pruned'):
+                    remove(file)
+            if not listdir(root):
+                rmdir(root)
+        self.write_manifest(self.directory, self.previous)
+
+
+    def read_manifest(self):
+        """
+        Reads the manifest of previous build.
+
+        :return: Dictionary of archives and files
+        """
+        file = '{0}/.manifest.json'.format(self.directory)
+        try:
+            with open(file, 'r') as f:
+                result = load(f)
+        except (OSError, ValueError):
+            result = {}
+        result.setdefault('archives', {})
+        result.setdefault('files', {})
+
+        return result
+
+
+    def recover(self):
+        """
+        Restores the build directory moved aside by a fallback swap interrupted before its completion.
+
+        :return: True if build directory was restored
+        """
+        previous = '{0}.previous'.format(self.directory)
+        if path.isdir(self.directory) or not path.isdir(previous):
+            return False
+        rename(previous, self.directory)
+
+        return True
+
+
+    def restore(self, required):
+        """
+        Moves the pruned files required again back into build directory.
+        A pruned file missing from pruned directory invalidates its archive, extracted again by next build.
+
+        :param required: Function verifying if a file path relative to build directory is required
+        :return: List of restored file paths
+        """
+        result = []
+        changed = False
+        for name, entry in self.previous['files'].items():
+            if not entry.get('pruned') or not required(name):
+                continue
+            changed = True
+            del entry['pruned']
+            file = path.join(self.directory, name)
+            makedirs(path.dirname(file), exist_ok=True)
+            try:
+                rename(path.join(self.pruned, name), file)
+            except FileNotFoundError:
+                self.previous['archives'].pop(entry['archive'], None)
+                continue
+            result.append(name)
+        if changed:
+            self.write_manifest(self.directory, self.previous)
+
+        return result
+
+
+    def stage(self, name):
+        """
+        Generates the staging path of an output file, cloning the build directory with hard links on first use.
+
+        :param name: File path relative to build directory
+        :return: Staging file path
+        """
+        if self.staging is None:
+            self.staging = '{0}.staging'.format(self.directory)
+            if path.isdir(self.staging):
+                rmtree(self.staging)
+            makedirs(self.staging)
+            for root, directories, files in walk(self.directory):
+                relative = path.relpath(root, self.directory)
+                for i in directories:
+                    makedirs(path.join(self.staging, relative, i), exist_ok=True)
+                for j in files:
+                    link(path.join(root, j), path.join(self.staging, relative, j))
+        result = path.join(self.staging, name)
+        makedirs(path.dirname(result), exist_ok=True)
+
+        return result
+
+
+    def stat(self, name, entry):
+        """
+        Records the size and modification time of a staged file.
+
+        :param name: File path relative to build directory
+        :param entry: Manifest entry
+        :return: Updated manifest entry
+        """
+        status = lstat(path.join(self.staging, name))
+        entry['mtime_ns'] = status.st_mtime_ns
+        entry['size'] = status.st_size
+
+        return entry
+
+
+    def unchanged(self, archive, digest, version):
+        """
+        Verifies if an archive and all its output files are unchanged since previous build.
+
+        :param archive: Source archive name
+        :param digest: Source archive sha256 digest
+        :param version: Source archive version
+        :return: True if archive output can be reused
+        """
+        self.archives[archive] = {'sha256': digest, 'version': version}
+        if self.previous['archives'].get(archive) != self.archives[archive]:
+            return False
+        files = {k: v for k, v in self.previous['files'].items() if v['archive'] == archive}
+        if not all(self.intact(k, v) for k, v in files.items()):
+            return False
+        self.files.update(files)
+
+        return True
+
+
+    def write_manifest(self, directory, manifest):
+        """
+        Writes the build manifest atomically.
+
+        :param directory: Directory where manifest is written
+        :param manifest: Dictionary of archives and files
+        :return: Nothing
+        """
+        makedirs(directory, exist_ok=True)
+        descriptor, temp = mkstemp(dir=directory)
+        with open(descriptor, 'w') as f:
+            dump(manifest, f, indent=2, sort_keys=True)
+        replace(temp, '{0}/.manifest.json'.format(directory))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+from collections.abc import Mapping
+from fnmatch import fnmatchcase
+
+
+class SettingsMerger:
+    """
+    SettingsMerger merges layered settings overlays, without mutating them.
+    """
+    STRATEGIES = {
+        'ACPI/Add': ('key', 'Path'),
+        'DeviceProperties/Delete/*': 'union',
+        'Kernel/Add': ('key', 'BundlePath'),
+        'Misc/Tools': ('key', 'Path'),
+        'UEFI/Drivers': ('key', 'Path')
+    }
+
+
+    def __init__(self, strategies=None):
+        """
+        Constructs a new 'SettingsMerger' object.
+
+        :param strategies: Dictionary of array path patterns and merge strategies, arrays are replaced if None
+        :return: Nothing
+        """
+        self.strategies = strategies or {}
+
+
+    def merge(self, base, *overlays):
+        """
+        Merges the overlays into base settings, in order.
+        Unchanged dictionaries and arrays are shared with the inputs, the result must be treated as read-only.
+
+        :param base: Dictionary of base settings
+        :param overlays: Dictionaries of settings applied over base
+        :return: Dictionary of settings
+        """
+        result = base
+        for overlay in overlays:
+            if not overlay:
+                continue
+            result = dict(result)
+            stack = [(result, overlay, '')]
+            while stack:
+                target, source, prefix = stack.pop()
+                for key, value in source.items():
+                    name = prefix + key
+                    current = target.get(key)
+                    if isinstance(value, Mapping):
+                        child = dict(current) if isinstance(current, Mapping) else {}
+                        target[key] = child
+                        stack.append((child, value, name + '/'))
+                    elif isinstance(value, list) and isinstance(current, list):
+                        target[key] = self.merge_array(name, current, value)
+                    else:
+                        target[key] = value
+
+        return result
+
+
+    def merge_array(self, name, current, value):
+        """
+        Merges an overlay array into base array, using the strategy matching its path.
+
+        :param name: Array path, keys separated by '/'
+        :param current: Base array
+        :param value: Overlay array
+        :return: Array
+        """
+        strategy = self.strategy(name)
+        if strategy == 'append':
+            return current + value
+        if strategy == 'union':
+            return current + [i for i in value if i not in current]
+        if isinstance(strategy, tuple) and strategy[0] == 'key':
+            result = list(current)
+            index = {}
+            for position, entry in enumerate(result):
+                if isinstance(entry, Mapping) and strategy[1] in entry:
+                    index[entry[strategy[1]]] = position
+            for entry in value:
+                if isinstance(entry, Mapping) and entry.get(strategy[1]) in index:
+                    position = index[entry[strategy[1]]]
+                    result[position] = self.merge(result[position], entry)
+                else:
+                    if isinstance(entry, Mapping) and strategy[1] in entry:
+                        index[entry[strategy[1]]] = len(result)
+                    result.append(entry)
+            return result
+
+        return value
+
+
+    def strategy(self, name):
+        """
+        Finds the merge strategy of an array.
+
+        :param name: Array path, keys separated by '/'
+        :return: Merge strategy, 'replace' if no pattern matches
+        """
+        if name in self.strategies:
+            return self.strategies[name]
+        for pattern, strategy in self.strategies.items():
+            if fnmatchcase(name, pattern):
+                return strategy
+
+        return 'replace'
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+
+from collections import namedtuple
+from mmap import ACCESS_READ, mmap
+from re import DOTALL, compile, escape
+
+Result = namedtuple('Result', ['index', 'comment', 'matches', 'offsets', 'issue'])
+
+
+class PatchVerifier:
+    """
+    PatchVerifier applies the OpenCore masked find and replace semantics to a binary, without modifying it.
+    """
+    def __init__(self, chunk=1024 * 1024):
+        """
+        Constructs a new 'PatchVerifier' object.
+
+        :param chunk: Size of the binary region scanned by all patches at once, in bytes
+        :return: Nothing
+        """
+        self.chunk = chunk
+
+
+    @staticmethod
+    def compile(find, mask):
+        """
+        Compiles a masked pattern into its longest unmasked anchor and a match expression.
+
+        :param find: Pattern bytes
+        :param mask: Pattern mask bytes, all bits compared if empty
+        :return: Tuple of anchor bytes, anchor offset into pattern and compiled expression
+        """
+        parts = []
+        anchor = (0, 0)
+        start = 0
+        for position, value in enumerate(find):
+            bits = mask[position] if mask else 0xFF
+            if bits == 0xFF:
+                parts.append(escape(bytes([value])))
+                if position + 1 - start > anchor[1] - anchor[0]:
+                    anchor = (start, position + 1)
+                continue
+            start = position + 1
+            if bits == 0:
+                parts.append(b'.')
+            else:
+                allowed = bytes(i for i in range(256) if i & bits == value)
+                parts.append(b'[' + b''.join(escape(bytes([i])) for i in allowed) + b']')
+
+        return find[anchor[0]:anchor[1]], anchor[0], compile(b''.join(parts), DOTALL)
+
+
+    @staticmethod
+    def matches(data, find, mask):
+        """
+        Verifies if data matches a masked pattern, comparing masked data with unmasked pattern as OpenCore does.
+
+        :param data: Data bytes, as long as pattern
+        :param find: Pattern bytes
+        :param mask: Pattern mask bytes, all bits compared if empty
+        :return: True if data matches
+        """
+        if not mask:
+            return data == find
+
+        return all(d & m == f for d, f, m in zip(data, find, mask))
+
+
+    @staticmethod
+    def read(data, changes, offset, size):
+        """
+        Reads the binary bytes, as modified by previously applied patches.
+
+        :param data: Binary buffer
+        :param changes: List of offset and replaced bytes tuples
+        :param offset: Start offset
+        :param size: Number of bytes
+        :return: Bytes
+        """
+        result = bytearray(data[offset:offset + size])
+        for start, value in changes:
+            if start < offset + size and start + len(value) > offset:
+                for position in range(max(start, offset), min(start + len(value), offset + size)):
+                    result[position - offset] = value[position - start]
+
+        return bytes(result)
+
+
+    def scan(self, data, expressions):
+        """
+        Finds all overlapping matches of many patterns, in a single pass over the binary.
+        Each chunk is searched by all patterns while cached, locating the pattern anchors first.
+
+        :param data: Binary buffer
+        :param expressions: List of pattern length and compiled pattern tuples, compiled pattern can be None
+        :return: List of match offset lists, in expressions order
+        """
+        result = [[] for _ in expressions]
+        for start in range(0, len(data), self.chunk):
+            stop = min(start + self.chunk, len(data))
+            for position, (size, compiled) in enumerate(expressions):
+                if compiled is None:
+                    continue
+                anchor, offset, expression = compiled
+                end = min(stop + size - 1, len(data))
+                if not anchor:
+                    match = expression.search(data, start, end)
+                    while match is not None:
+                        result[position].append(match.start())
+                        match = expression.search(data, match.start() + 1, end)
+                    continue
+                i = data.find(anchor, start + offset, min(stop + offset + len(anchor) - 1, len(data)))
+                while i >= 0:
+                    if expression.match(data, i - offset, end) is not None:
+                        result[position].append(i - offset)
+                    i = data.find(anchor, i + 1, min(stop + offset + len(anchor) - 1, len(data)))
+
+        return result
+
+
+    def verify(self, file, patches, symbols=None):
+        """
+        Verifies the patches against a binary file, applying them in order as OpenCore does.
+
+        :param file: Kernel or kext binary path
+        :param patches: List of patch properties, as generated by 'configure_patches'
+        :param symbols: Dictionary of symbol names and file offsets, used by patches having a 'Base'
+        :return: List of results, in patches order
+        """
+        with open(file, 'rb') as f, mmap(f.fileno(), 0, access=ACCESS_READ) as data:
+            return self.verify_data(data, patches, symbols or {})
+
+
+    def verify_data(self, data, patches, symbols):
+        """
+        Verifies the patches against a binary buffer.
+
+        :param data: Binary buffer
+        :param patches: List of patch properties
+        :param symbols: Dictionary of symbol names and file offsets
+        :return: List of results, in patches order
+        """
+        expressions = []
+        issues = []
+        for patch in patches:
+            find = bytes(patch.get('Find', b''))
+            mask = bytes(patch.get('Mask', b''))
+            replace = bytes(patch.get('Replace', b''))
+            replace_mask = bytes(patch.get('ReplaceMask', b''))
+            issue = None
+            if mask and len(mask) != len(find):
+                issue = 'Mask size does not match Find size'
+            elif mask and any(f & ~m for f, m in zip(find, mask)):
+                issue = 'Find has bits set outside Mask, never matched by OpenCore'
+            elif find and len(replace) != len(find):
+                issue = 'Replace size does not match Find size'
+            elif replace_mask and len(replace_mask) != len(replace):
+                issue = 'ReplaceMask size does not match Replace size'
+            elif patch.get('Base') and patch['Base'] not in symbols:
+                issue = 'Base symbol {0} not found'.format(patch['Base'])
+            elif not find and not patch.get('Base'):
+                issue = 'Find is empty, without Base'
+            issues.append(issue)
+            compiled = issue is None and find and patch.get('Enabled', True)
+            expressions.append((len(find), self.compile(find, mask) if compiled else None))
+        candidates = self.scan(data, expressions)
+        changes = []
+        result = []
+        for index, patch in enumerate(patches):
+            comment = patch.get('Comment', '')
+            if issues[index] is not None or not patch.get('Enabled', True):
+                result.append(Result(index, comment, 0, [], issues[index]))
+                continue
+            find = bytes(patch.get('Find', b''))
+            mask = bytes(patch.get('Mask', b''))
+            replace = bytes(patch.get('Replace', b''))
+            replace_mask = bytes(patch.get('ReplaceMask', b''))
+            base = symbols[patch['Base']] if patch.get('Base') else 0
+            limit = base + patch['Limit'] if patch.get('Limit') else len(data)
+            limit = min(limit, len(data))
+            if not find:
+                offsets = [base]
+                found = 1
+            else:
+                positions = set(i for i in candidates[index] if base <= i and i + len(find) <= limit)
+                for start, value in changes:
+                    low = max(base, start - len(find) + 1)
+                    high = min(start + len(value), limit - len(find) + 1)
+                    for i in range(low, high):
+                        if self.matches(self.read(data, changes, i, len(find)), find, mask):
+                            positions.add(i)
+                        else:
+                            positions.discard(i)
+                offsets = []
+                found = 0
+                skip = patch.get('Skip', 0)
+                count = patch.get('Count', 0)
+                position = base
+                for i in sorted(positions):
+                    if i < position:
+                        continue
+                    found += 1
+                    if skip > 0:
+                        skip -= 1
+                        position = i + len(find)
+                        continue
+                    offsets.append(i)
+                    position = i + len(find)
+                    if 0 < count == len(offsets):
+                        break
+            for i in offsets:
+                current = self.read(data, changes, i, len(replace))
+                if replace_mask:
+                    value = bytes(c & ~m & 0xFF | r & m for c, r, m in zip(current, replace, replace_mask))
+                else:
+                    value = replace
+                changes.append((i, value))
+            issue = None
+            if not offsets:
+                issue = 'Pattern not found' if not found else 'All {0} matches skipped'.format(found)
+            elif 0 < patch.get('Count', 0) != len(offsets):
+                issue = 'Replaced {0} of {1} expected matches'.format(len(offsets), patch['Count'])
+            result.append(Result(index, comment, found, offsets, issue))
+
+        return result
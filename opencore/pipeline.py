@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+from asyncio import Semaphore, create_task, run, to_thread
+from tempfile import SpooledTemporaryFile
+from time import perf_counter
+
+from opencore.build import InstallError
+
+
+class StreamPipeline:
+    """
+    StreamPipeline installs kexts by streaming downloads into memory buffers, overlapping downloads with extraction.
+    """
+    def __init__(self, build, memory=16 * 1024 ** 2, depth=2):
+        """
+        Constructs a new 'StreamPipeline' object.
+
+        :param build: OpenCoreBuild object
+        :param memory: Size in bytes a download buffer holds in memory, before spilling to a temporary file
+        :param depth: Number of releases downloaded ahead of extraction
+        :return: Nothing
+        """
+        self.build = build
+        self.depth = depth
+        self.memory = memory
+        self.timings = {}
+
+
+    async def fetch(self, kext, debug, semaphore):
+        """
+        Fetches a kext release, once a pipeline slot is available.
+
+        :param kext: Kext properties
+        :param debug: Fetch DEBUG release
+        :param semaphore: Semaphore of pipeline slots, released once release is extracted
+        :return: Tuple of local file path or buffer and fetch status
+        """
+        await semaphore.acquire()
+        start = perf_counter()
+        buffer = SpooledTemporaryFile(max_size=self.memory)
+        try:
+            file, status = await to_thread(self.build.fetch_kext, kext['repo'], kext['project'], kext['version'], debug, buffer)
+        except BaseException:
+            buffer.close()
+            raise
+        finally:
+            self.timings[kext['project']]['download'] = perf_counter() - start
+        if file is not buffer:
+            buffer.close()
+
+        return file, status
+
+
+    async def install(self, kexts, debug):
+        """
+        Downloads the kexts ahead, while extracting them in order.
+
+        :param kexts: List of kext properties to be installed
+        :param debug: Install DEBUG releases
+        :return: Dictionary of kext names and exceptions
+        """
+        errors = {}
+        semaphore = Semaphore(self.depth)
+        for i in kexts:
+            self.timings[i['project']] = {'download': 0.0, 'extract': 0.0, 'wait': 0.0}
+        tasks = [create_task(self.fetch(i, debug, semaphore)) for i in kexts]
+        for kext, task in zip(kexts, tasks):
+            timings = self.timings[kext['project']]
+            self.build.print_bold('* {0} {1}'.format(kext['project'], kext['version']))
+            self.build.report.step('fetching component')
+            file = None
+            try:
+                start = perf_counter()
+                file, status = await task
+                timings['wait'] = perf_counter() - start
+                self.build.print_status(status)
+                start = perf_counter()
+                await to_thread(self.build.extract_kext, file, (kext['project'], kext['version']))
+                timings['extract'] = perf_counter() - start
+            except Exception as e:
+                self.build.report.status('FAILED')
+                errors[kext['project']] = e
+            finally:
+                semaphore.release()
+                if file is not None and not isinstance(file, str):
+                    file.close()
+
+        return errors
+
+
+    def run(self, kexts, debug=False):
+        """
+        Builds the kexts files structure, through the streaming pipeline.
+
+        :param kexts: List of kext properties to be installed
+        :param debug: Install DEBUG releases
+        :return: Dictionary of per-kext and total stage timings in seconds
+        """
+        self.timings = {}
+        start = perf_counter()
+        errors = run(self.install(kexts, debug))
+        kexts = list(self.timings.values())
+        self.timings['total'] = {
+            'download': sum(i['download'] for i in kexts),
+            'elapsed': perf_counter() - start,
+            'extract': sum(i['extract'] for i in kexts),
+            'wait': sum(i['wait'] for i in kexts)
+        }
+        if errors:
+            raise InstallError(errors)
+
+        return self.timings
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+from base64 import b64encode
+from collections.abc import Mapping
+from datetime import datetime
+from hashlib import sha256
+from os import chmod, makedirs, path, remove, replace
+from tempfile import mkstemp
+
+from opencore.util import hash_file
+
+
+class PlistWriter:
+    """
+    PlistWriter streams settings into XML property list files, formatted as plutil canonical output.
+    """
+    HEADER = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">\n'
+        '<plist version="1.0">\n'
+    )
+
+
+    def __init__(self, buffer=64 * 1024):
+        """
+        Constructs a new 'PlistWriter' object.
+
+        :param buffer: Size of written chunks in bytes
+        :return: Nothing
+        """
+        self.buffer = buffer
+
+
+    def chunks(self, settings):
+        """
+        Generates the encoded property list chunks.
+
+        :param settings: Dictionary of settings
+        :return: Generator of bytes
+        """
+        parts = []
+        size = 0
+        for i in self.serialize(settings):
+            parts.append(i)
+            size += len(i)
+            if size >= self.buffer:
+                yield ''.join(parts).encode('UTF-8')
+                parts = []
+                size = 0
+        if parts:
+            yield ''.join(parts).encode('UTF-8')
+
+
+    def data(self, value, indent):
+        """
+        Generates the base64 data lines, wrapped as CoreFoundation does.
+
+        :param value: Data to encode
+        :param indent: Indentation level
+        :return: Generator of strings
+        """
+        encoded = b64encode(value).decode('ascii')
+        indent = min(indent, 8)
+        tabs = '\t' * indent
+        limit = 76 - 8 * indent
+        start = position = 0
+        for i in range(len(value)):
+            position += 2 if i % 3 == 2 else 1
+            if position - start >= limit:
+                yield '{0}{1}\n'.format(tabs, encoded[start:position])
+                start = position
+        if start < len(encoded):
+            yield '{0}{1}\n'.format(tabs, encoded[start:])
+
+
+    def digest(self, settings):
+        """
+        Computes the sha256 digest of serialized settings.
+
+        :param settings: Dictionary of settings
+        :return: Hexadecimal digest string
+        """
+        result = sha256()
+        for i in self.chunks(settings):
+            result.update(i)
+
+        return result.hexdigest()
+
+
+    @staticmethod
+    def escape(string):
+        """
+        Escapes the XML reserved characters.
+
+        :param string: String to escape
+        :return: Escaped string
+        """
+        return string.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+    def serialize(self, settings):
+        """
+        Generates the property list strings.
+
+        :param settings: Dictionary of settings
+        :return: Generator of strings
+        """
+        yield self.HEADER
+        stack = [(settings, 0)]
+        while stack:
+            value, indent = stack.pop()
+            if isinstance(value, str) and indent < 0:
+                yield value
+                continue
+            tabs = '\t' * indent
+            if isinstance(value, bool):
+                yield '{0}<{1}/>\n'.format(tabs, 'true' if value else 'false')
+            elif isinstance(value, int):
+                yield '{0}<integer>{1}</integer>\n'.format(tabs, value)
+            elif isinstance(value, float):
+                yield '{0}<real>{1!r}</real>\n'.format(tabs, value)
+            elif isinstance(value, str):
+                yield '{0}<string>{1}</string>\n'.format(tabs, self.escape(value))
+            elif isinstance(value, (bytes, bytearray)):
+                yield '{0}<data>\n'.format(tabs)
+                yield from self.data(value, indent)
+                yield '{0}</data>\n'.format(tabs)
+            elif isinstance(value, datetime):
+                yield '{0}<date>{1}</date>\n'.format(tabs, value.strftime('%Y-%m-%dT%H:%M:%SZ'))
+            elif isinstance(value, Mapping):
+                if not value:
+                    yield '{0}<dict/>\n'.format(tabs)
+                    continue
+                yield '{0}<dict>\n'.format(tabs)
+                items = []
+                for key in sorted(value, key=lambda i: i.encode('UTF-16-BE')):
+                    items.append(('{0}\t<key>{1}</key>\n'.format(tabs, self.escape(key)), -1))
+                    items.append((value[key], indent + 1))
+                items.append(('{0}</dict>\n'.format(tabs), -1))
+                stack.extend(reversed(items))
+            elif isinstance(value, (list, tuple)):
+                if not value:
+                    yield '{0}<array/>\n'.format(tabs)
+                    continue
+                yield '{0}<array>\n'.format(tabs)
+                items = [(i, indent + 1) for i in value]
+                items.append(('{0}</array>\n'.format(tabs), -1))
+                stack.extend(reversed(items))
+            else:
+                raise TypeError('Unsupported type: {0}'.format(type(value).__name__))
+        yield '</plist>\n'
+
+
+    def write(self, settings, file):
+        """
+        Writes the property list atomically, skipping the write when file content is unchanged.
+
+        :param settings: Dictionary of settings
+        :param file: Property list file path
+        :return: True if file was written
+        """
+        if path.isfile(file) and hash_file(file) == self.digest(settings):
+            return False
+        directory = path.dirname(path.abspath(file))
+        makedirs(directory, exist_ok=True)
+        descriptor, temp = mkstemp(dir=directory)
+        try:
+            with open(descriptor, 'wb') as f:
+                for i in self.chunks(settings):
+                    f.write(i)
+            chmod(temp, 0o644)
+            replace(temp, file)
+        except BaseException:
+            if path.exists(temp):
+                remove(temp)
+            raise
+
+        return True
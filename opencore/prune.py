@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+from os import listdir, makedirs, path, remove, replace, rmdir, walk
+
+
+class TreePruner:
+    """
+    TreePruner removes the ACPI tables, drivers, tools and resources not referenced by settings.
+    """
+    CHIME = 'OCEFIAudio_VoiceOver_Boot.mp3'
+    THEMES = {
+        'Auto': ['Acidanthera/Chardonnay', 'Acidanthera/GoldenGate'],
+        'Default': ['Acidanthera/GoldenGate']
+    }
+
+
+    def __init__(self, settings):
+        """
+        Constructs a new 'TreePruner' object.
+
+        :param settings: Dictionary of merged settings
+        :return: Nothing
+        """
+        self.acpi = self.enabled(settings, 'ACPI', 'Add')
+        self.drivers = self.enabled(settings, 'UEFI', 'Drivers')
+        self.tools = self.enabled(settings, 'Misc', 'Tools')
+        audio = settings.get('UEFI', {}).get('Audio', {})
+        boot = settings.get('Misc', {}).get('Boot', {})
+        self.audio = audio.get('AudioSupport', False)
+        self.assist = self.audio and boot.get('PickerAudioAssist', False)
+        self.chime = self.audio and audio.get('PlayChime', 'Auto') != 'Disabled'
+        self.canopy = 'OpenCanopy.efi' in self.drivers
+        variant = boot.get('PickerVariant', 'Auto')
+        self.themes = self.THEMES.get(variant, [variant.replace('\\', '/')])
+
+
+    @staticmethod
+    def enabled(settings, section, array):
+        """
+        Collects the paths of enabled array entries, a string entry being an enabled path.
+
+        :param settings: Dictionary of merged settings
+        :param section: Settings section name
+        :param array: Array name
+        :return: Set of paths
+        """
+        result = set()
+        for i in settings.get(section, {}).get(array, []):
+            if isinstance(i, str) and i:
+                result.add(i)
+            elif isinstance(i, dict) and i.get('Enabled', False) and i.get('Path'):
+                result.add(i['Path'])
+
+        return result
+
+
+    def required(self, name):
+        """
+        Verifies if a file is referenced by settings.
+
+        :param name: File path relative to OC directory
+        :return: True if file is required
+        """
+        parts = name.split('/')
+        relative = '/'.join(parts[1:])
+        if parts[0] == 'ACPI':
+            return relative in self.acpi
+        if parts[0] == 'Drivers':
+            return relative in self.drivers
+        if parts[0] == 'Tools':
+            return relative in self.tools
+        if parts[0] != 'Resources' or len(parts) < 3:
+            return True
+        if parts[1] == 'Audio':
+            return self.assist or self.chime and parts[-1] == self.CHIME
+        if parts[1] in ['Font', 'Label']:
+            return self.canopy
+        if parts[1] == 'Image':
+            return self.canopy and (len(parts) < 5 or '/'.join(parts[2:4]) in self.themes)
+
+        return True
+
+
+    def run(self, directory, dry_run=False, keep=None):
+        """
+        Removes the files not referenced by settings.
+
+        :param directory: Path of the OC directory
+        :param dry_run: Report the files without removing them
+        :param keep: Directory where removed files are moved, with their relative path, deleted if None
+        :return: Dictionary of removed files list and bytes count
+        """
+        result = {'bytes': 0, 'files': []}
+        for root, directories, files in walk(directory, topdown=False):
+            for i in files:
+                file = path.join(root, i)
+                name = path.relpath(file, directory).replace(path.sep, '/')
+                if not self.required(name):
+                    result['bytes'] += path.getsize(file)
+                    result['files'].append(name)
+                    if dry_run:
+                        continue
+                    if keep is None:
+                        remove(file)
+                        continue
+                    target = path.join(keep, name)
+                    makedirs(path.dirname(target), exist_ok=True)
+                    replace(file, target)
+            if not dry_run and root != directory and not listdir(root):
+                rmdir(root)
+
+        return result
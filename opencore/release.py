@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+from io import BytesIO
+from json import dump, load, loads
+from os import makedirs, path, replace
+from re import fullmatch
+from tempfile import mkstemp
+from threading import RLock
+from time import time
+
+from opencore.download import DownloadError, Downloader
+
+
+class ReleaseError(Exception):
+    """
+    ReleaseError reports a version specifier not matching any published release.
+    """
+
+
+class ReleaseIndex:
+    """
+    ReleaseIndex resolves release version specifiers, against a locally cached release index.
+    """
+    API = 'https://api.github.com/repos/{0}/{1}/releases?per_page=100'
+    OPERATORS = ['~=', '==', '!=', '>=', '<=', '>', '<']
+
+
+    def __init__(self, file='files/releases.json', ttl=3600, api=API, downloader=None):
+        """
+        Constructs a new 'ReleaseIndex' object.
+
+        :param file: Path of the release index file
+        :param ttl: Number of seconds a project index is reused before refresh, never refreshed if None
+        :param api: Releases API url template, formatted with repo and project names
+        :param downloader: Downloader object, a new one if None
+        :return: Nothing
+        """
+        self.api = api
+        self.counters = {'hits': 0, 'refreshes': 0, 'stale': 0}
+        self.downloader = downloader or Downloader()
+        self.file = file
+        self.lock = RLock()
+        self.ttl = ttl
+        self.index = self.read_index()
+
+
+    def __getstate__(self):
+        """
+        Gets the pickled state, without the lock and downloader connections.
+
+        :return: Dictionary of attributes
+        """
+        result = dict(self.__dict__)
+        result['downloader'] = None
+        result['lock'] = None
+
+        return result
+
+
+    def __setstate__(self, state):
+        """
+        Restores the pickled state, with a new lock and downloader.
+
+        :param state: Dictionary of attributes
+        :return: Nothing
+        """
+        self.__dict__.update(state)
+        self.downloader = Downloader()
+        self.lock = RLock()
+
+
+    @staticmethod
+    def compare(version, operator, target):
+        """
+        Compares a version against a specifier target.
+
+        :param version: Tuple of version numbers
+        :param operator: Specifier operator
+        :param target: Tuple of target version numbers
+        :return: True if version satisfies the comparison
+        """
+        size = max(len(version), len(target))
+        version = version + (0,) * (size - len(version))
+        padded = target + (0,) * (size - len(target))
+        if operator == '~=':
+            return version >= padded and version[:len(target) - 1] == target[:-1]
+        if operator == '==':
+            return version == padded
+        if operator == '!=':
+            return version != padded
+        if operator == '>=':
+            return version >= padded
+        if operator == '<=':
+            return version <= padded
+        if operator == '>':
+            return version > padded
+
+        return version < padded
+
+
+    @staticmethod
+    def exact(specifier):
+        """
+        Verifies if a version specifier names a single version.
+
+        :param specifier: Version specifier
+        :return: True if specifier is an exact version
+        """
+        return specifier != 'latest' and not any(i in specifier for i in '~=!<>,')
+
+
+    def fetch(self, repo, project):
+        """
+        Fetches the published releases of a project.
+
+        :param repo: Repo name
+        :param project: Project name
+        :return: Dictionary of releases, keyed by version
+        """
+        buffer = BytesIO()
+        self.downloader.stream(self.api.format(repo, project), buffer)
+        result = {}
+        for i in loads(buffer.getvalue().decode('UTF-8')):
+            if i.get('draft') or i.get('prerelease'):
+                continue
+            tag = i['tag_name']
+            result[tag[1:] if tag.startswith('v') else tag] = {
+                'assets': {a['name']: a['browser_download_url'] for a in i.get('assets', [])},
+                'tag': tag
+            }
+
+        return result
+
+
+    @staticmethod
+    def parse(version):
+        """
+        Parses a dotted numeric version.
+
+        :param version: Version string
+        :return: Tuple of version numbers or None if version is not numeric
+        """
+        if fullmatch(r'\d+(\.\d+)*', version) is None:
+            return None
+
+        return tuple(int(i) for i in version.split('.'))
+
+
+    def read_index(self):
+        """
+        Reads the release index file.
+
+        :return: Dictionary of project indexes
+        """
+        try:
+            with open(self.file, 'r') as f:
+                return load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+    def releases(self, repo, project):
+        """
+        Gets the published releases of a project, refreshing the index once expired.
+        An expired index is still used, when releases cannot be fetched.
+
+        :param repo: Repo name
+        :param project: Project name
+        :return: Dictionary of releases, keyed by version
+        """
+        key = '{0}/{1}'.format(repo, project)
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is not None and (self.ttl is None or time() - entry['fetched'] < self.ttl):
+                self.counters['hits'] += 1
+                return entry['releases']
+            try:
+                releases = self.fetch(repo, project)
+            except (DownloadError, ValueError, KeyError):
+                if entry is None:
+                    raise
+                self.counters['stale'] += 1
+                return entry['releases']
+            self.counters['refreshes'] += 1
+            self.index[key] = {'fetched': time(), 'releases': releases}
+            self.write_index()
+
+        return releases
+
+
+    def resolve(self, repo, project, specifier):
+        """
+        Resolves a version specifier into the highest matching published version.
+
+        :param repo: Repo name
+        :param project: Project name
+        :param specifier: Exact version, 'latest' or comma separated comparisons, like '~=1.6' or '>=0.9.0,<1.0'
+        :return: Version string
+        """
+        if self.exact(specifier):
+            return specifier
+        clauses = []
+        if specifier != 'latest':
+            for i in specifier.split(','):
+                i = i.strip()
+                operator = next((o for o in self.OPERATORS if i.startswith(o)), None)
+                target = self.parse(i[len(operator):].strip()) if operator is not None else None
+                if target is None:
+                    raise ReleaseError('{0}: invalid version specifier {1}'.format(project, specifier))
+                clauses.append((operator, target))
+        candidates = []
+        for version in self.releases(repo, project):
+            parsed = self.parse(version)
+            if parsed is not None and all(self.compare(parsed, o, t) for o, t in clauses):
+                candidates.append((parsed, version))
+        if not candidates:
+            raise ReleaseError('{0}: no release matches {1}'.format(project, specifier))
+
+        return max(candidates)[1]
+
+
+    def stats(self):
+        """
+        Reports the release index statistics.
+
+        :return: Dictionary of statistics
+        """
+        with self.lock:
+            result = dict(self.counters)
+            result['projects'] = len(self.index)
+
+        return result
+
+
+    def url(self, repo, project, version, release):
+        """
+        Gets the download url of a release file, from index if present.
+
+        :param repo: Repo name
+        :param project: Project name
+        :param version: Project version
+        :param release: Release file name
+        :return: Url string
+        """
+        entry = self.index.get('{0}/{1}'.format(repo, project), {}).get('releases', {}).get(version)
+        if entry is not None and release in entry['assets']:
+            return entry['assets'][release]
+        tag = entry['tag'] if entry is not None else version
+
+        return 'https://github.com/{0}/{1}/releases/download/{2}/{3}'.format(repo, project, tag, release)
+
+
+    def write_index(self):
+        """
+        Writes the release index file atomically.
+
+        :return: Nothing
+        """
+        directory = path.dirname(path.abspath(self.file))
+        makedirs(directory, exist_ok=True)
+        descriptor, temp = mkstemp(dir=directory)
+        with open(descriptor, 'w') as f:
+            dump(self.index, f, indent=2, sort_keys=True)
+        replace(temp, self.file)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+
+from contextlib import contextmanager
+from json import dump, dumps
+from logging import INFO, getLogger
+from os import makedirs, path, replace
+from tempfile import mkstemp
+from threading import Lock, local
+from time import perf_counter, thread_time
+
+
+class ConsoleSink:
+    """
+    ConsoleSink prints the build progress, each step followed by its status on the same line.
+    """
+    def __call__(self, event):
+        """
+        Prints a progress event.
+
+        :param event: Dictionary of event properties
+        :return: Nothing
+        """
+        if event['event'] == 'heading':
+            print('\033[1m{0}\033[0m'.format(event['text']))
+        elif event['event'] == 'step':
+            print('  - {0}...'.format(event['text']), end=' ')
+        elif event['event'] == 'status':
+            print(event['text'])
+        elif event['event'] == 'detail':
+            print('    {0}'.format(event['text']))
+
+
+class JsonSink:
+    """
+    JsonSink writes the finished build report into a JSON file.
+    """
+    def __init__(self, file):
+        """
+        Constructs a new 'JsonSink' object.
+
+        :param file: Report file path
+        :return: Nothing
+        """
+        self.file = file
+
+
+    def __call__(self, event):
+        """
+        Writes the report atomically, once the build report is finished.
+
+        :param event: Dictionary of event properties
+        :return: Nothing
+        """
+        if event['event'] != 'report':
+            return
+        directory = path.dirname(path.abspath(self.file))
+        makedirs(directory, exist_ok=True)
+        descriptor, temp = mkstemp(dir=directory)
+        with open(descriptor, 'w') as f:
+            dump(event['report'], f, indent=2, sort_keys=True)
+        replace(temp, self.file)
+
+
+class LoggingSink:
+    """
+    LoggingSink logs every event as a JSON encoded record, with the event dictionary attached as 'report' attribute.
+    """
+    def __init__(self, logger=None, level=INFO):
+        """
+        Constructs a new 'LoggingSink' object.
+
+        :param logger: Logger object, 'opencore' logger if None
+        :param level: Logging level
+        :return: Nothing
+        """
+        self.level = level
+        self.logger = logger or getLogger('opencore')
+
+
+    def __call__(self, event):
+        """
+        Logs an event.
+
+        :param event: Dictionary of event properties
+        :return: Nothing
+        """
+        self.logger.log(self.level, '%s', dumps(event, default=str, sort_keys=True), extra={'report': event})
+
+
+class BuildReport:
+    """
+    BuildReport records the build phase spans and I/O counters, forwarding progress events to sinks.
+    Sinks are callables receiving event dictionaries, like 'ConsoleSink', 'JsonSink' or 'LoggingSink' objects.
+    """
+    def __init__(self, sinks=None):
+        """
+        Constructs a new 'BuildReport' object.
+
+        :param sinks: List of sinks, a 'ConsoleSink' if None
+        :return: Nothing
+        """
+        self.counters = {}
+        self.local = local()
+        self.lock = Lock()
+        self.sinks = [ConsoleSink()] if sinks is None else sinks
+        self.spans = []
+        self.start = perf_counter()
+
+
+    def count(self, name, value=1):
+        """
+        Increments a counter, globally and into the open spans of current thread.
+
+        :param name: Counter name, like 'download.bytes'
+        :param value: Increment
+        :return: Nothing
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        for i in getattr(self.local, 'stack', []):
+            i['counters'][name] = i['counters'].get(name, 0) + value
+
+
+    def detail(self, text):
+        """
+        Emits a detail line of previous step.
+
+        :param text: Detail text
+        :return: Nothing
+        """
+        self.emit('detail', text=text)
+
+
+    def emit(self, event, **properties):
+        """
+        Forwards an event to all sinks.
+
+        :param event: Event name
+        :param properties: Event properties
+        :return: Nothing
+        """
+        properties['event'] = event
+        for sink in self.sinks:
+            sink(properties)
+
+
+    def finish(self, stats=None):
+        """
+        Generates the build report and forwards it to all sinks.
+
+        :param stats: Dictionary of component statistics
+        :return: Dictionary of build report
+        """
+        result = self.summary(stats)
+        self.emit('report', report=result)
+
+        return result
+
+
+    def heading(self, text):
+        """
+        Emits a heading, starting a group of steps.
+
+        :param text: Heading text
+        :return: Nothing
+        """
+        self.emit('heading', text=text)
+
+
+    @contextmanager
+    def span(self, name, **labels):
+        """
+        Measures the wall and CPU time of a build phase, nested spans are named after their parents.
+        CPU time is measured for the thread running the span.
+
+        :param name: Phase name, like 'extract'
+        :param labels: Phase labels, like project name
+        :return: Dictionary of span properties
+        """
+        stack = self.local.__dict__.setdefault('stack', [])
+        record = {
+            'counters': {},
+            'labels': labels,
+            'name': '{0}/{1}'.format(stack[-1]['name'], name) if stack else name
+        }
+        self.emit('start', name=record['name'], labels=labels)
+        stack.append(record)
+        cpu = thread_time()
+        wall = perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = type(e).__name__
+            raise
+        finally:
+            record['cpu'] = thread_time() - cpu
+            record['wall'] = perf_counter() - wall
+            stack.pop()
+            with self.lock:
+                self.spans.append(record)
+            self.emit('end', span=record)
+
+
+    def status(self, text):
+        """
+        Emits the status of current step.
+
+        :param text: Status text
+        :return: Nothing
+        """
+        self.emit('status', text=text)
+
+
+    def step(self, text):
+        """
+        Emits a step, followed by its status.
+
+        :param text: Step text
+        :return: Nothing
+        """
+        self.emit('step', text=text)
+
+
+    def summary(self, stats=None):
+        """
+        Summarizes the counters and spans, aggregating spans by name.
+        Components reporting 'hits' and 'misses' statistics get a 'hit_rate'.
+
+        :param stats: Dictionary of component statistics
+        :return: Dictionary of build report
+        """
+        phases = {}
+        with self.lock:
+            counters = dict(sorted(self.counters.items()))
+            spans = list(self.spans)
+        for i in spans:
+            phase = phases.setdefault(i['name'], {'count': 0, 'cpu': 0.0, 'wall': 0.0})
+            phase['count'] += 1
+            phase['cpu'] += i['cpu']
+            phase['wall'] += i['wall']
+        stats = {k: dict(v) for k, v in (stats or {}).items()}
+        for i in stats.values():
+            if 'hits' in i and 'misses' in i:
+                total = i['hits'] + i['misses']
+                i['hit_rate'] = i['hits'] / total if total else None
+
+        return {
+            'counters': counters,
+            'phases': phases,
+            'spans': spans,
+            'stats': stats,
+            'wall': perf_counter() - self.start
+        }
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+from os import makedirs, path, replace
+from plistlib import FMT_BINARY, dump, load
+from tempfile import mkstemp
+from threading import Lock
+from zipfile import BadZipfile, ZipFile
+
+
+class DefaultSchema:
+    """
+    DefaultSchema loads the version specific default settings, derived from release sample configurations.
+    """
+    BASELINE = '0.9.7'
+    SAMPLE = 'Docs/Sample.plist'
+    defaults = {}
+    lock = Lock()
+
+
+    def __init__(self, directory='files/schemas'):
+        """
+        Constructs a new 'DefaultSchema' object.
+
+        :param directory: Path of the derived defaults cache directory
+        :return: Nothing
+        """
+        self.directory = directory
+
+
+    def baseline(self):
+        """
+        Loads the default settings shipped with the builder.
+
+        :return: Dictionary of settings
+        """
+        if self.BASELINE not in self.defaults:
+            self.defaults[self.BASELINE] = self.read_schema(self.BASELINE)
+
+        return self.defaults[self.BASELINE]
+
+
+    @staticmethod
+    def derive(sample, baseline):
+        """
+        Derives the default settings from a release sample configuration.
+        Keys follow the sample, values follow the baseline when types match, arrays are emptied.
+
+        :param sample: Dictionary of sample settings
+        :param baseline: Dictionary of baseline default settings
+        :return: Dictionary of settings
+        """
+        result = {}
+        stack = [(sample, baseline, result)]
+        while stack:
+            source, reference, target = stack.pop()
+            for key, value in source.items():
+                if key.startswith('#'):
+                    continue
+                current = reference.get(key)
+                if isinstance(value, dict):
+                    target[key] = {}
+                    if not (isinstance(current, dict) and not current):
+                        stack.append((value, current if isinstance(current, dict) else {}, target[key]))
+                elif isinstance(value, list):
+                    target[key] = []
+                elif type(current) is type(value):
+                    target[key] = current
+                else:
+                    target[key] = type(value)()
+
+        return result
+
+
+    def load(self, version, archive=None):
+        """
+        Loads the default settings of an OpenCore version, from memory, disk cache or release archive.
+        Returned settings are shared by all builders and must be treated as read-only.
+
+        :param version: OpenCore version
+        :param archive: Release archive path, used to derive settings not cached yet
+        :return: Dictionary of settings, baseline settings if version is unknown
+        """
+        if version in self.defaults:
+            return self.defaults[version]
+        with self.lock:
+            if version in self.defaults:
+                return self.defaults[version]
+            result = self.read_schema(version)
+            if result is None and archive is not None:
+                try:
+                    with ZipFile(archive) as z:
+                        with z.open(self.SAMPLE) as f:
+                            sample = load(f)
+                except (BadZipfile, KeyError, OSError):
+                    sample = None
+                if sample is not None:
+                    result = self.derive(sample, self.baseline())
+                    self.write_schema(version, result)
+            if result is None:
+                return self.baseline()
+            self.defaults[version] = result
+
+        return result
+
+
+    def read_schema(self, version):
+        """
+        Reads the default settings shipped with the builder or cached on disk.
+
+        :param version: OpenCore version
+        :return: Dictionary of settings or None if not found
+        """
+        files = [
+            path.join(path.dirname(path.abspath(__file__)), 'schemas', '{0}.plist'.format(version)),
+            path.join(self.directory, '{0}.plist'.format(version))
+        ]
+        for i in files:
+            try:
+                with open(i, 'rb') as f:
+                    return load(f)
+            except (OSError, ValueError):
+                continue
+
+        return None
+
+
+    def write_schema(self, version, settings):
+        """
+        Writes the derived default settings into disk cache, as binary property list.
+
+        :param version: OpenCore version
+        :param settings: Dictionary of settings
+        :return: Nothing
+        """
+        makedirs(self.directory, exist_ok=True)
+        descriptor, temp = mkstemp(dir=self.directory)
+        with open(descriptor, 'wb') as f:
+            dump(settings, f, fmt=FMT_BINARY, sort_keys=True)
+        replace(temp, path.join(self.directory, '{0}.plist'.format(version)))
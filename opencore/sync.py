@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from os import chmod, close, fstat, link, makedirs, path, readlink, remove, replace, rmdir, scandir, symlink, utime
+from shutil import copyfileobj
+from stat import S_IMODE, S_ISLNK
+from tempfile import mkstemp
+
+from opencore.host import HostProbe
+from opencore.util import hash_file
+
+try:
+    from fcntl import ioctl
+except ImportError:
+    ioctl = None
+
+try:
+    from os import copy_file_range
+except ImportError:
+    copy_file_range = None
+
+try:
+    from os import sendfile
+except ImportError:
+    sendfile = None
+
+FICLONE = 0x40049409
+
+
+class TreeSync:
+    """
+    TreeSync mirrors a source directory into a destination directory.
+    """
+    FAT = ['exfat', 'fat', 'msdos', 'vfat']
+
+
+    def __init__(self, compare='mtime', link=None, delete=False, dry_run=False, precision=None, workers=4, exclude=None,
+                 host=None):
+        """
+        Constructs a new 'TreeSync' object.
+
+        :param compare: Files comparison method, 'mtime' for size and mtime_ns or 'hash' for size and sha256
+        :param link: Link files instead of copying them, 'hardlink' or 'reflink'
+        :param delete: Delete destination files not present into source
+        :param dry_run: Report the actions without applying them
+        :param precision: Modification time tolerance in nanoseconds, 2 seconds on FAT destinations and exact otherwise if None
+        :param workers: Number of concurrent copies for large trees
+        :param exclude: List of relative path patterns ignored into source and destination
+        :param host: HostProbe object used to detect destination filesystems, a new one if None
+        :return: Nothing
+        """
+        self.compare = compare
+        self.delete = delete
+        self.dry_run = dry_run
+        self.exclude = exclude or []
+        self.host = host or HostProbe()
+        self.link = link
+        self.precision = precision
+        self.precisions = {}
+        self.threshold = 64
+        self.workers = workers
+
+
+    def changed(self, source, destination, s, d):
+        """
+        Verifies if a destination file differs from its source.
+
+        :param source: Source file path
+        :param destination: Destination file path
+        :param s: Source file status
+        :param d: Destination file status or None
+        :return: True if file must be copied
+        """
+        if d is None or s.st_size != d.st_size:
+            return True
+        if S_ISLNK(s.st_mode) or S_ISLNK(d.st_mode):
+            return not (S_ISLNK(s.st_mode) and S_ISLNK(d.st_mode) and readlink(source) == readlink(destination))
+        if self.compare == 'hash':
+            return hash_file(source) != hash_file(destination)
+
+        return abs(s.st_mtime_ns - d.st_mtime_ns) > self.tolerance(destination)
+
+
+    def copy_data(self, source, destination, size):
+        """
+        Copies the file data with copy_file_range or sendfile, falling back to buffered copy.
+
+        :param source: Source file object
+        :param destination: Destination file object
+        :param size: Number of bytes to copy
+        :return: Nothing
+        """
+        offset = 0
+        for method in [copy_file_range, sendfile]:
+            if method is None:
+                continue
+            try:
+                while offset < size:
+                    if method is copy_file_range:
+                        count = method(source.fileno(), destination.fileno(), size - offset, offset, offset)
+                    else:
+                        count = method(destination.fileno(), source.fileno(), offset, size - offset)
+                    if count == 0:
+                        break
+                    offset += count
+                if offset >= size:
+                    return
+            except OSError:
+                continue
+        source.seek(offset)
+        destination.seek(offset)
+        copyfileobj(source, destination, 1024 * 1024)
+
+
+    def copy_file(self, source, destination, status):
+        """
+        Copies a file atomically, with kernel zero-copy or links when available.
+        Symbolic links are recreated with the same target.
+
+        :param source: Source file path
+        :param destination: Destination file path
+        :param status: Source file status, without following symbolic links
+        :return: Action name
+        """
+        descriptor, temp = mkstemp(dir=path.dirname(destination))
+        close(descriptor)
+        try:
+            if S_ISLNK(status.st_mode):
+                remove(temp)
+                symlink(readlink(source), temp)
+                replace(temp, destination)
+                return 'copy'
+            if self.link == 'hardlink':
+                remove(temp)
+                try:
+                    link(source, temp)
+                except OSError:
+                    descriptor, temp = mkstemp(dir=path.dirname(destination))
+                    close(descriptor)
+                else:
+                    replace(temp, destination)
+                    return 'link'
+            with open(source, 'rb') as s, open(temp, 'wb') as d:
+                if not (self.link == 'reflink' and self.reflink(s, d)):
+                    self.copy_data(s, d, status.st_size)
+            chmod(temp, S_IMODE(status.st_mode))
+            utime(temp, ns=(status.st_atime_ns, status.st_mtime_ns))
+            replace(temp, destination)
+        except BaseException:
+            if path.lexists(temp):
+                remove(temp)
+            raise
+
+        return 'copy'
+
+
+    def reflink(self, source, destination):
+        """
+        Clones the file data with copy-on-write, when the filesystem supports it.
+
+        :param source: Source file object
+        :param destination: Destination file object
+        :return: True if file was cloned
+        """
+        if ioctl is None:
+            return False
+        try:
+            ioctl(destination.fileno(), FICLONE, source.fileno())
+        except OSError:
+            return False
+
+        return fstat(destination.fileno()).st_size == fstat(source.fileno()).st_size
+
+
+    def scan(self, directory):
+        """
+        Scans a directory tree with a single scandir pass.
+
+        :param directory: Directory path
+        :return: Tuple of directories list and dictionary of file statuses
+        """
+        directories = []
+        files = {}
+        stack = ['']
+        while stack:
+            relative = stack.pop()
+            try:
+                entries = scandir(path.join(directory, relative))
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    name = path.join(relative, entry.name)
+                    if any(fnmatchcase(name, i) for i in self.exclude):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(name)
+                        stack.append(name)
+                    else:
+                        files[name] = entry.stat(follow_symlinks=False)
+
+        return directories, files
+
+
+    def sync(self, source, destination):
+        """
+        Synchronizes the destination directory with source directory.
+
+        :param source: Source directory path
+        :param destination: Destination directory path
+        :return: Dictionary of action counters and list of actions
+        """
+        result = {'actions': [], 'bytes': 0, 'copy': 0, 'delete': 0, 'link': 0, 'skip': 0}
+        source_directories, source_files = self.scan(source)
+        destination_directories, destination_files = self.scan(destination)
+        copies = []
+        for name, status in source_files.items():
+            d = destination_files.get(name)
+            if self.changed(path.join(source, name), path.join(destination, name), status, d):
+                copies.append((name, status))
+                result['actions'].append(('copy', name))
+            else:
+                result['skip'] += 1
+        deletions = []
+        if self.delete:
+            deletions = sorted(set(destination_files) - set(source_files))
+            deletions += sorted(set(destination_directories) - set(source_directories), reverse=True)
+            result['actions'].extend(('delete', i) for i in deletions)
+        if self.dry_run:
+            return result
+
+        makedirs(destination, exist_ok=True)
+        for i in sorted(set(source_directories) - set(destination_directories)):
+            makedirs(path.join(destination, i), exist_ok=True)
+
+        def copy(item):
+            name, status = item
+            return self.copy_file(path.join(source, name), path.join(destination, name), status), status.st_size
+
+        if len(copies) >= self.threshold and self.workers > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                actions = list(executor.map(copy, copies))
+        else:
+            actions = [copy(i) for i in copies]
+        for action, size in actions:
+            result[action] += 1
+            result['bytes'] += size
+        for i in deletions:
+            target = path.join(destination, i)
+            if i in destination_directories:
+                rmdir(target)
+            else:
+                remove(target)
+            result['delete'] += 1
+
+        return result
+
+
+    def tolerance(self, destination):
+        """
+        Gets the modification time tolerance of a destination file, FAT filesystems store 2 seconds steps.
+
+        :param destination: Destination file path
+        :return: Tolerance in nanoseconds
+        """
+        if self.precision is not None:
+            return self.precision
+        parent = path.dirname(path.abspath(destination))
+        if parent not in self.precisions:
+            self.precisions[parent] = 2 * 10 ** 9 if self.host.filesystem(parent) in self.FAT else 0
+
+        return self.precisions[parent]
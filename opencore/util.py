@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+from contextlib import contextmanager
+from hashlib import sha256
+from os import makedirs, path
+from plistlib import dumps, FMT_XML
+
+try:
+    from fcntl import LOCK_EX, LOCK_UN, flock
+except ImportError:
+    flock = None
+
+
+def hash_file(file):
+    """
+    Computes the sha256 digest of a file.
+
+    :param file: File path or binary file object, read from start and rewound
+    :return: Hexadecimal digest string
+    """
+    result = sha256()
+    if not isinstance(file, str):
+        file.seek(0)
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            result.update(chunk)
+        file.seek(0)
+        return result.hexdigest()
+    with open(file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            result.update(chunk)
+
+    return result.hexdigest()
+
+
+def hash_settings(settings):
+    """
+    Computes the sha256 digest of canonical settings.
+
+    :param settings: Dictionary of settings
+    :return: Hexadecimal digest string
+    """
+    return sha256(dumps(settings, fmt=FMT_XML, sort_keys=True)).hexdigest()
+
+
+@contextmanager
+def lock_file(file):
+    """
+    Holds an exclusive advisory lock on a file, shared by all processes using the same file.
+
+    :param file: Lock file path, created if missing
+    :return: Nothing
+    """
+    makedirs(path.dirname(path.abspath(file)), exist_ok=True)
+    with open(file, 'a') as f:
+        if flock is not None:
+            flock(f.fileno(), LOCK_EX)
+        try:
+            yield
+        finally:
+            if flock is not None:
+                flock(f.fileno(), LOCK_UN)
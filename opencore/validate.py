@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from json import dump, load
+from os import cpu_count, makedirs, path, replace
+from plistlib import load as load_plist
+from tempfile import mkstemp
+
+from opencore.util import hash_settings
+
+Issue = namedtuple('Issue', ['path', 'message'])
+
+
+class BatchValidator:
+    """
+    BatchValidator validates many configurations, validating identical configurations once.
+    """
+    def __init__(self, defaults, version, workers=None, file=None):
+        """
+        Constructs a new 'BatchValidator' object.
+
+        :param defaults: Dictionary of default settings, describing the schema
+        :param version: OpenCore version
+        :param workers: Number of validation processes, CPU count if None
+        :param file: Path of the persistent results cache file
+        :return: Nothing
+        """
+        self.file = file
+        self.results = self.read_results()
+        self.stats = {'hits': 0, 'misses': 0}
+        self.threshold = 16
+        self.validator = ConfigValidator(defaults, version=version)
+        self.version = version
+        self.workers = workers
+
+
+    def read_results(self):
+        """
+        Reads the persistent results cache.
+
+        :return: Dictionary of issue lists, keyed by version and settings digest
+        """
+        result = {}
+        if self.file is not None:
+            try:
+                with open(self.file, 'r') as f:
+                    result = {k: [Issue(*i) for i in v] for k, v in load(f).items()}
+            except (OSError, ValueError):
+                pass
+
+        return result
+
+
+    def validate(self, items):
+        """
+        Validates build directories or settings dictionaries.
+
+        :param items: List of build directory paths or settings dictionaries
+        :return: List of issue lists, in items order
+        """
+        configs = []
+        for i in items:
+            if isinstance(i, str):
+                with open('{0}/EFI/OC/config.plist'.format(i), 'rb') as f:
+                    configs.append((i, load_plist(f)))
+            else:
+                configs.append((None, i))
+        keys = ['{0}:{1}'.format(self.version, hash_settings(i)) for _, i in configs]
+        pending = {}
+        for key, (_, settings) in zip(keys, configs):
+            if key in self.results or key in pending:
+                self.stats['hits'] += 1
+            else:
+                self.stats['misses'] += 1
+                pending[key] = settings
+        if len(pending) >= self.threshold and self.workers != 1:
+            workers = self.workers or cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunk = max(1, len(pending) // (4 * workers))
+                results = list(executor.map(self.validator.validate, pending.values(), chunksize=chunk))
+        else:
+            results = [self.validator.validate(i) for i in pending.values()]
+        self.results.update(zip(pending, results))
+        if pending:
+            self.write_results()
+        result = []
+        for key, (directory, settings) in zip(keys, configs):
+            issues = list(self.results[key])
+            if directory is not None:
+                issues = sorted(issues + ConfigValidator(None, directory, self.version).check_files(settings))
+            result.append(issues)
+
+        return result
+
+
+    def write_results(self):
+        """
+        Writes the persistent results cache atomically.
+
+        :return: Nothing
+        """
+        if self.file is None:
+            return
+        parent = path.dirname(path.abspath(self.file))
+        makedirs(parent, exist_ok=True)
+        descriptor, temp = mkstemp(dir=parent)
+        with open(descriptor, 'w') as f:
+            dump(self.results, f, indent=2, sort_keys=True)
+        replace(temp, self.file)
+
+
+class ConfigValidator:
+    """
+    ConfigValidator checks the config.plist settings against the OpenCore schema.
+    """
+    ENTRIES = {
+        'ACPI.Add': {'Comment': str, 'Enabled': bool, 'Path': str},
+        'ACPI.Delete': {
+            'All': bool, 'Comment': str, 'Enabled': bool, 'OemTableId': bytes,
+            'TableLength': int, 'TableSignature': bytes
+        },
+        'ACPI.Patch': {
+            'Base': str, 'BaseSkip': int, 'Comment': str, 'Count': int, 'Enabled': bool,
+            'Find': bytes, 'Limit': int, 'Mask': bytes, 'OemTableId': bytes, 'Replace': bytes,
+            'ReplaceMask': bytes, 'Skip': int, 'TableLength': int, 'TableSignature': bytes
+        },
+        'Booter.MmioWhitelist': {'Address': int, 'Comment': str, 'Enabled': bool},
+        'Booter.Patch': {
+            'Arch': str, 'Comment': str, 'Count': int, 'Enabled': bool, 'Find': bytes,
+            'Identifier': str, 'Limit': int, 'Mask': bytes, 'Replace': bytes, 'ReplaceMask': bytes,
+            'Skip': int
+        },
+        'Kernel.Add': {
+            'Arch': str, 'BundlePath': str, 'Comment': str, 'Enabled': bool, 'ExecutablePath': str,
+            'MaxKernel': str, 'MinKernel': str, 'PlistPath': str
+        },
+        'Kernel.Block': {
+            'Arch': str, 'Comment': str, 'Enabled': bool, 'Identifier': str, 'MaxKernel': str,
+            'MinKernel': str, 'Strategy': str
+        },
+        'Kernel.Force': {
+            'Arch': str, 'BundlePath': str, 'Comment': str, 'Enabled': bool, 'ExecutablePath': str,
+            'Identifier': str, 'MaxKernel': str, 'MinKernel': str, 'PlistPath': str
+        },
+        'Kernel.Patch': {
+            'Arch': str, 'Base': str, 'Comment': str, 'Count': int, 'Enabled': bool, 'Find': bytes,
+            'Identifier': str, 'Limit': int, 'Mask': bytes, 'MaxKernel': str, 'MinKernel': str,
+            'Replace': bytes, 'ReplaceMask': bytes, 'Skip': int
+        },
+        'Misc.BlessOverride': str,
+        'Misc.Entries': {
+            'Arguments': str, 'Auxiliary': bool, 'Comment': str, 'Enabled': bool, 'Flavour': str,
+            'FullNvramAccess': bool, 'Name': str, 'Path': str, 'TextMode': bool
+        },
+        'Misc.Tools': {
+            'Arguments': str, 'Auxiliary': bool, 'Comment': str, 'Enabled': bool, 'Flavour': str,
+            'FullNvramAccess': bool, 'Name': str, 'Path': str, 'RealPath': bool, 'TextMode': bool
+        },
+        'PlatformInfo.Memory.Devices': {
+            'AssetTag': str, 'BankLocator': str, 'DeviceLocator': str, 'Manufacturer': str,
+            'PartNumber': str, 'SerialNumber': str, 'Size': int, 'Speed': int
+        },
+        'UEFI.Drivers': {'Arguments': str, 'Comment': str, 'Enabled': bool, 'LoadEarly': bool, 'Path': str},
+        'UEFI.ReservedMemory': {'Address': int, 'Comment': str, 'Enabled': bool, 'Size': int, 'Type': str}
+    }
+    ENUMS = {
+        'Booter.Patch.Arch': ['Any', 'i386', 'x86_64'],
+        'Kernel.Add.Arch': ['Any', 'i386', 'x86_64'],
+        'Kernel.Block.Arch': ['Any', 'i386', 'x86_64'],
+        'Kernel.Block.Strategy': ['Disable', 'Exclude'],
+        'Kernel.Force.Arch': ['Any', 'i386', 'x86_64'],
+        'Kernel.Patch.Arch': ['Any', 'i386', 'x86_64'],
+        'Kernel.Scheme.KernelArch': ['Auto', 'i386', 'i386-user32', 'x86_64'],
+        'Kernel.Scheme.KernelCache': ['Auto', 'Cacheless', 'Mkext', 'Prelinked'],
+        'Misc.Boot.HibernateMode': ['None', 'Auto', 'RTC', 'NVRAM'],
+        'Misc.Boot.LauncherOption': ['Disabled', 'Full', 'Short', 'System'],
+        'Misc.Boot.PickerMode': ['Builtin', 'External', 'Apple'],
+        'Misc.Security.DmgLoading': ['Disabled', 'Signed', 'Any'],
+        'Misc.Security.SecureBootModel': [
+            'Default', 'Disabled', 'j137', 'j680', 'j132', 'j174', 'j140k', 'j780', 'j213', 'j140a',
+            'j152f', 'j160', 'j230k', 'j214k', 'j223', 'j215', 'j185', 'j185f', 'x86legacy'
+        ],
+        'Misc.Security.Vault': ['Optional', 'Basic', 'Secure'],
+        'PlatformInfo.Generic.SystemMemoryStatus': ['Auto', 'Upgradable', 'Soldered'],
+        'PlatformInfo.UpdateSMBIOSMode': ['TryOverwrite', 'Create', 'Overwrite', 'Custom'],
+        'UEFI.AppleInput.AppleEvent': ['Auto', 'Builtin', 'OEM'],
+        'UEFI.Audio.PlayChime': ['Auto', 'Enabled', 'Disabled'],
+        'UEFI.Input.KeySupportMode': ['Auto', 'V1', 'V2', 'AMI'],
+        'UEFI.Input.PointerSupportMode': ['', 'ASUS'],
+        'UEFI.Output.GopPassThrough': ['Enabled', 'Disabled', 'Apple'],
+        'UEFI.Output.InitialMode': ['Auto', 'Text', 'Graphics'],
+        'UEFI.Output.TextRenderer': ['BuiltinGraphics', 'BuiltinText', 'SystemGraphics', 'SystemText', 'SystemGeneric'],
+        'UEFI.ReservedMemory.Type': [
+            'Reserved', 'LoaderCode', 'LoaderData', 'BootServiceCode', 'BootServiceData',
+            'RuntimeCode', 'RuntimeData', 'Available', 'Persistent', 'UnusableMemory',
+            'ACPIReclaimMemory', 'ACPIMemoryNVS', 'MemoryMappedIO', 'MemoryMappedIOPortSpace', 'PalCode'
+        ]
+    }
+    FILES = {
+        'ACPI.Add': ('EFI/OC/ACPI', 'Path'),
+        'Kernel.Add': ('EFI/OC/Kexts', 'BundlePath'),
+        'Misc.Tools': ('EFI/OC/Tools', 'Path'),
+        'UEFI.Drivers': ('EFI/OC/Drivers', 'Path')
+    }
+    PATCHES = ['ACPI.Patch', 'Booter.Patch', 'Kernel.Patch']
+    schemas = {}
+
+
+    def __init__(self, defaults, directory=None, version=None):
+        """
+        Constructs a new 'ConfigValidator' object.
+
+        :param defaults: Dictionary of default settings, describing the schema
+        :param directory: Path of the build directory, to verify referenced files
+        :param version: OpenCore version, used as compiled schema cache key
+        :return: Nothing
+        """
+        self.directory = directory
+        if version is not None and version in self.schemas:
+            self.schema = self.schemas[version]
+        else:
+            self.schema = self.compile(defaults)
+            if version is not None:
+                self.schemas[version] = self.schema
+
+
+    def check_entries(self, name, entries, issues):
+        """
+        Verifies the array entries semantics and patches.
+
+        :param name: Array path
+        :param entries: List of entries
+        :param issues: List of issues to update
+        :return: Nothing
+        """
+        seen = set()
+        for index, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                continue
+            location = '{0}[{1}]'.format(name, index)
+            find, replace = entry.get('Find', b''), entry.get('Replace', b'')
+            if name in self.PATCHES and isinstance(find, bytes) and isinstance(replace, bytes):
+                if len(find) != len(replace):
+                    issues.append(Issue(location, 'Find and Replace have different lengths'))
+                for key, reference in [('Mask', find), ('ReplaceMask', replace)]:
+                    if isinstance(entry.get(key), bytes) and entry[key] and len(entry[key]) != len(reference):
+                        issues.append(Issue(location, '{0} length does not match pattern length'.format(key)))
+            if name not in self.FILES or not entry.get('Enabled', False):
+                continue
+            value = entry.get(self.FILES[name][1], '')
+            if not isinstance(value, str):
+                continue
+            if value in seen:
+                issues.append(Issue(location, 'Duplicate {0} {1}'.format(self.FILES[name][1], value)))
+            seen.add(value)
+
+
+    def check_files(self, settings):
+        """
+        Verifies the files referenced by enabled entries exist into build directory.
+
+        :param settings: Dictionary of settings
+        :return: List of issues
+        """
+        issues = []
+        for name, (directory, key) in self.FILES.items():
+            section, array = name.split('.')
+            entries = settings.get(section, {}).get(array, [])
+            if not isinstance(entries, list):
+                continue
+            for index, entry in enumerate(entries):
+                if not isinstance(entry, dict) or not entry.get('Enabled', False):
+                    continue
+                if not isinstance(entry.get(key), str):
+                    continue
+                base = path.join(self.directory, directory, entry[key])
+                files = [base]
+                if name == 'Kernel.Add':
+                    files = [path.join(base, entry.get('PlistPath', ''))]
+                    if entry.get('ExecutablePath'):
+                        files.append(path.join(base, entry['ExecutablePath']))
+                for i in files:
+                    if not path.isfile(i):
+                        location = '{0}[{1}]'.format(name, index)
+                        issues.append(Issue(location, 'Missing file {0}'.format(path.relpath(i, self.directory))))
+
+        return issues
+
+
+    def check_type(self, name, value, expected, issues):
+        """
+        Verifies a value type, not accepting booleans as integers.
+
+        :param name: Value path
+        :param value: Value to verify
+        :param expected: Expected type
+        :param issues: List of issues to update
+        :return: True if value type is valid
+        """
+        if type(value) is bool and expected is not bool or not isinstance(value, expected):
+            issues.append(Issue(name, 'Expected {0}, got {1}'.format(expected.__name__, type(value).__name__)))
+            return False
+
+        return True
+
+
+    def compile(self, defaults):
+        """
+        Compiles the default settings into a flat schema.
+
+        :param defaults: Dictionary of default settings
+        :return: Dictionary of schema nodes, keyed by path
+        """
+        result = {}
+        stack = [('', defaults)]
+        while stack:
+            name, value = stack.pop()
+            if isinstance(value, dict):
+                if name and not value:
+                    result[name] = ('map', None)
+                    continue
+                result[name] = ('dict', set(value))
+                for key, item in value.items():
+                    stack.append(('{0}.{1}'.format(name, key) if name else key, item))
+            elif isinstance(value, list):
+                result[name] = ('list', self.ENTRIES.get(name))
+            else:
+                result[name] = ('leaf', type(value))
+
+        return result
+
+
+    def validate(self, settings):
+        """
+        Validates the settings.
+
+        :param settings: Dictionary of settings
+        :return: List of issues
+        """
+        issues = self.check_files(settings) if self.directory is not None else []
+        stack = [('', '', settings)]
+        while stack:
+            name, location, value = stack.pop()
+            kind, detail = self.schema.get(name, ('unknown', None))
+            if kind == 'unknown':
+                issues.append(Issue(location, 'Unknown key'))
+            elif kind == 'map':
+                self.check_type(location, value, dict, issues)
+            elif kind == 'leaf':
+                if self.check_type(location, value, detail, issues) and name in self.ENUMS:
+                    if value not in self.ENUMS[name]:
+                        issues.append(Issue(location, 'Invalid value {0}'.format(value)))
+            elif kind == 'dict':
+                if not self.check_type(location or 'root', value, dict, issues):
+                    continue
+                for key in sorted(detail - set(value)):
+                    issues.append(Issue('{0}.{1}'.format(location, key) if location else key, 'Missing key'))
+                for key, item in value.items():
+                    if not key.startswith('#'):
+                        child = '{0}.{1}'.format(name, key) if name else key
+                        stack.append((child, '{0}.{1}'.format(location, key) if location else key, item))
+            elif kind == 'list':
+                if not self.check_type(location, value, list, issues):
+                    continue
+                for index, entry in enumerate(value):
+                    self.validate_entry(name, '{0}[{1}]'.format(location, index), entry, detail, issues)
+                self.check_entries(name, value, issues)
+
+        return sorted(issues)
+
+
+    def validate_entry(self, name, location, entry, schema, issues):
+        """
+        Validates an array entry.
+
+        :param name: Array path
+        :param location: Entry location
+        :param entry: Entry to validate
+        :param schema: Entry schema, a type or dictionary of key types
+        :param issues: List of issues to update
+        :return: Nothing
+        """
+        if schema is None:
+            return
+        if not isinstance(schema, dict):
+            self.check_type(location, entry, schema, issues)
+            return
+        if not self.check_type(location, entry, dict, issues):
+            return
+        for key, value in entry.items():
+            if key.startswith('#'):
+                continue
+            if key not in schema:
+                issues.append(Issue('{0}.{1}'.format(location, key), 'Unknown key'))
+            elif self.check_type('{0}.{1}'.format(location, key), value, schema[key], issues):
+                enum = '{0}.{1}'.format(name, key)
+                if enum in self.ENUMS and value not in self.ENUMS[enum]:
+                    issues.append(Issue('{0}.{1}'.format(location, key), 'Invalid value {0}'.format(value)))
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser
+from ctypes import get_errno
+from os import close, path, read, stat, strerror
+from runpy import run_path
+from select import select
+from struct import unpack_from
+from sys import platform
+from time import monotonic, perf_counter, sleep
+
+from opencore.build import OpenCoreBuild
+from opencore.host import HostProbe
+from opencore.report import BuildReport
+
+
+class PollingWatcher:
+    """
+    PollingWatcher detects file changes by comparing their modification time and size periodically.
+    """
+    def __init__(self, files, interval=0.5):
+        """
+        Constructs a new 'PollingWatcher' object.
+
+        :param files: List of watched file paths
+        :param interval: Number of seconds between checks
+        :return: Nothing
+        """
+        self.files = {path.abspath(i) for i in files}
+        self.interval = interval
+        self.states = self.scan()
+
+
+    def close(self):
+        """
+        Releases the watcher resources.
+
+        :return: Nothing
+        """
+
+
+    def scan(self):
+        """
+        Reads the watched files status.
+
+        :return: Dictionary of modification time and size tuples, None for missing files
+        """
+        result = {}
+        for i in self.files:
+            try:
+                status = stat(i)
+                result[i] = (status.st_mtime_ns, status.st_size)
+            except FileNotFoundError:
+                result[i] = None
+
+        return result
+
+
+    def wait(self, timeout=None):
+        """
+        Waits until watched files change.
+
+        :param timeout: Number of seconds to wait, forever if None
+        :return: Set of changed file paths, empty once timeout expired
+        """
+        deadline = monotonic() + timeout if timeout is not None else None
+        while True:
+            states = self.scan()
+            result = {k for k, v in states.items() if v != self.states[k]}
+            self.states = states
+            if result:
+                return result
+            if deadline is not None and monotonic() >= deadline:
+                return set()
+            sleep(self.interval if deadline is None else max(0, min(self.interval, deadline - monotonic())))
+
+
+class InotifyWatcher(PollingWatcher):
+    """
+    InotifyWatcher detects file changes through Linux inotify, watching the parent directories of files.
+    Parent directories are watched, so files replaced by editors with a rename are still detected.
+    """
+    EVENTS = 0x0008 | 0x0080 | 0x0100 | 0x0200
+    FLAGS = 0o4000 | 0o2000000
+
+
+    def __init__(self, files, interval=0.05):
+        """
+        Constructs a new 'InotifyWatcher' object.
+
+        :param files: List of watched file paths
+        :param interval: Number of seconds events are collected after first event, grouping editor writes
+        :return: Nothing
+        """
+        super().__init__(files, interval)
+        libc = HostProbe().libc()
+        self.descriptor = libc.inotify_init1(self.FLAGS)
+        if self.descriptor < 0:
+            raise OSError(get_errno(), strerror(get_errno()))
+        self.directories = {}
+        for i in sorted({path.dirname(i) for i in self.files}):
+            watch = libc.inotify_add_watch(self.descriptor, i.encode(), self.EVENTS)
+            if watch < 0:
+                error = get_errno()
+                self.close()
+                raise OSError(error, strerror(error), i)
+            self.directories[watch] = i
+
+
+    def close(self):
+        """
+        Releases the inotify descriptor.
+
+        :return: Nothing
+        """
+        if self.descriptor >= 0:
+            close(self.descriptor)
+            self.descriptor = -1
+
+
+    def events(self):
+        """
+        Reads the pending events.
+
+        :return: Set of watched file paths named by events
+        """
+        result = set()
+        while True:
+            try:
+                data = read(self.descriptor, 64 * 1024)
+            except BlockingIOError:
+                return result
+            offset = 0
+            while offset < len(data):
+                watch, _, _, size = unpack_from('iIII', data, offset)
+                name = data[offset + 16:offset + 16 + size].split(b'\0', 1)[0].decode()
+                offset += 16 + size
+                file = path.join(self.directories.get(watch, ''), name)
+                if file in self.files:
+                    result.add(file)
+
+
+    def wait(self, timeout=None):
+        """
+        Waits until watched files change.
+
+        :param timeout: Number of seconds to wait, forever if None
+        :return: Set of changed file paths, empty once timeout expired
+        """
+        deadline = monotonic() + timeout if timeout is not None else None
+        while True:
+            remaining = max(0, deadline - monotonic()) if deadline is not None else None
+            ready, _, _ = select([self.descriptor], [], [], remaining)
+            if not ready:
+                return set()
+            result = self.events()
+            if result:
+                sleep(self.interval)
+                result |= self.events()
+                return result
+
+
+class WatchBuild:
+    """
+    WatchBuild rebuilds the EFI tree and config.plist file when a profile changes, redoing only the affected stages.
+    A profile is a Python file defining 'kexts', 'patches' and 'settings' variables, and optionally 'version'.
+    Settings can also be a function receiving the builder, to decode data with 'build.unhexlify'.
+    """
+    def __init__(self, build, profile, files=None, debug=False, watcher=None):
+        """
+        Constructs a new 'WatchBuild' object.
+
+        :param build: OpenCoreBuild object, kept warm between rebuilds
+        :param profile: Profile file path
+        :param files: List of additional file paths read by profile
+        :param debug: Install DEBUG releases
+        :param watcher: Watcher object, inotify watcher on Linux or polling watcher if None
+        :return: Nothing
+        """
+        self.build = build
+        self.debug = debug
+        self.defaults = None
+        self.files = [profile] + list(files or [])
+        self.merged = None
+        self.profile = profile
+        self.tree = None
+        self.version = build.version
+        self.versions = {}
+        self.watcher = watcher
+        build.incremental = True
+
+
+    def load(self):
+        """
+        Executes the profile file.
+
+        :return: Dictionary of profile kexts, patches, settings and version
+        """
+        namespace = run_path(self.profile)
+        settings = namespace.get('settings', {})
+
+        return {
+            'kexts': list(namespace.get('kexts', [])),
+            'patches': list(namespace.get('patches', [])),
+            'settings': settings(self.build) if callable(settings) else settings,
+            'version': namespace.get('version')
+        }
+
+
+    def rebuild(self):
+        """
+        Rebuilds the stages affected by profile changes, into a new build report.
+        The tree is rebuilt only when OpenCore or kext versions changed, config.plist is validated only when changed.
+
+        :return: List of rebuilt stage names
+        """
+        start = perf_counter()
+        build = self.build
+        build.report = BuildReport(build.report.sinks)
+        result = []
+        build.print_bold('* Profile {0}'.format(path.basename(self.profile)))
+        build.report.step('loading profile')
+        try:
+            profile = self.load()
+        except Exception as e:
+            build.report.status('FAILED')
+            build.report.detail('{0}: {1}'.format(type(e).__name__, e))
+            return result
+        build.report.status('OK')
+        tree = {
+            'debug': self.debug,
+            'kexts': [[i['repo'], i['project'], i['version']] for i in profile['kexts']],
+            'version': profile['version'] or self.version
+        }
+        try:
+            if tree != self.tree:
+                self.tree = None
+                build.kexts = profile['kexts']
+                build.version = tree['version']
+                build.write_tree(self.debug)
+                self.defaults = build.default_settings()
+                self.tree = tree
+                self.versions = {i['project']: i['version'] for i in build.kexts}
+                result.append('tree')
+            else:
+                kexts = [dict(i, version=self.versions.get(i['project'], i['version'])) for i in profile['kexts']]
+                build.kexts = build.with_host_kexts(kexts)
+            build.patches = profile['patches']
+            build.settings = self.defaults
+            build.write_plist(profile['settings'])
+            if 'tree' in result:
+                build.print_bold('* Miscellaneous Tasks')
+                build.fix_permissions()
+            if build.settings != self.merged or 'tree' in result:
+                build.check_plist()
+                result.append('config')
+            self.merged = build.settings
+            build.report.finish(build.stats())
+        except Exception as e:
+            build.report.status('FAILED')
+            build.report.detail('{0}: {1}'.format(type(e).__name__, e))
+            return result
+        build.print_bold('* Rebuilt {0}'.format(', '.join(result) or 'nothing'))
+        build.report.step('waiting for changes, after {0:.3f}s'.format(perf_counter() - start))
+        build.report.status('OK')
+
+        return result
+
+
+    def run(self, timeout=None):
+        """
+        Builds the profile, then rebuilds it on every change until interrupted.
+
+        :param timeout: Number of seconds without changes before returning, forever if None
+        :return: Nothing
+        """
+        watcher = self.watcher or self.watch(self.files)
+        try:
+            self.rebuild()
+            while watcher.wait(timeout):
+                self.rebuild()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.watcher is None:
+                watcher.close()
+
+
+    @staticmethod
+    def watch(files):
+        """
+        Constructs the watcher of files, inotify based on Linux with polling fallback.
+
+        :param files: List of watched file paths
+        :return: Watcher object
+        """
+        if platform.startswith('linux'):
+            try:
+                return InotifyWatcher(files)
+            except (AttributeError, OSError):
+                pass
+
+        return PollingWatcher(files)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Rebuilds the EFI tree and config.plist file when a profile changes.')
+    parser.add_argument('profile', help='profile file defining kexts, patches and settings')
+    parser.add_argument('--directory', default='Volumes/EFI', help='build directory')
+    parser.add_argument('--files', nargs='*', default=[], help='additional files read by profile')
+    parser.add_argument('--debug', action='store_true', help='install DEBUG releases')
+    arguments = parser.parse_args()
+
+    WatchBuild(OpenCoreBuild(arguments.directory), arguments.profile, arguments.files, arguments.debug).run()
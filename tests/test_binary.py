@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from json import dumps
+from os import makedirs, path
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase, main
+from zipfile import ZipFile
+
+from opencore.binary import BinaryData, BinaryError
+from opencore.download import Downloader
+from opencore.host import StubProbe
+
+
+class GitHubHandler(BaseHTTPRequestHandler):
+    """
+    GitHubHandler serves the OcBinaryData branch head and revision archives, standing for GitHub.
+    """
+    archives = {}
+    head = None
+    protocol_version = 'HTTP/1.1'
+    requests = []
+
+
+    def do_GET(self):
+        """
+        Serves the branch head commit and revision archives, other paths are not found.
+
+        :return: Nothing
+        """
+        self.requests.append(self.path)
+        revision = self.path.rsplit('/', 1)[-1][:-len('.zip')]
+        if self.path == '/commits/master' and self.head is not None:
+            body = dumps({'sha': self.head}).encode('UTF-8')
+        elif self.path.startswith('/archive/') and revision in self.archives:
+            body = self.archives[revision]
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, *arguments):
+        """
+        Silences the request log.
+
+        :param arguments: Log arguments
+        :return: Nothing
+        """
+
+
+class BinaryDataTest(TestCase):
+    """
+    BinaryDataTest verifies the OcBinaryData provision, against a local HTTP server and a temporary checkout.
+    """
+    @classmethod
+    def setUpClass(cls):
+        """
+        Starts the local HTTP server.
+
+        :return: Nothing
+        """
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), GitHubHandler)
+        cls.url = 'http://127.0.0.1:{0}'.format(cls.server.server_port)
+        Thread(target=cls.server.serve_forever, daemon=True).start()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Stops the local HTTP server.
+
+        :return: Nothing
+        """
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+    def setUp(self):
+        """
+        Creates the temporary checkout and resets the server content.
+
+        :return: Nothing
+        """
+        self.temp = TemporaryDirectory()
+        self.checkout = path.join(self.temp.name, 'OcBinaryData')
+        for name, data in [('Drivers/HfsPlus.efi', 'local'), ('Resources/Audio/a.mp3', 'audio')]:
+            file = path.join(self.checkout, name)
+            makedirs(path.dirname(file), exist_ok=True)
+            with open(file, 'w') as f:
+                f.write(data)
+        GitHubHandler.archives = {'2' * 40: self.archive('2' * 40, {'Drivers/HfsPlus.efi': b'remote'})}
+        GitHubHandler.head = '2' * 40
+        GitHubHandler.requests = []
+
+
+    def tearDown(self):
+        """
+        Deletes the temporary checkout and store.
+
+        :return: Nothing
+        """
+        self.temp.cleanup()
+
+
+    @staticmethod
+    def archive(revision, files):
+        """
+        Generates a revision archive, with files located under a top level directory.
+
+        :param revision: Commit hash
+        :param files: Dictionary of file paths relative to OC directory and contents
+        :return: Archive content
+        """
+        buffer = BytesIO()
+        with ZipFile(buffer, 'w') as zip:
+            zip.writestr('OcBinaryData-{0}/README.md'.format(revision), b'readme')
+            for name, data in files.items():
+                zip.writestr('OcBinaryData-{0}/{1}'.format(revision, name), data)
+
+        return buffer.getvalue()
+
+
+    def binary(self, checked=None, **arguments):
+        """
+        Constructs a binary data provider querying the local HTTP server.
+
+        :param checked: Checked out revision of the temporary checkout
+        :param arguments: Other 'BinaryData' arguments
+        :return: BinaryData object
+        """
+        result = BinaryData(self.checkout, path.join(self.temp.name, 'store'), downloader=Downloader(self.temp.name, backoff=0),
+                            host=StubProbe({'revision': checked}), **arguments)
+        result.ARCHIVE = '{0}/archive/{{0}}.zip'.format(self.url)
+        result.COMMITS = '{0}/commits/{{0}}'.format(self.url)
+
+        return result
+
+
+    def read(self, binary, name):
+        """
+        Reads a provided file.
+
+        :param binary: Prepared BinaryData object
+        :param name: File path relative to OC directory
+        :return: File content
+        """
+        with open(binary.entries[name], 'rb') as f:
+            return f.read()
+
+
+    def test_download(self):
+        """
+        Verifies the branch head is downloaded once into store, then reused without network access.
+
+        :return: Nothing
+        """
+        binary = self.binary('1' * 40)
+        self.assertEqual(binary.prepare(), 'downloaded')
+        self.assertEqual((sorted(binary.entries), binary.used), (['Drivers/HfsPlus.efi'], '2' * 40))
+        self.assertEqual(self.read(binary, 'Drivers/HfsPlus.efi'), b'remote')
+        GitHubHandler.head = None
+        self.assertEqual(self.binary('1' * 40).prepare(), 'cached')
+        self.assertEqual(GitHubHandler.requests, ['/commits/master', '/archive/{0}.zip'.format('2' * 40)])
+
+
+    def test_fallback(self):
+        """
+        Verifies the checkout is used when it matches the revision or when the revision cannot be downloaded.
+
+        :return: Nothing
+        """
+        binary = self.binary('2' * 40, revision='2' * 40)
+        self.assertEqual(binary.prepare(), 'local')
+        self.assertEqual(self.read(binary, 'Drivers/HfsPlus.efi'), b'local')
+        binary = self.binary('1' * 40, revision='3' * 40)
+        self.assertEqual((binary.prepare(), binary.used), ('offline', '1' * 40))
+        self.assertEqual(GitHubHandler.requests, ['/archive/{0}.zip'.format('3' * 40)])
+        binary.directory = path.join(self.temp.name, 'missing')
+        with self.assertRaises(BinaryError):
+            binary.prepare()
+
+
+    def test_offline(self):
+        """
+        Verifies the checkout is used offline and only changed or required files are materialized.
+
+        :return: Nothing
+        """
+        binary = self.binary('1' * 40, offline=True)
+        self.assertEqual((binary.prepare(), binary.used), ('offline', '1' * 40))
+        destination = path.join(self.temp.name, 'OC')
+        counters = binary.materialize(destination, lambda i: i.startswith('Drivers/'))
+        self.assertEqual((counters['copied'], counters['skipped']), (1, 1))
+        self.assertEqual(binary.materialize(destination)['unchanged'], 1)
+        self.assertTrue(path.isfile(path.join(destination, 'Resources/Audio/a.mp3')))
+        self.assertEqual(GitHubHandler.requests, [])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import ProcessPoolExecutor
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+
+from opencore.cache import ArtifactCache
+
+
+def store(directory, worker):
+    """
+    Stores archives into a cache shared with other processes.
+
+    :param directory: Path of the cache directory
+    :param worker: Worker number
+    :return: Nothing
+    """
+    cache = ArtifactCache(path.join(directory, 'cache'))
+    for i in range(10):
+        file = path.join(directory, '{0}-{1}'.format(worker, i))
+        with open(file, 'wb') as f:
+            f.write('{0}-{1}'.format(worker, i).encode())
+        cache.put(ArtifactCache.key('acidanthera', worker, i, 'RELEASE'), file, move=True)
+
+
+class ArtifactCacheTest(TestCase):
+    """
+    ArtifactCacheTest verifies the content-addressed cache, against a temporary directory.
+    """
+    def setUp(self):
+        """
+        Creates the temporary cache directory.
+
+        :return: Nothing
+        """
+        self.temp = TemporaryDirectory()
+        self.directory = path.join(self.temp.name, 'cache')
+
+
+    def tearDown(self):
+        """
+        Deletes the temporary cache directory.
+
+        :return: Nothing
+        """
+        self.temp.cleanup()
+
+
+    def write(self, name, size):
+        """
+        Writes an archive file.
+
+        :param name: File name
+        :param size: File size in bytes
+        :return: File path
+        """
+        file = path.join(self.temp.name, name)
+        with open(file, 'wb') as f:
+            f.write(name.encode()[:1] * size)
+
+        return file
+
+
+    def test_eviction(self):
+        """
+        Verifies least recently used archives are evicted, while archives larger than cache are not stored.
+
+        :return: Nothing
+        """
+        cache = ArtifactCache(self.directory, size=100)
+        first = cache.put('a', self.write('a', 40))
+        cache.put('b', self.write('b', 40))
+        self.assertEqual(cache.get('a'), first)
+        cache.put('c', self.write('c', 40))
+        self.assertEqual(sorted(cache.index), ['a', 'c'])
+        large = self.write('d', 200)
+        self.assertEqual(cache.put('d', large, move=True), large)
+        self.assertTrue(path.isfile(large))
+        self.assertIsNone(cache.get('d'))
+        self.assertEqual(cache.stats()['hits'], 1)
+
+
+    def test_processes(self):
+        """
+        Verifies concurrent processes keep each other's index entries.
+
+        :return: Nothing
+        """
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            list(executor.map(store, [self.temp.name] * 4, range(4)))
+        cache = ArtifactCache(self.directory)
+        self.assertEqual(len(cache.index), 40)
+        self.assertTrue(all(path.isfile(cache.object_path(i['sha256'])) for i in cache.index.values()))
+
+
+if __name__ == '__main__':
+    main()
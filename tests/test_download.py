@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+from hashlib import sha256
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase, main
+
+from opencore.download import DownloadError, Downloader
+
+
+class ReleaseHandler(BaseHTTPRequestHandler):
+    """
+    ReleaseHandler serves one release file with validators and ranges, standing for GitHub release downloads.
+    """
+    data = bytes(range(256)) * 256
+    etag = '"1"'
+    protocol_version = 'HTTP/1.1'
+    requests = []
+    shifted = False
+    truncated = 0
+
+
+    def do_GET(self):
+        """
+        Serves the release file, truncating responses or ignoring requested ranges when configured.
+
+        :return: Nothing
+        """
+        self.requests.append({k: v for k, v in self.headers.items() if k in ['If-None-Match', 'If-Range', 'Range']})
+        if self.path == '/missing':
+            self.send_error(404)
+            return
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        start = 0
+        if self.headers.get('Range') and self.headers.get('If-Range') == self.etag:
+            start = 0 if ReleaseHandler.shifted else int(self.headers['Range'][6:-1])
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {0}-{1}/{2}'.format(start, len(self.data) - 1, len(self.data)))
+        else:
+            self.send_response(200)
+        body = self.data[start:]
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', self.etag)
+        self.end_headers()
+        if ReleaseHandler.truncated > 0:
+            ReleaseHandler.truncated -= 1
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+    def log_message(self, *arguments):
+        """
+        Silences the request log.
+
+        :param arguments: Log arguments
+        :return: Nothing
+        """
+
+
+class DownloaderTest(TestCase):
+    """
+    DownloaderTest verifies the downloads resume and revalidation, against a local HTTP server.
+    """
+    @classmethod
+    def setUpClass(cls):
+        """
+        Starts the local HTTP server.
+
+        :return: Nothing
+        """
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), ReleaseHandler)
+        cls.url = 'http://127.0.0.1:{0}/OpenCore.zip'.format(cls.server.server_port)
+        Thread(target=cls.server.serve_forever, daemon=True).start()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Stops the local HTTP server.
+
+        :return: Nothing
+        """
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+    def setUp(self):
+        """
+        Creates the temporary downloads directory and resets the server behavior.
+
+        :return: Nothing
+        """
+        self.temp = TemporaryDirectory()
+        self.downloader = Downloader(self.temp.name, backoff=0)
+        ReleaseHandler.requests = []
+        ReleaseHandler.shifted = False
+        ReleaseHandler.truncated = 0
+
+
+    def tearDown(self):
+        """
+        Closes the connections and deletes the temporary downloads directory.
+
+        :return: Nothing
+        """
+        self.downloader.close()
+        self.temp.cleanup()
+
+
+    def assertDownloaded(self, file, digest):
+        """
+        Asserts a downloaded file matches the release file.
+
+        :param file: Downloaded file path
+        :param digest: Reported sha256 digest
+        :return: Nothing
+        """
+        with open(file, 'rb') as f:
+            self.assertEqual(f.read(), ReleaseHandler.data)
+        self.assertEqual(digest, sha256(ReleaseHandler.data).hexdigest())
+
+
+    def test_errors(self):
+        """
+        Verifies client errors are not retried.
+
+        :return: Nothing
+        """
+        with self.assertRaises(DownloadError):
+            self.downloader.fetch(self.url.replace('OpenCore.zip', 'missing'))
+        self.assertEqual((len(ReleaseHandler.requests), self.downloader.stats()['retries']), (1, 0))
+
+
+    def test_range_mismatch(self):
+        """
+        Verifies a partial response not starting at the requested offset restarts the download.
+
+        :return: Nothing
+        """
+        ReleaseHandler.truncated = 1
+        ReleaseHandler.shifted = True
+        file, digest, status = self.downloader.fetch(self.url)
+        self.assertDownloaded(file, digest)
+        self.assertEqual(self.downloader.stats()['restarted'], 1)
+        self.assertNotIn('Range', ReleaseHandler.requests[-1])
+
+
+    def test_resume(self):
+        """
+        Verifies an interrupted download is resumed from its partial file.
+
+        :return: Nothing
+        """
+        ReleaseHandler.truncated = 1
+        file, digest, status = self.downloader.fetch(self.url)
+        self.assertDownloaded(file, digest)
+        stats = self.downloader.stats()
+        self.assertEqual((stats['resumed'], stats['retries']), (1, 1))
+        self.assertEqual(ReleaseHandler.requests[-1]['Range'], 'bytes={0}-'.format(len(ReleaseHandler.data) // 2))
+        self.assertEqual(stats['bytes'], len(ReleaseHandler.data))
+
+
+    def test_revalidation(self):
+        """
+        Verifies a previous download is revalidated, without downloading it again.
+
+        :return: Nothing
+        """
+        file, digest, status = self.downloader.fetch(self.url)
+        self.assertEqual(status, 'downloaded')
+        again, same, status = self.downloader.fetch(self.url)
+        self.assertEqual((again, same, status), (file, digest, 'unchanged'))
+        self.assertDownloaded(file, digest)
+        self.assertEqual(ReleaseHandler.requests[-1]['If-None-Match'], ReleaseHandler.etag)
+        stats = self.downloader.stats()
+        self.assertEqual((stats['bytes'], stats['connections'], stats['reused']), (len(ReleaseHandler.data), 1, 1))
+
+
+    def test_stream(self):
+        """
+        Verifies a streamed download is resumed from its buffer position.
+
+        :return: Nothing
+        """
+        ReleaseHandler.truncated = 1
+        buffer = BytesIO()
+        digest = self.downloader.stream(self.url, buffer)
+        self.assertEqual((buffer.getvalue(), buffer.tell()), (ReleaseHandler.data, 0))
+        self.assertEqual(digest, sha256(ReleaseHandler.data).hexdigest())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+from binascii import Error
+from unittest import TestCase, main
+
+from opencore.hexdata import HexDecoder
+
+
+class HexDecoderTest(TestCase):
+    """
+    HexDecoderTest verifies the hexadecimal decoding and data interning.
+    """
+    def test_bounded(self):
+        """
+        Verifies the tables of a decoder are bounded and not shared with other decoders.
+
+        :return: Nothing
+        """
+        decoder = HexDecoder(size=2)
+        for i in range(5):
+            decoder.decode('{0:02X}'.format(i))
+        self.assertEqual((len(decoder.strings), len(decoder.values)), (2, 2))
+        self.assertEqual(len(HexDecoder().strings), 0)
+
+
+    def test_decode(self):
+        """
+        Verifies whitespace is ignored and identical data is shared.
+
+        :return: Nothing
+        """
+        decoder = HexDecoder()
+        result = decoder.decode('0 1 02\n03')
+        self.assertEqual(result, b'\x01\x02\x03')
+        self.assertIs(decoder.decode('010203'), result)
+        self.assertIs(decoder.intern(bytearray(b'\x01\x02\x03')), result)
+        with self.assertRaises(Error):
+            decoder.decode('0G')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+from os import makedirs, path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+
+from opencore.host import HostProbe, StubProbe
+
+try:
+    from os import setxattr
+except ImportError:
+    setxattr = None
+
+
+class HostProbeTest(TestCase):
+    """
+    HostProbeTest verifies the in-process host properties, against the build host and temporary files.
+    """
+    def setUp(self):
+        """
+        Creates the temporary directory.
+
+        :return: Nothing
+        """
+        self.temp = TemporaryDirectory()
+
+
+    def tearDown(self):
+        """
+        Deletes the temporary directory.
+
+        :return: Nothing
+        """
+        self.temp.cleanup()
+
+
+    def write(self, name, data):
+        """
+        Writes a temporary file.
+
+        :param name: File path relative to temporary directory
+        :param data: File content
+        :return: File path
+        """
+        file = path.join(self.temp.name, name)
+        makedirs(path.dirname(file), exist_ok=True)
+        with open(file, 'w') as f:
+            f.write(data)
+
+        return file
+
+
+    def test_cpu_count(self):
+        """
+        Verifies the processors count is reported by host, unless overridden by profile.
+
+        :return: Nothing
+        """
+        self.assertGreaterEqual(HostProbe().cpu_count(), 1)
+        self.assertEqual(HostProbe({'cpus': 32}).cpu_count(), 32)
+        self.assertEqual((StubProbe().cpu_count(), StubProbe({'cpus': 8}).cpu_count()), (1, 8))
+
+
+    def test_exchange(self):
+        """
+        Verifies two directories are swapped when supported, left untouched otherwise.
+
+        :return: Nothing
+        """
+        first = path.dirname(self.write('first/name', 'first'))
+        second = path.dirname(self.write('second/name', 'second'))
+        self.assertFalse(StubProbe().exchange(first, second))
+        swapped = HostProbe().exchange(first, second)
+        with open(path.join(first, 'name'), 'r') as f:
+            self.assertEqual(f.read(), 'second' if swapped else 'first')
+        if swapped:
+            with self.assertRaises(OSError):
+                HostProbe().exchange(first, path.join(self.temp.name, 'missing'))
+
+
+    def test_filesystem(self):
+        """
+        Verifies the filesystem type is reported for missing paths, from their existing parent volume.
+
+        :return: Nothing
+        """
+        result = HostProbe().filesystem(path.join(self.temp.name, 'missing', 'file'))
+        self.assertEqual(result, HostProbe().filesystem(self.temp.name))
+        self.assertTrue(result is None or isinstance(result, str) and result)
+        self.assertEqual((StubProbe().filesystem('/'), StubProbe({'filesystem': 'msdos'}).filesystem('/')), (None, 'msdos'))
+
+
+    def test_git_revision(self):
+        """
+        Verifies the checked out commit is read from loose, packed and detached references, including submodules.
+
+        :return: Nothing
+        """
+        work = path.join(self.temp.name, 'work')
+        self.write('work/.git/HEAD', 'ref: refs/heads/master\n')
+        self.write('work/.git/refs/heads/master', '1' * 40 + '\n')
+        self.assertEqual(HostProbe.git_revision(work), '1' * 40)
+        module = path.join(self.temp.name, 'module')
+        self.write('module/.git', 'gitdir: ../work/.git/modules/module\n')
+        self.write('work/.git/modules/module/HEAD', 'ref: refs/heads/master\n')
+        self.write('work/.git/modules/module/packed-refs', '# pack-refs\n{0} refs/heads/master\n'.format('2' * 40))
+        self.assertEqual(HostProbe.git_revision(module), '2' * 40)
+        self.write('work/.git/HEAD', '3' * 40 + '\n')
+        self.assertEqual(HostProbe.git_revision(work), '3' * 40)
+        self.assertIsNone(HostProbe.git_revision(self.temp.name))
+        self.assertEqual(StubProbe({'revision': '4' * 40}).git_revision(work), '4' * 40)
+
+
+    def test_xattrs(self):
+        """
+        Verifies the extended attributes are listed and removed.
+
+        :return: Nothing
+        """
+        file = self.write('file', 'data')
+        stub = StubProbe(xattrs={file: ['com.apple.quarantine']})
+        stub.remove_xattr(file, 'com.apple.quarantine')
+        self.assertEqual(stub.list_xattrs(file), [])
+        probe = HostProbe()
+        try:
+            setxattr(file, 'user.test', b'1')
+        except (OSError, TypeError):
+            self.assertNotIn('user.test', probe.list_xattrs(file))
+            return
+        self.assertIn('user.test', probe.list_xattrs(file))
+        probe.remove_xattr(file, 'user.test')
+        self.assertNotIn('user.test', probe.list_xattrs(file))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+from os import listdir, path, rename
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+
+from opencore.host import HostProbe, StubProbe
+from opencore.manifest import BuildManifest
+
+
+class BuildManifestTest(TestCase):
+    """
+    BuildManifestTest verifies the incremental build transactions, against a temporary build directory.
+    """
+    def setUp(self):
+        """
+        Creates the temporary build directory.
+
+        :return: Nothing
+        """
+        self.temp = TemporaryDirectory()
+        self.directory = path.join(self.temp.name, 'EFI')
+
+
+    def tearDown(self):
+        """
+        Deletes the temporary build directory.
+
+        :return: Nothing
+        """
+        self.temp.cleanup()
+
+
+    def build(self, files, host=None):
+        """
+        Builds the directory from an archive of files.
+
+        :param files: Dictionary of file names and contents
+        :param host: HostProbe object
+        :return: Tuple of manifest and commit result
+        """
+        manifest = BuildManifest(self.directory, host)
+        if not manifest.unchanged('OpenCore', self.digest(files), '1.0.0'):
+            for name, data in files.items():
+                manifest.add(name, data, 'OpenCore', '1.0.0')
+
+        return manifest, manifest.commit()
+
+
+    @staticmethod
+    def digest(files):
+        """
+        Computes a digest standing for the archive of files.
+
+        :param files: Dictionary of file names and contents
+        :return: Digest string
+        """
+        return repr(sorted(files.items()))
+
+
+    def read(self, name):
+        """
+        Reads a build directory file.
+
+        :param name: File path relative to build directory
+        :return: File content
+        """
+        with open(path.join(self.directory, name), 'rb') as f:
+            return f.read()
+
+
+    def test_commit(self):
+        """
+        Verifies commit publishes new files, deletes obsolete files and reuses unchanged archives.
+
+        :return: Nothing
+        """
+        for host in [HostProbe(), StubProbe()]:
+            self.build({'OC/a': b'a', 'OC/b': b'b'}, host)
+            self.assertEqual(self.read('OC/a'), b'a')
+            _, changed = self.build({'OC/a': b'A'}, host)
+            self.assertTrue(changed)
+            self.assertEqual((self.read('OC/a'), listdir(path.join(self.directory, 'OC'))), (b'A', ['a']))
+            self.assertEqual(sorted(listdir(self.temp.name)), ['EFI'])
+            _, changed = self.build({'OC/a': b'A'}, host)
+            self.assertFalse(changed)
+            self.assertFalse(BuildManifest(self.directory, host).unchanged('OpenCore', 'other', '1.0.0'))
+
+
+    def test_discard(self):
+        """
+        Verifies a discarded transaction leaves the build directory untouched.
+
+        :return: Nothing
+        """
+        self.build({'OC/a': b'a'})
+        manifest = BuildManifest(self.directory)
+        manifest.add('OC/a', b'A', 'OpenCore', '1.0.0')
+        manifest.discard()
+        self.assertEqual(self.read('OC/a'), b'a')
+        self.assertEqual(sorted(listdir(self.temp.name)), ['EFI'])
+
+
+    def test_recover(self):
+        """
+        Verifies the build directory moved aside by an interrupted swap is restored.
+
+        :return: Nothing
+        """
+        self.build({'OC/a': b'a'})
+        rename(self.directory, '{0}.previous'.format(self.directory))
+        manifest = BuildManifest(self.directory)
+        self.assertEqual(self.read('OC/a'), b'a')
+        self.assertTrue(manifest.unchanged('OpenCore', self.digest({'OC/a': b'a'}), '1.0.0'))
+
+
+    def test_tampered(self):
+        """
+        Verifies a modified output file invalidates its archive.
+
+        :return: Nothing
+        """
+        self.build({'OC/a': b'a'})
+        with open(path.join(self.directory, 'OC/a'), 'wb') as f:
+            f.write(b'modified')
+        self.assertFalse(BuildManifest(self.directory).unchanged('OpenCore', self.digest({'OC/a': b'a'}), '1.0.0'))
+
+
+if __name__ == '__main__':
+    main()
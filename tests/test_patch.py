@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+from random import Random
+from unittest import TestCase, main
+
+from opencore.patch import PatchVerifier
+
+
+def apply_patch(data, patch):
+    """
+    Applies a patch as OpenCore 'ApplyPatch' does, used as reference.
+
+    :param data: Binary bytearray, modified in place
+    :param patch: Patch properties
+    :return: List of replaced offsets
+    """
+    find = patch['Find']
+    mask = patch.get('Mask', b'')
+    replace = patch['Replace']
+    replace_mask = patch.get('ReplaceMask', b'')
+    skip = patch.get('Skip', 0)
+    count = patch.get('Count', 0)
+    size = min(patch['Limit'], len(data)) if patch.get('Limit') else len(data)
+    result = []
+    offset = 0
+    while offset + len(find) <= size:
+        current = data[offset:offset + len(find)]
+        if mask:
+            found = all(d & m == f for d, f, m in zip(current, find, mask))
+        else:
+            found = current == find
+        if not found:
+            offset += 1
+            continue
+        if skip > 0:
+            skip -= 1
+        else:
+            for i, value in enumerate(replace):
+                bits = replace_mask[i] if replace_mask else 0xFF
+                data[offset + i] = data[offset + i] & ~bits & 0xFF | value & bits
+            result.append(offset)
+            if 0 < count == len(result):
+                break
+        offset += len(find)
+
+    return result
+
+
+class PatchVerifierTest(TestCase):
+    """
+    PatchVerifierTest compares the verified patch offsets with the OpenCore patching semantics.
+    """
+    def assertReference(self, data, patches):
+        """
+        Asserts the verified offsets match the offsets replaced by reference implementation.
+
+        :param data: Binary bytes
+        :param patches: List of patch properties
+        :return: Nothing
+        """
+        reference = bytearray(data)
+        expected = [apply_patch(reference, i) for i in patches]
+        result = PatchVerifier(chunk=7).verify_data(data, patches, {})
+        self.assertEqual([i.offsets for i in result], expected, patches)
+
+
+    def test_find_outside_mask(self):
+        """
+        Verifies a Find having bits set outside its Mask is reported, as OpenCore never matches it.
+
+        :return: Nothing
+        """
+        patch = {'Find': b'\x43', 'Mask': b'\xFD', 'Replace': b'\x00'}
+        result = PatchVerifier().verify_data(b'\x41\x43', [patch], {})
+        self.assertEqual(result[0].offsets, [])
+        self.assertEqual(result[0].issue, 'Find has bits set outside Mask, never matched by OpenCore')
+        self.assertReference(b'\x41\x43', [patch])
+        result = PatchVerifier().verify_data(b'\x41\x43', [dict(patch, Find=b'\x41')], {})
+        self.assertEqual(result[0].offsets, [0, 1])
+
+
+    def test_overlapping_matches(self):
+        """
+        Verifies overlapping matches are skipped and replaced like OpenCore does.
+
+        :return: Nothing
+        """
+        patches = [
+            {'Find': b'ABA', 'Replace': b'CCC'},
+            {'Find': b'AA', 'Replace': b'AB', 'Skip': 2},
+            {'Count': 2, 'Find': b'BAB', 'Replace': b'ABA', 'Skip': 1}
+        ]
+        for patch in patches:
+            self.assertReference(b'ABABABAAAAABAB', [patch])
+        self.assertReference(b'ABABABAAAAABAB', patches)
+
+
+    def test_random_patches(self):
+        """
+        Verifies random masked patches, applied in order over data modified by previous patches.
+
+        :return: Nothing
+        """
+        random = Random(0)
+        for _ in range(500):
+            data = bytes(random.choice(b'AB') for _ in range(random.randint(0, 40)))
+            patches = []
+            for _ in range(random.randint(1, 3)):
+                size = random.randint(1, 4)
+                mask = bytes(random.choice([0xFF, 0xFF, 0xFD]) for _ in range(size)) if random.random() < 0.3 else b''
+                find = bytes(random.choice(b'AB') & (mask[i] if mask and random.random() < 0.8 else 0xFF) for i in range(size))
+                patch = {
+                    'Count': random.randint(0, 3),
+                    'Find': find,
+                    'Limit': random.choice([0, 0, random.randint(1, 40)]),
+                    'Replace': bytes(random.choice(b'AB') for _ in range(size)),
+                    'Skip': random.randint(0, 3)
+                }
+                if mask:
+                    patch['Mask'] = mask
+                if random.random() < 0.3:
+                    patch['ReplaceMask'] = bytes(random.choice([0x00, 0x03, 0xFF]) for _ in range(size))
+                patches.append(patch)
+            self.assertReference(data, patches)
+
+
+    def test_skip_advances_past_pattern(self):
+        """
+        Verifies a skipped match advances past the pattern, instead of one byte.
+
+        :return: Nothing
+        """
+        result = PatchVerifier().verify_data(b'AAAAAA', [{'Count': 1, 'Find': b'AA', 'Replace': b'BB', 'Skip': 1}], {})
+        self.assertEqual(result[0].offsets, [2])
+        self.assertReference(b'AAAAAA', [{'Count': 1, 'Find': b'AA', 'Replace': b'BB', 'Skip': 1}])
+
+
+if __name__ == '__main__':
+    main()
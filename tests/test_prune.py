@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+
+from unittest import TestCase, main
+
+from opencore.prune import TreePruner
+
+
+class TreePrunerTest(TestCase):
+    """
+    TreePrunerTest verifies the files referenced by settings.
+    """
+    def test_required(self):
+        """
+        Verifies enabled dictionary entries and plain string entries are required, while other files are not.
+
+        :return: Nothing
+        """
+        pruner = TreePruner({
+            'ACPI': {'Add': [{'Enabled': False, 'Path': 'SSDT-EC.aml'}, {'Enabled': True, 'Path': 'SSDT-PLUG.aml'}]},
+            'UEFI': {'Drivers': ['HfsPlus.efi', '', {'Enabled': True, 'Path': 'OpenRuntime.efi'}]}
+        })
+        self.assertEqual(pruner.drivers, {'HfsPlus.efi', 'OpenRuntime.efi'})
+        self.assertTrue(pruner.required('Drivers/HfsPlus.efi'))
+        self.assertFalse(pruner.required('Drivers/OpenCanopy.efi'))
+        self.assertTrue(pruner.required('ACPI/SSDT-PLUG.aml'))
+        self.assertFalse(pruner.required('ACPI/SSDT-EC.aml'))
+        self.assertFalse(pruner.required('Resources/Font/Terminal.hex'))
+        self.assertTrue(pruner.required('OpenCore.efi'))
+
+
+if __name__ == '__main__':
+    main()
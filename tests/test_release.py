@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dump, dumps
+from os import path
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase, main
+
+from opencore.download import DownloadError, Downloader
+from opencore.release import ReleaseError, ReleaseIndex
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """
+    ApiHandler serves the releases of one project, standing for GitHub releases API.
+    """
+    protocol_version = 'HTTP/1.1'
+    releases = [
+        {'assets': [{'browser_download_url': 'https://example.com/Lilu-1.6.7-RELEASE.zip', 'name': 'Lilu-1.6.7-RELEASE.zip'}],
+         'tag_name': '1.6.7'},
+        {'assets': [], 'tag_name': 'v1.6.6'},
+        {'assets': [], 'draft': True, 'tag_name': '1.7.0'},
+        {'assets': [], 'prerelease': True, 'tag_name': '1.6.8'}
+    ]
+
+
+    def do_GET(self):
+        """
+        Serves the project releases, other projects are not found.
+
+        :return: Nothing
+        """
+        if self.path != '/acidanthera/Lilu':
+            self.send_error(404)
+            return
+        body = dumps(self.releases).encode('UTF-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, *arguments):
+        """
+        Silences the request log.
+
+        :param arguments: Log arguments
+        :return: Nothing
+        """
+
+
+class ReleaseIndexTest(TestCase):
+    """
+    ReleaseIndexTest verifies the version specifiers resolution, against local release indexes.
+    """
+    @classmethod
+    def setUpClass(cls):
+        """
+        Starts the local HTTP server.
+
+        :return: Nothing
+        """
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), ApiHandler)
+        cls.api = 'http://127.0.0.1:{0}/{{0}}/{{1}}'.format(cls.server.server_port)
+        Thread(target=cls.server.serve_forever, daemon=True).start()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Stops the local HTTP server.
+
+        :return: Nothing
+        """
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+    def setUp(self):
+        """
+        Creates the temporary index directory.
+
+        :return: Nothing
+        """
+        self.temp = TemporaryDirectory()
+        self.file = path.join(self.temp.name, 'releases.json')
+
+
+    def tearDown(self):
+        """
+        Deletes the temporary index directory.
+
+        :return: Nothing
+        """
+        self.temp.cleanup()
+
+
+    def index(self, ttl):
+        """
+        Constructs a release index querying the local HTTP server.
+
+        :param ttl: Number of seconds a project index is reused before refresh, never refreshed if None
+        :return: ReleaseIndex object
+        """
+        return ReleaseIndex(self.file, ttl, self.api, Downloader(self.temp.name, backoff=0))
+
+
+    def test_offline(self):
+        """
+        Verifies a prepared index is used without refresh, while a missing project fails.
+
+        :return: Nothing
+        """
+        releases = {i: {'assets': {}, 'tag': i} for i in ['0.9.7', '0.9.9', '1.0.0', '1.0.1', 'nightly']}
+        with open(self.file, 'w') as f:
+            dump({'acidanthera/OpenCorePkg': {'fetched': 0, 'releases': releases}}, f)
+        index = self.index(None)
+        self.assertEqual(index.resolve('acidanthera', 'OpenCorePkg', 'latest'), '1.0.1')
+        self.assertEqual(index.resolve('acidanthera', 'OpenCorePkg', '>=0.9.0,<1.0'), '0.9.9')
+        self.assertEqual(index.resolve('acidanthera', 'OpenCorePkg', '~=0.9.7'), '0.9.9')
+        self.assertEqual(index.resolve('acidanthera', 'OpenCorePkg', '== 1.0'), '1.0.0')
+        self.assertEqual(index.resolve('acidanthera', 'OpenCorePkg', '0.6.0'), '0.6.0')
+        with self.assertRaises(ReleaseError):
+            index.resolve('acidanthera', 'OpenCorePkg', '>1.0.1')
+        with self.assertRaises(ReleaseError):
+            index.resolve('acidanthera', 'OpenCorePkg', '>=one')
+        with self.assertRaises(DownloadError):
+            index.resolve('acidanthera', 'Missing', 'latest')
+        self.assertEqual(index.stats(), {'hits': 5, 'projects': 1, 'refreshes': 0, 'stale': 0})
+
+
+    def test_refresh(self):
+        """
+        Verifies an index is fetched without drafts and prereleases, then reused until expired.
+
+        :return: Nothing
+        """
+        index = self.index(3600)
+        self.assertEqual(index.resolve('acidanthera', 'Lilu', 'latest'), '1.6.7')
+        self.assertEqual(index.resolve('acidanthera', 'Lilu', '<1.6.7'), '1.6.6')
+        self.assertEqual(index.stats(), {'hits': 1, 'projects': 1, 'refreshes': 1, 'stale': 0})
+        self.assertEqual(index.url('acidanthera', 'Lilu', '1.6.7', 'Lilu-1.6.7-RELEASE.zip'),
+                         'https://example.com/Lilu-1.6.7-RELEASE.zip')
+        self.assertEqual(index.url('acidanthera', 'Lilu', '1.6.6', 'Lilu-1.6.6-RELEASE.zip'),
+                         'https://github.com/acidanthera/Lilu/releases/download/v1.6.6/Lilu-1.6.6-RELEASE.zip')
+        expired = self.index(0)
+        expired.api = expired.api.replace('{1}', 'Missing')
+        self.assertEqual(expired.resolve('acidanthera', 'Lilu', 'latest'), '1.6.7')
+        self.assertEqual(expired.stats()['stale'], 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+from json import load
+from logging import getLogger
+from os import path
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase, main
+
+from opencore.report import BuildReport, JsonSink, LoggingSink
+
+
+class BuildReportTest(TestCase):
+    """
+    BuildReportTest verifies the build spans and counters aggregation, forwarded to sinks.
+    """
+    def test_counters(self):
+        """
+        Verifies counters are aggregated globally and into the open spans of their thread only.
+
+        :return: Nothing
+        """
+        report = BuildReport(sinks=[])
+        with report.span('extract', project='Lilu') as record:
+            report.count('extract.files', 2)
+            thread = Thread(target=report.count, args=('extract.files', 3))
+            thread.start()
+            thread.join()
+            with report.span('copy') as nested:
+                report.count('copy.bytes', 10)
+        self.assertEqual(report.summary()['counters'], {'copy.bytes': 10, 'extract.files': 5})
+        self.assertEqual((record['counters'], record['labels']), ({'copy.bytes': 10, 'extract.files': 2}, {'project': 'Lilu'}))
+        self.assertEqual((nested['name'], nested['counters']), ('extract/copy', {'copy.bytes': 10}))
+
+
+    def test_phases(self):
+        """
+        Verifies spans are aggregated by name, failed spans recording their error.
+
+        :return: Nothing
+        """
+        report = BuildReport(sinks=[])
+        for i in range(3):
+            with report.span('download'):
+                pass
+        with self.assertRaises(KeyError):
+            with report.span('plist'):
+                raise KeyError('Misc')
+        summary = report.summary()
+        self.assertEqual({k: v['count'] for k, v in summary['phases'].items()}, {'download': 3, 'plist': 1})
+        self.assertEqual(summary['spans'][-1]['error'], 'KeyError')
+        self.assertTrue(all(i['wall'] >= 0 and i['cpu'] >= 0 for i in summary['spans']))
+
+
+    def test_sinks(self):
+        """
+        Verifies events are forwarded to all sinks and the finished report is written with hit rates.
+
+        :return: Nothing
+        """
+        events = []
+        with TemporaryDirectory() as temp:
+            file = path.join(temp, 'reports', 'report.json')
+            report = BuildReport([events.append, JsonSink(file), LoggingSink(getLogger('opencore.test'))])
+            report.heading('OpenCore 1.0.0')
+            report.step('fetching component')
+            report.status('OK')
+            with report.span('download'):
+                report.count('download.bytes', 100)
+            stats = {'cache': {'hits': 3, 'misses': 1}, 'index': {'hits': 0, 'misses': 0}, 'other': {'files': 1}}
+            with self.assertLogs('opencore.test') as logs:
+                result = report.finish(stats)
+            with open(file, 'r') as f:
+                written = load(f)
+        self.assertEqual([i['event'] for i in events], ['heading', 'step', 'status', 'start', 'end', 'report'])
+        self.assertEqual(result['stats'], {'cache': {'hit_rate': 0.75, 'hits': 3, 'misses': 1},
+                                           'index': {'hit_rate': None, 'hits': 0, 'misses': 0}, 'other': {'files': 1}})
+        self.assertEqual((written['counters'], written['stats']), (result['counters'], result['stats']))
+        self.assertEqual(logs.records[0].report['event'], 'report')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+from os import makedirs, path, readlink, stat, symlink, utime
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+
+from opencore.host import StubProbe
+from opencore.sync import TreeSync
+
+
+class TreeSyncTest(TestCase):
+    """
+    TreeSyncTest verifies the directory mirroring, against temporary directories.
+    """
+    def setUp(self):
+        """
+        Creates the temporary source directory.
+
+        :return: Nothing
+        """
+        self.temp = TemporaryDirectory()
+        self.source = path.join(self.temp.name, 'source')
+        self.destination = path.join(self.temp.name, 'destination')
+        makedirs(path.join(self.source, 'Drivers'))
+        self.write('Drivers/a.efi', 'a')
+
+
+    def tearDown(self):
+        """
+        Deletes the temporary directories.
+
+        :return: Nothing
+        """
+        self.temp.cleanup()
+
+
+    def write(self, name, data, delta=0):
+        """
+        Writes a source file, shifting its modification time.
+
+        :param name: File path relative to source
+        :param data: File content
+        :param delta: Modification time shift in nanoseconds
+        :return: Nothing
+        """
+        file = path.join(self.source, name)
+        previous = stat(file).st_mtime_ns if path.exists(file) else None
+        with open(file, 'w') as f:
+            f.write(data)
+        if previous is not None:
+            utime(file, ns=(previous + delta, previous + delta))
+
+
+    def test_precision(self):
+        """
+        Verifies same size edits are copied exactly, unless the destination is a FAT filesystem.
+
+        :return: Nothing
+        """
+        TreeSync().sync(self.source, self.destination)
+        self.write('Drivers/a.efi', 'b', 10 ** 9)
+        self.assertEqual(TreeSync(host=StubProbe({'filesystem': 'msdos'})).sync(self.source, self.destination)['copy'], 0)
+        self.assertEqual(TreeSync(host=StubProbe({'filesystem': 'ext4'})).sync(self.source, self.destination)['copy'], 1)
+        with open(path.join(self.destination, 'Drivers/a.efi'), 'r') as f:
+            self.assertEqual(f.read(), 'b')
+
+
+    def test_symlinks(self):
+        """
+        Verifies symbolic links are recreated, instead of copying a truncated target.
+
+        :return: Nothing
+        """
+        symlink('Drivers/a.efi', path.join(self.source, 'link'))
+        symlink('/missing/target', path.join(self.source, 'broken'))
+        for link in [None, 'hardlink']:
+            result = TreeSync(link=link).sync(self.source, self.destination)
+            self.assertEqual(readlink(path.join(self.destination, 'link')), 'Drivers/a.efi')
+            self.assertEqual(readlink(path.join(self.destination, 'broken')), '/missing/target')
+            self.assertEqual(TreeSync(link=link).sync(self.source, self.destination)['skip'], 3)
+        self.assertEqual(result['skip'], 3)
+
+
+if __name__ == '__main__':
+    main()